@@ -0,0 +1,84 @@
+"""composite indexes and uniqueness for hot access paths
+
+- attendance_records (user_id, date): unique; check-in/check-out lookup
+- payroll_records (user_id, year, month): unique; duplicate-period check
+- payroll_records (year, month): admin filters
+- leave_requests (user_id, created_at) and (status, created_at): list endpoints
+
+Uniqueness is enforced with unique indexes, which SQLite can add in place and
+which ON CONFLICT (user_id, date) upserts can target on both dialects. On
+PostgreSQL every index is built with CREATE INDEX CONCURRENTLY outside the
+migration transaction, so large tables stay writable while it runs. Existing
+duplicates abort the upgrade before any index is built.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 06:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+UNIQUE_INDEXES = [
+    ("uq_attendance_records_user_id_date", "attendance_records", ["user_id", "date"]),
+    ("uq_payroll_records_user_id_year_month", "payroll_records", ["user_id", "year", "month"]),
+]
+
+INDEXES = [
+    ("ix_payroll_records_year_month", "payroll_records", ["year", "month"]),
+    ("ix_leave_requests_user_id_created_at", "leave_requests", ["user_id", "created_at"]),
+    ("ix_leave_requests_status_created_at", "leave_requests", ["status", "created_at"]),
+]
+
+
+def _assert_no_duplicates(table: str, columns: list[str]) -> None:
+    if op.get_context().as_sql:
+        return
+    cols = ", ".join(columns)
+    duplicates = op.get_bind().execute(sa.text(
+        f"SELECT COUNT(*) FROM (SELECT {cols} FROM {table} GROUP BY {cols} HAVING COUNT(*) > 1) d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{table} has {duplicates} duplicate ({cols}) groups; "
+            "merge them before adding the unique constraint"
+        )
+
+
+def upgrade() -> None:
+    for _, table, columns in UNIQUE_INDEXES:
+        _assert_no_duplicates(table, columns)
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns in UNIQUE_INDEXES:
+                op.create_index(name, table, columns, unique=True,
+                                postgresql_concurrently=True, if_not_exists=True)
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns,
+                                postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in UNIQUE_INDEXES:
+            op.create_index(name, table, columns, unique=True)
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in UNIQUE_INDEXES + INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for name, table, _ in UNIQUE_INDEXES + INDEXES:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,54 @@
+"""daily attendance summary rollup
+
+Adds daily_attendance_summary keyed by (date, department, status) and
+backfills it from attendance_records. The application keeps it current on
+every attendance write; `python -m jobs.rebuild_attendance_summary` recomputes it.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ATTENDANCE_STATUS = sa.Enum('PRESENT', 'ABSENT', 'LATE', 'HALF_DAY', name='attendancestatus').with_variant(
+    # The type already exists on PostgreSQL (created with attendance_records)
+    postgresql.ENUM('PRESENT', 'ABSENT', 'LATE', 'HALF_DAY', name='attendancestatus', create_type=False),
+    'postgresql',
+)
+
+
+def upgrade() -> None:
+    op.create_table('daily_attendance_summary',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('department', sa.String(), nullable=False),
+    sa.Column('status', ATTENDANCE_STATUS, nullable=False),
+    sa.Column('headcount', sa.Integer(), nullable=False),
+    sa.Column('checked_in', sa.Integer(), nullable=False),
+    sa.Column('checked_out', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('date', 'department', 'status')
+    )
+    op.execute(
+        "INSERT INTO daily_attendance_summary (date, department, status, headcount, checked_in, checked_out) "
+        "SELECT a.date, COALESCE(u.department, ''), COALESCE(a.status, 'PRESENT'), "
+        "COUNT(*), COUNT(a.check_in), COUNT(a.check_out) "
+        "FROM attendance_records a JOIN users u ON u.id = a.user_id "
+        "GROUP BY a.date, COALESCE(u.department, ''), COALESCE(a.status, 'PRESENT')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_attendance_summary')
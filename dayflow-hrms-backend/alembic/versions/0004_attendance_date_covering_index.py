@@ -0,0 +1,46 @@
+"""covering index for attendance date-range scans
+
+Replaces ix_attendance_records_date with (date, user_id, status) so month-wide
+reads such as GET /api/attendance/matrix are served from the index without
+visiting the table. Date-only lookups keep using the leading column. On
+PostgreSQL the new index is built concurrently before the old one is dropped.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NEW_INDEX = ("ix_attendance_records_date_user_id_status", ["date", "user_id", "status"])
+OLD_INDEX = ("ix_attendance_records_date", ["date"])
+
+
+def _swap(create: tuple, drop: tuple) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(create[0], "attendance_records", create[1],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(drop[0], table_name="attendance_records",
+                          postgresql_concurrently=True, if_exists=True)
+    else:
+        op.create_index(create[0], "attendance_records", create[1])
+        op.drop_index(drop[0], table_name="attendance_records")
+
+
+def upgrade() -> None:
+    _swap(NEW_INDEX, OLD_INDEX)
+
+
+def downgrade() -> None:
+    _swap(OLD_INDEX, NEW_INDEX)
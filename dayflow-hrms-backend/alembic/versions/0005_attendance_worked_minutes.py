@@ -0,0 +1,50 @@
+"""worked and overtime minutes on attendance records
+
+Adds nullable worked_minutes and overtime_minutes to attendance_records. Both
+are metadata-only column additions, so the upgrade does not rewrite the table.
+New check-outs, admin edits and device uploads fill them in. On SQLite (local
+and development databases) existing rows are filled in by the upgrade itself;
+on PostgreSQL compute them with `python -m jobs.backfill_worked_minutes`, which
+works in short batches while the application is serving traffic.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('attendance_records', sa.Column('worked_minutes', sa.Integer(), nullable=True))
+    op.add_column('attendance_records', sa.Column('overtime_minutes', sa.Integer(), nullable=True))
+    if op.get_bind().dialect.name == "sqlite":
+        # Same arithmetic as attendance_hours.worked_minutes_sql / overtime_minutes_sql
+        op.execute(
+            "UPDATE attendance_records SET worked_minutes = "
+            "MAX(CAST((julianday(check_out) - julianday(check_in)) * 1440 + 1e-6 AS INTEGER), 0) "
+            "WHERE check_in IS NOT NULL AND check_out IS NOT NULL"
+        )
+        op.execute(
+            "UPDATE attendance_records SET overtime_minutes = "
+            f"MAX(worked_minutes - {int(settings.STANDARD_WORKDAY_MINUTES)}, 0) "
+            "WHERE worked_minutes IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('attendance_records') as batch_op:
+        batch_op.drop_column('overtime_minutes')
+        batch_op.drop_column('worked_minutes')
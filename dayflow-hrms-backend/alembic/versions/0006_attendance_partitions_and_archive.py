@@ -0,0 +1,110 @@
+"""attendance archive catalog; monthly partitions of attendance_records on PostgreSQL
+
+Creates attendance_archive_periods, the catalog of months that
+`python -m jobs.archive_attendance` moved to archive.attendance_records.
+
+On PostgreSQL attendance_records becomes a table partitioned by RANGE (date):
+one partition per month from the earliest record through three months ahead,
+plus a DEFAULT partition; the archival job keeps creating partitions ahead and
+drops archived ones. The rows are copied in one transaction, so run it in a
+maintenance window on large tables. A partitioned table's primary key must
+contain the partition key, so the key becomes (id, date); id stays unique
+through its sequence, and the ORM model keeps mapping id alone as the key
+(autogenerate on PostgreSQL reports that difference, which is expected).
+SQLite keeps a plain table; its archive is a separate attached database file.
+Downgrading does not move archived months back into attendance_records.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ("uq_attendance_records_user_id_date", "UNIQUE INDEX", "(user_id, date)"),
+    ("ix_attendance_records_date_user_id_status", "INDEX", "(date, user_id, status)"),
+    ("ix_attendance_records_id", "INDEX", "(id)"),
+)
+
+# Partition names match attendance_archive.partition_name()
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month_start date;
+BEGIN
+    SELECT date_trunc('month', coalesce(min(date), current_date))::date INTO month_start FROM {source};
+    WHILE month_start < (date_trunc('month', current_date) + interval '4 months')::date LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF attendance_records FOR VALUES FROM (%L) TO (%L)',
+            'attendance_records_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM'),
+            month_start, (month_start + interval '1 month')::date
+        );
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+END $$
+"""
+
+
+def _set_aside(suffix: str) -> str:
+    """Rename attendance_records with its key and indexes out of the way; returns the new name"""
+    old = f"attendance_records_{suffix}"
+    op.execute(f"ALTER TABLE attendance_records RENAME TO {old}")
+    op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT attendance_records_pkey TO {old}_pkey")
+    op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT attendance_records_user_id_fkey TO {old}_user_id_fkey")
+    for name, _, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_{suffix}")
+    return old
+
+
+def _recreate(old: str, partitioned: bool) -> None:
+    """Build attendance_records from `old`, copy the rows over and drop `old`"""
+    op.execute(
+        f"CREATE TABLE attendance_records (LIKE {old} INCLUDING DEFAULTS)"
+        + (" PARTITION BY RANGE (date)" if partitioned else "")
+    )
+    key = "(id, date)" if partitioned else "(id)"
+    op.execute(f"ALTER TABLE attendance_records ADD CONSTRAINT attendance_records_pkey PRIMARY KEY {key}")
+    op.execute(
+        "ALTER TABLE attendance_records ADD CONSTRAINT attendance_records_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+    for name, kind, columns in INDEXES:
+        op.execute(f"CREATE {kind} {name} ON attendance_records {columns}")
+    if partitioned:
+        op.execute(CREATE_MONTHLY_PARTITIONS.format(source=old))
+        op.execute("CREATE TABLE attendance_records_default PARTITION OF attendance_records DEFAULT")
+    op.execute(f"INSERT INTO attendance_records SELECT * FROM {old}")
+    # The id sequence belongs to the old table and would be dropped with it
+    op.execute("ALTER SEQUENCE attendance_records_id_seq OWNED BY attendance_records.id")
+    op.execute(f"DROP TABLE {old} CASCADE")
+
+
+def upgrade() -> None:
+    op.create_table('attendance_archive_periods',
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('period_end', sa.Date(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('purged_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('period_start')
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        _recreate(_set_aside("unpartitioned"), partitioned=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        _recreate(_set_aside("partitioned"), partitioned=False)
+    op.drop_table('attendance_archive_periods')
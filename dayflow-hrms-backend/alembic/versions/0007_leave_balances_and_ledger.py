@@ -0,0 +1,77 @@
+"""leave balances, leave ledger and accrual runs
+
+Adds leave_balances (accrued/taken/pending per user, leave type and year),
+leave_ledger (every change to those balances) and leave_accrual_runs (months
+credited by `python -m jobs.accrue_leave`). Balances of existing requests
+depend on WORKING_DAYS, so they are not backfilled here: run
+`python -m jobs.rebuild_leave_balances` once after upgrading.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 18:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LEAVE_TYPE = sa.Enum('SICK', 'CASUAL', 'ANNUAL', 'UNPAID', name='leavetype').with_variant(
+    # The type already exists on PostgreSQL (created with leave_requests)
+    postgresql.ENUM('SICK', 'CASUAL', 'ANNUAL', 'UNPAID', name='leavetype', create_type=False),
+    'postgresql',
+)
+
+
+def upgrade() -> None:
+    op.create_table('leave_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('leave_type', LEAVE_TYPE, nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('accrued', sa.Float(), nullable=False),
+    sa.Column('taken', sa.Float(), nullable=False),
+    sa.Column('pending', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'leave_type', 'year')
+    )
+    op.create_table('leave_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('leave_type', LEAVE_TYPE, nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('days', sa.Float(), nullable=False),
+    sa.Column('leave_request_id', sa.Integer(), nullable=True),
+    sa.Column('period', sa.Date(), nullable=True),
+    sa.Column('note', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['leave_request_id'], ['leave_requests.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_leave_ledger_user_id_year', 'leave_ledger', ['user_id', 'year'], unique=False)
+    op.create_table('leave_accrual_runs',
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('employees', sa.Integer(), nullable=False),
+    sa.Column('ran_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('period')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leave_accrual_runs')
+    op.drop_index('ix_leave_ledger_user_id_year', table_name='leave_ledger')
+    op.drop_table('leave_ledger')
+    op.drop_table('leave_balances')
@@ -0,0 +1,41 @@
+"""leave request date-range index
+
+Adds (user_id, start_date, end_date) on leave_requests for the overlap check
+on leave creation and the "who is on leave" lookup: both seek on the user and
+range-scan start_date, filtering end_date from the index. On PostgreSQL the
+index is built concurrently.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 20:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX = ("ix_leave_requests_user_id_start_date_end_date", ["user_id", "start_date", "end_date"])
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(INDEX[0], "leave_requests", INDEX[1], postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index(INDEX[0], "leave_requests", INDEX[1])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(INDEX[0], table_name="leave_requests", postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(INDEX[0], table_name="leave_requests")
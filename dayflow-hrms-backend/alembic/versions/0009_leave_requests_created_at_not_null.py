@@ -0,0 +1,38 @@
+"""leave_requests.created_at NOT NULL
+
+Leave list pages seek on (created_at, id). A row-value comparison against a
+NULL created_at is never true, so such rows silently dropped out of every page
+after the first. Backfills NULLs from updated_at (or now) and makes the column
+NOT NULL; on SQLite the table is rebuilt in batch mode.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE leave_requests SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL"
+    )
+    with op.batch_alter_table('leave_requests') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True),
+                              existing_server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('leave_requests') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True),
+                              existing_server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True)
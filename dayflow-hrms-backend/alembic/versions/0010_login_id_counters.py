@@ -0,0 +1,53 @@
+"""login_id_counters, seeded from issued login IDs
+
+Login-ID serials come from one counter row per (company prefix, joining year).
+Rows are seeded with the highest serial already issued in each year, from both
+users and master_employees, so new IDs continue after the existing ones.
+Databases upgraded through an earlier copy of 0001 that already created the
+table keep it, and only the missing years are seeded.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql or not sa.inspect(op.get_bind()).has_table('login_id_counters'):
+        op.create_table('login_id_counters',
+        sa.Column('prefix', sa.String(), nullable=False),
+        sa.Column('joining_year', sa.Integer(), nullable=False),
+        sa.Column('last_serial', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('prefix', 'joining_year')
+        )
+    prefix = (settings.COMPANY_PREFIX or "OI").replace("'", "''")
+    op.execute(
+        "INSERT INTO login_id_counters (prefix, joining_year, last_serial) "
+        f"SELECT '{prefix}', issued.joining_year, MAX(issued.joining_serial) FROM ("
+        "SELECT joining_year, joining_serial FROM users "
+        "UNION ALL SELECT joining_year, joining_serial FROM master_employees"
+        ") issued "
+        "WHERE issued.joining_year IS NOT NULL AND issued.joining_serial IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM login_id_counters c "
+        f"WHERE c.prefix = '{prefix}' AND c.joining_year = issued.joining_year) "
+        "GROUP BY issued.joining_year"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('login_id_counters')
@@ -0,0 +1,227 @@
+"""
+Hot/archive split of attendance_records: closed months live in archive.attendance_records
+
+The archive is the "archive" schema on PostgreSQL and a database attached as "archive"
+to every SQLite connection (see database.py). attendance_archive_periods records which
+months were moved; reads whose date range reaches them go through attendance_source(),
+which unions the hot table with the archive only when it has to.
+"""
+import calendar
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, select, text, union_all, update
+from sqlalchemy.orm import aliased
+from attendance_stats import period_start
+from cache import TTLCache
+from config import settings
+from database import attach_sqlite_archive, dialect_insert, sqlite_archive_path
+from models import AttendanceArchivePeriod, AttendanceRecord
+
+ARCHIVE_SCHEMA = "archive"
+CATALOG_KEY = "archived_through"
+
+
+def _archive_table() -> Table:
+    source = AttendanceRecord.__table__
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False, nullable=column.nullable)
+        for column in source.c
+    ]
+    # No foreign key: on SQLite the archive is a separate database file
+    return Table(
+        source.name, MetaData(), *columns,
+        Index("uq_archive_attendance_user_id_date", "user_id", "date", unique=True),
+        Index("ix_archive_attendance_date_user_id_status", "date", "user_id", "status"),
+        schema=ARCHIVE_SCHEMA,
+        postgresql_tablespace=settings.ATTENDANCE_ARCHIVE_TABLESPACE or None,
+    )
+
+
+archive_records = _archive_table()
+# Last archived day, shared by all requests; the archival job waits out the TTL before purging
+archive_catalog = TTLCache(maxsize=1, ttl=settings.ARCHIVE_CATALOG_TTL_SECONDS)
+_THROUGH = select(func.max(AttendanceArchivePeriod.period_end))
+
+
+async def archived_through(db) -> Optional[date]:
+    """Last day held in the archive (None when nothing is archived)"""
+    cached = archive_catalog.get(CATALOG_KEY)
+    if cached is None:
+        cached = (await db.scalar(_THROUGH),)
+        archive_catalog.set(CATALOG_KEY, cached)
+    return cached[0]
+
+
+def archived_through_sync(db) -> Optional[date]:
+    """archived_through for sync sessions (report exports, jobs)"""
+    cached = archive_catalog.get(CATALOG_KEY)
+    if cached is None:
+        cached = (db.scalar(_THROUGH),)
+        archive_catalog.set(CATALOG_KEY, cached)
+    return cached[0]
+
+
+def attendance_source(through: Optional[date], start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Entity to select attendance from for a date range: the hot table alone unless the range
+    reaches archived days, then the archive (wholly archived range) or hot UNION ALL archive
+
+    The result is AttendanceRecord or an alias of it, so queries written against its
+    attributes work unchanged; rows loaded from the archive are read-only copies.
+    """
+    if through is None or (start_date is not None and start_date > through):
+        return AttendanceRecord
+    if end_date is not None and end_date <= through:
+        return aliased(AttendanceRecord, select(archive_records).subquery("attendance_records"), adapt_on_names=True)
+    hot = select(AttendanceRecord.__table__).where(AttendanceRecord.date > through)
+    cold = select(archive_records).where(archive_records.c.date <= through)
+    return aliased(AttendanceRecord, union_all(hot, cold).subquery("attendance_records"), adapt_on_names=True)
+
+
+async def records_for_range(db, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """attendance_source() for the current archive boundary"""
+    return attendance_source(await archived_through(db), start_date, end_date)
+
+
+async def get_archived_record(db, record_id: int) -> Optional[AttendanceRecord]:
+    """A record from the archive by id (None when not archived)"""
+    if await archived_through(db) is None:
+        return None
+    archived = aliased(AttendanceRecord, select(archive_records).subquery("attendance_records"), adapt_on_names=True)
+    return await db.scalar(select(archived).where(archived.id == record_id))
+
+
+async def delete_archived_user_records(db, user_id: int) -> None:
+    if await archived_through(db) is not None:
+        await db.execute(delete(archive_records).where(archive_records.c.user_id == user_id))
+
+
+# Maintenance used by jobs.archive_attendance (sync sessions on the primary)
+
+def month_bounds(first: date) -> tuple:
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def add_months(first: date, months: int) -> date:
+    index = first.year * 12 + first.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(first: date) -> str:
+    """Monthly partition of attendance_records on PostgreSQL (same naming as migration 0006)"""
+    return f"attendance_records_y{first:%Y}m{first:%m}"
+
+
+def is_partitioned(db) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    return bool(db.scalar(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'attendance_records'::regclass"
+    )))
+
+
+def ensure_partitions(db, first: date, months: int) -> list:
+    """Create missing monthly partitions from `first` for `months` months; returns the new names"""
+    existing = set(db.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'attendance_records'::regclass"
+    )))
+    created = []
+    for offset in range(months):
+        start = add_months(first, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        bounds = {"start": start, "end": add_months(start, 1)}
+        # Rows for the month that already landed in the default partition have to move with it
+        stray = db.scalar(text(
+            "SELECT count(*) FROM attendance_records_default WHERE date >= :start AND date < :end"
+        ), bounds)
+        if stray:
+            db.execute(text("CREATE TEMPORARY TABLE attendance_records_moving (LIKE attendance_records) ON COMMIT DROP"))
+            db.execute(text(
+                "WITH moved AS (DELETE FROM attendance_records_default WHERE date >= :start AND date < :end RETURNING *) "
+                "INSERT INTO attendance_records_moving SELECT * FROM moved"
+            ), bounds)
+        db.execute(text(
+            f'CREATE TABLE "{name}" PARTITION OF attendance_records '
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        ))
+        if stray:
+            db.execute(text("INSERT INTO attendance_records SELECT * FROM attendance_records_moving"))
+            db.execute(text("DROP TABLE attendance_records_moving"))
+        created.append(name)
+    return created
+
+
+def ensure_archive_storage(db) -> None:
+    """Create the archive schema (PostgreSQL) or attached archive file (SQLite) and archive table if missing"""
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    elif db.bind.dialect.name == "sqlite":
+        connection = db.connection().connection
+        if not connection.info.get("archive_attached"):
+            archive = sqlite_archive_path(db.bind.url.database)
+            attach_sqlite_archive(connection.dbapi_connection, connection.info, archive)
+    archive_records.create(db.connection(), checkfirst=True)
+
+
+def closed_months(db, before: date) -> list:
+    """First days of the months with hot records dated before `before` (a month start)"""
+    month = period_start(AttendanceRecord.date, "month", db.get_bind().dialect)
+    query = select(month).where(AttendanceRecord.date < before).group_by(month).order_by(month)
+    return list(db.scalars(query))
+
+
+def copy_month(db, first: date) -> int:
+    """Copy one month of hot records into the archive and catalog it; safe to re-run"""
+    first, last = month_bounds(first)
+    hot = AttendanceRecord.__table__
+    rows = select(hot).where(hot.c.date.between(first, last))
+    insert = dialect_insert(db.bind)
+    db.execute(
+        insert(archive_records)
+        .from_select([column.name for column in hot.c], rows)
+        .on_conflict_do_nothing()
+    )
+    count = db.scalar(
+        select(func.count()).select_from(archive_records).where(archive_records.c.date.between(first, last))
+    )
+    db.execute(
+        insert(AttendanceArchivePeriod)
+        .values(period_start=first, period_end=last, row_count=count)
+        .on_conflict_do_update(
+            index_elements=["period_start"], set_={"row_count": count, "archived_at": func.now(), "purged_at": None}
+        )
+    )
+    return count
+
+
+def purge_month(db, first: date) -> int:
+    """Remove an archived month from the hot table (drops its partition on PostgreSQL)"""
+    first, last = month_bounds(first)
+    hot = AttendanceRecord.__table__
+    removed = db.scalar(select(func.count()).select_from(hot).where(hot.c.date.between(first, last)))
+    if is_partitioned(db):
+        db.execute(text(f'DROP TABLE IF EXISTS "{partition_name(first)}"'))
+    db.execute(delete(hot).where(hot.c.date.between(first, last)))
+    db.execute(
+        update(AttendanceArchivePeriod)
+        .where(AttendanceArchivePeriod.period_start == first)
+        .values(purged_at=func.now())
+    )
+    return removed
+
+
+def unpurged_months(db, archived_before: datetime) -> list:
+    """Catalogued months still present in the hot table, archived before `archived_before`"""
+    return list(db.scalars(
+        select(AttendanceArchivePeriod.period_start)
+        .where(AttendanceArchivePeriod.purged_at.is_(None), AttendanceArchivePeriod.archived_at <= archived_before)
+        .order_by(AttendanceArchivePeriod.period_start)
+    ))
+
+
+def hot_cutoff(hot_months: int, today: Optional[date] = None) -> date:
+    """First day kept hot: months before it are closed and may be archived"""
+    today = today or date.today()
+    return add_months(today.replace(day=1), -hot_months)
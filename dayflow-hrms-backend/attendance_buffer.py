@@ -0,0 +1,425 @@
+"""
+Write-behind check-in/check-out: validated against an in-memory map of today's records,
+acknowledged immediately and flushed to attendance_records in batched transactions
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, OperationalError
+from config import settings
+from attendance_hours import hours_columns
+from attendance_ingest import attendance_upsert_statement
+from attendance_summary import SummaryContribution, increment_summary_statement, rebuild_summary, summary_delta_rows
+from database import SessionLocal
+from models import AttendanceRecord, AttendanceStatus, User
+
+logger = logging.getLogger("dayflow.attendance_buffer")
+
+# memory: ack once queued (a crash loses the unflushed window)
+# journal: ack once appended to the journal file (survives a process crash)
+# fsync: ack once the journal append is fsynced (survives power loss)
+# commit: ack once the batch holding the punch has committed (group commit)
+DURABILITY_MODES = ("memory", "journal", "fsync", "commit")
+RETRY_DELAY_SECONDS = 1.0
+
+
+class DayState(NamedTuple):
+    """One employee's attendance record for the current day, as the database will hold it"""
+    status: AttendanceStatus
+    check_in: Optional[datetime]
+    check_out: Optional[datetime]
+
+
+class BufferedPunch(NamedTuple):
+    user_id: int
+    date: date
+    direction: str
+    at: datetime
+    before: Optional[DayState]
+    after: DayState
+
+
+def _contribution(day: date, state: Optional[DayState]) -> Optional[SummaryContribution]:
+    if state is None:
+        return None
+    return SummaryContribution(day, state.status, state.check_in is not None, state.check_out is not None)
+
+
+def _record_rows(punches) -> list[dict]:
+    """One upsert row per (user_id, date), earliest check-in and latest check-out"""
+    rows: dict[tuple, dict] = {}
+    for user_id, day, direction, at in punches:
+        row = rows.setdefault((user_id, day), {
+            "user_id": user_id,
+            "date": day,
+            "check_in": None,
+            "check_out": None,
+            "status": AttendanceStatus.PRESENT,
+        })
+        if direction == "in":
+            if row["check_in"] is None or at < row["check_in"]:
+                row["check_in"] = at
+        elif row["check_out"] is None or at > row["check_out"]:
+            row["check_out"] = at
+    return [{**row, **hours_columns(row["check_in"], row["check_out"])} for row in rows.values()]
+
+
+def _summary_rows(punches: list[BufferedPunch], departments: dict[int, Optional[str]]) -> list[dict]:
+    totals: dict[tuple, dict] = {}
+    for punch in punches:
+        for row in summary_delta_rows(
+            departments.get(punch.user_id),
+            _contribution(punch.date, punch.before),
+            _contribution(punch.date, punch.after),
+        ):
+            key = (row["date"], row["department"], row["status"])
+            if key in totals:
+                for column in ("headcount", "checked_in", "checked_out"):
+                    totals[key][column] += row[column]
+            else:
+                totals[key] = row
+    return [row for row in totals.values() if row["headcount"] or row["checked_in"] or row["checked_out"]]
+
+
+class AttendanceWriteBehind:
+    """Today-state map, flush thread and optional journal behind the check-in/check-out routes
+
+    The map is per process: run a single worker (or route each employee to one worker)
+    when ATTENDANCE_WRITE_BEHIND is on.
+    """
+
+    def __init__(self, durability: str, interval_ms: int, max_batch: int, journal_path: str):
+        durability = durability.lower()
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"ATTENDANCE_WRITE_BEHIND_DURABILITY must be one of {', '.join(DURABILITY_MODES)}; got {durability!r}"
+            )
+        self.durability = durability
+        self.interval = max(interval_ms, 0) / 1000
+        self.max_batch = max(max_batch, 1)
+        self.journal_path = journal_path
+        self.running = False
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._states: dict[int, DayState] = {}
+        self._stale: set[int] = set()
+        self._reload = False
+        # user_id -> punches queued but not yet committed; their map entries survive reloads
+        self._pending: dict[int, int] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self._journaled = 0
+        self._journal_committed = 0
+        self.flushed_batches = 0
+        self.flushed_punches = 0
+        self.dropped_punches = 0
+
+    @property
+    def journaling(self) -> bool:
+        return self.durability in ("journal", "fsync")
+
+    # Lifecycle
+
+    def start(self) -> int:
+        """Replay the journal, load today's records into the map and start flushing"""
+        replayed = 0
+        if self.journaling:
+            replayed = self._replay_journal()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        today = date.today()
+        states = self._load(today)
+        with self._lock:
+            self._day, self._states, self._stale = today, states, set()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="attendance-write-behind", daemon=True)
+        self._thread.start()
+        self.running = True
+        return replayed
+
+    def stop(self) -> None:
+        """Stop accepting punches, flush everything queued and close the journal"""
+        if not self.running:
+            return
+        self.running = False
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "durability": self.durability,
+            "queued": self._queue.qsize(),
+            "tracked_employees": len(self._states),
+            "flushed_batches": self.flushed_batches,
+            "flushed_punches": self.flushed_punches,
+            "dropped_punches": self.dropped_punches,
+        }
+
+    # Today-state map
+
+    def _load(self, day: date, user_id: Optional[int] = None) -> dict[int, DayState]:
+        query = select(
+            AttendanceRecord.user_id, AttendanceRecord.status, AttendanceRecord.check_in, AttendanceRecord.check_out
+        ).where(AttendanceRecord.date == day)
+        if user_id is not None:
+            query = query.where(AttendanceRecord.user_id == user_id)
+        with SessionLocal() as db:
+            return {
+                row_user_id: DayState(AttendanceStatus(record_status or AttendanceStatus.PRESENT), check_in, check_out)
+                for row_user_id, record_status, check_in, check_out in db.execute(query)
+            }
+
+    def _refresh(self, day: date, user_id: int) -> None:
+        # Queries run outside the lock so the event loop never waits on the database
+        if self._day != day or self._reload:
+            states = self._load(day)
+            with self._lock:
+                if self._day == day:
+                    states.update((pending, self._states[pending]) for pending in self._pending if pending in self._states)
+                self._day, self._states, self._stale, self._reload = day, states, set(), False
+        if user_id in self._stale:
+            state = self._load(day, user_id).get(user_id)
+            with self._lock:
+                self._stale.discard(user_id)
+                if user_id in self._pending:
+                    return
+                if state is None:
+                    self._states.pop(user_id, None)
+                else:
+                    self._states[user_id] = state
+
+    def forget(self, user_id: Optional[int] = None) -> None:
+        """Reload a user's state (everyone's when None) from the database before their next punch
+
+        Call after anything other than this buffer writes today's attendance records.
+        """
+        if self.running:
+            with self._lock:
+                if user_id is None:
+                    self._reload = True
+                else:
+                    self._stale.add(user_id)
+
+    # Punches
+
+    async def punch(self, user, direction: str) -> dict:
+        """Validate a check-in ("in") or check-out ("out") for today and queue it"""
+        if not self.running:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Attendance is shutting down")
+        today = date.today()
+        if self._day != today or self._reload or user.id in self._stale:
+            await run_in_threadpool(self._refresh, today, user.id)
+
+        with self._lock:
+            before = self._states.get(user.id)
+            now = datetime.now()
+            if direction == "in":
+                if before and before.check_in:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already checked in today")
+                # Mirrors the upsert: an absence becomes present, other statuses are kept
+                record_status = (
+                    before.status if before and before.status != AttendanceStatus.ABSENT else AttendanceStatus.PRESENT
+                )
+                after = DayState(record_status, now, before.check_out if before else None)
+            else:
+                if before is None or before.check_in is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST, detail="Must check in before checking out"
+                    )
+                if before.check_out:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already checked out today")
+                after = before._replace(check_out=now)
+            self._states[user.id] = after
+            self._pending[user.id] = self._pending.get(user.id, 0) + 1
+            punch = BufferedPunch(user.id, today, direction, now, before, after)
+            if self.journaling:
+                self._append_journal(punch)
+
+        if self.durability == "commit":
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._queue.put((punch, (loop, waiter)))
+            await waiter
+        else:
+            self._queue.put((punch, None))
+        return {
+            "user_id": user.id,
+            "date": today,
+            "status": after.status,
+            "check_in": after.check_in,
+            "check_out": after.check_out,
+            "durability": self.durability,
+        }
+
+    # Journal
+
+    def _append_journal(self, punch: BufferedPunch) -> None:
+        line = json.dumps([punch.user_id, punch.date.isoformat(), punch.direction, punch.at.isoformat()])
+        self._journal.write(line + "\n")
+        self._journal.flush()
+        if self.durability == "fsync":
+            os.fsync(self._journal.fileno())
+        self._journaled += 1
+
+    def _journal_flushed(self, count: int) -> None:
+        with self._lock:
+            self._journal_committed += count
+            # Every appended punch is in the database: start the journal over
+            if self._journal_committed == self._journaled:
+                self._journal.seek(0)
+                self._journal.truncate()
+                self._journaled = self._journal_committed = 0
+
+    def _replay_journal(self) -> int:
+        """Re-apply punches acknowledged before a crash; upserts make replays idempotent"""
+        if not os.path.exists(self.journal_path):
+            return 0
+        punches = []
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    user_id, day, direction, at = json.loads(line)
+                    punches.append((user_id, date.fromisoformat(day), direction, datetime.fromisoformat(at)))
+                except (ValueError, TypeError):
+                    # A torn final line from the crash was never acknowledged
+                    continue
+        if punches:
+            days = [day for _, day, _, _ in punches]
+            with SessionLocal() as db:
+                db.execute(attendance_upsert_statement(db.bind), _record_rows(punches))
+                # Some of these batches may have committed already; recount instead of adding deltas
+                rebuild_summary(db, min(days), max(days))
+                db.commit()
+            logger.info("replayed %d journaled punches", len(punches))
+        os.truncate(self.journal_path, 0)
+        return len(punches)
+
+    # Flushing
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            # Gather whatever arrives within the flush interval into the same transaction
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _write(self, punches: list[BufferedPunch]) -> None:
+        with SessionLocal() as db:
+            db.execute(
+                attendance_upsert_statement(db.bind),
+                _record_rows((punch.user_id, punch.date, punch.direction, punch.at) for punch in punches),
+            )
+            # Read in the write transaction: the caller's principal snapshot may predate a department change
+            departments = dict(db.execute(
+                select(User.id, User.department).where(User.id.in_({punch.user_id for punch in punches}))
+            ).all())
+            summary_rows = _summary_rows(punches, departments)
+            if summary_rows:
+                db.execute(increment_summary_statement(db.bind), summary_rows)
+            db.commit()
+
+    def _write_or_split(self, batch: list) -> list:
+        """Write a batch, retrying transient errors; returns the entries dropped as unwritable
+
+        A batch failing for any other reason (e.g. a foreign key violation after the user was
+        deleted, or a DataError) is split in halves until the offending punches are isolated.
+        """
+        punches = [punch for punch, _ in batch]
+        while True:
+            try:
+                self._write(punches)
+                return []
+            except Exception as exc:
+                if not _transient(exc):
+                    if len(batch) == 1:
+                        logger.exception("dropping unwritable attendance punch %s", punches[0])
+                        return batch
+                    middle = len(batch) // 2
+                    return self._write_or_split(batch[:middle]) + self._write_or_split(batch[middle:])
+                if self._stopping.is_set():
+                    raise
+                # Punches were already acknowledged: keep the batch and retry until the database is back
+                logger.exception("attendance flush of %d punches failed; retrying", len(punches))
+                time.sleep(RETRY_DELAY_SECONDS)
+
+    def _flush(self, batch: list) -> None:
+        try:
+            dropped = self._write_or_split(batch)
+        except Exception:
+            # Shutting down with the database unreachable: journaled punches replay on the next start
+            logger.exception("attendance flush of %d punches failed during shutdown", len(batch))
+            for _, waiter in batch:
+                if waiter is not None:
+                    loop, future = waiter
+                    loop.call_soon_threadsafe(_fail, future)
+            return
+        dropped_ids = {id(entry) for entry in dropped}
+        with self._lock:
+            for punch, _ in batch:
+                remaining = self._pending.pop(punch.user_id, 1) - 1
+                if remaining:
+                    self._pending[punch.user_id] = remaining
+            # The map assumed these punches would be written: reload those users from the database
+            self._stale.update(punch.user_id for punch, _ in dropped)
+        self.flushed_batches += 1
+        self.flushed_punches += len(batch) - len(dropped)
+        self.dropped_punches += len(dropped)
+        if self.journaling:
+            # Dropped punches would fail again on replay; they are logged instead
+            self._journal_flushed(len(batch))
+        for entry in batch:
+            _, waiter = entry
+            if waiter is not None:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_fail if id(entry) in dropped_ids else _resolve, future)
+
+
+def _transient(exc: Exception) -> bool:
+    """Errors worth retrying the same batch for: lost connections, locks, the database being down"""
+    return isinstance(exc, OperationalError) or (isinstance(exc, DBAPIError) and exc.connection_invalidated)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _fail(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_exception(HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Attendance could not be saved; try again"
+        ))
+
+
+attendance_buffer = AttendanceWriteBehind(
+    settings.ATTENDANCE_WRITE_BEHIND_DURABILITY,
+    settings.ATTENDANCE_FLUSH_INTERVAL_MS,
+    settings.ATTENDANCE_FLUSH_MAX_BATCH,
+    settings.ATTENDANCE_JOURNAL_PATH,
+)
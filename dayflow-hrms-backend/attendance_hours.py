@@ -0,0 +1,112 @@
+"""
+Worked and overtime minutes stored on attendance records, and SQL-side hour totals
+"""
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import Integer, and_, case, cast, func, select, update
+from attendance_archive import records_for_range
+from config import settings
+from models import AttendanceRecord, User
+
+
+def _naive(value: datetime) -> datetime:
+    # Same convention as check-in and device ingestion: naive server-local time
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def compute_minutes(check_in: Optional[datetime], check_out: Optional[datetime]) -> tuple:
+    """(worked_minutes, overtime_minutes), or (None, None) until both punches exist"""
+    if check_in is None or check_out is None:
+        return None, None
+    worked = max(int((_naive(check_out) - _naive(check_in)).total_seconds() // 60), 0)
+    return worked, max(worked - settings.STANDARD_WORKDAY_MINUTES, 0)
+
+
+def hours_columns(check_in: Optional[datetime], check_out: Optional[datetime]) -> dict:
+    worked, overtime = compute_minutes(check_in, check_out)
+    return {"worked_minutes": worked, "overtime_minutes": overtime}
+
+
+def apply_worked_minutes(record: AttendanceRecord) -> None:
+    """Refresh a record's worked/overtime minutes from its check-in and check-out"""
+    record.worked_minutes, record.overtime_minutes = compute_minutes(record.check_in, record.check_out)
+
+
+def _excess(value, bound, dialect):
+    # max(value - bound, 0) that stays NULL for NULL input (GREATEST would turn it into 0)
+    least = func.least if dialect.name == "postgresql" else func.min
+    return value - least(value, bound)
+
+
+def worked_minutes_sql(check_in, check_out, dialect):
+    """SQL twin of compute_minutes for set-based updates (NULL until both punches exist)"""
+    if dialect.name == "postgresql":
+        elapsed = cast(func.floor(func.extract("epoch", check_out - check_in) / 60), Integer)
+    else:
+        # julianday() is a float; nudge before truncating so whole minutes do not round down
+        elapsed = cast((func.julianday(check_out) - func.julianday(check_in)) * 1440 + 1e-6, Integer)
+    return _excess(elapsed, 0, dialect)
+
+
+def overtime_minutes_sql(worked, dialect):
+    return _excess(worked, settings.STANDARD_WORKDAY_MINUTES, dialect)
+
+
+def backfill_statement(dialect, first_id: int, last_id: int, recompute: bool = False):
+    """UPDATE computing the minutes for records with both punches in an id range, in `dialect`'s SQL"""
+    table = AttendanceRecord.__table__
+    worked = worked_minutes_sql(table.c.check_in, table.c.check_out, dialect)
+    conditions = [
+        table.c.id.between(first_id, last_id),
+        table.c.check_in.isnot(None),
+        table.c.check_out.isnot(None),
+    ]
+    if not recompute:
+        conditions.append(table.c.worked_minutes.is_(None))
+    return (
+        update(table)
+        .where(and_(*conditions))
+        # A derived-column fill is not an edit: leave updated_at alone
+        .values(worked_minutes=worked, overtime_minutes=overtime_minutes_sql(worked, dialect), updated_at=table.c.updated_at)
+    )
+
+
+def _totals(records):
+    return (
+        func.count(records.worked_minutes).label("days_worked"),
+        func.coalesce(func.sum(records.worked_minutes), 0).label("worked_minutes"),
+        func.coalesce(func.sum(records.overtime_minutes), 0).label("overtime_minutes"),
+    )
+
+
+async def employee_hours(db, start_date: date, end_date: date, department: Optional[str] = None) -> list:
+    """Worked and overtime minutes per employee over a date range, summed in SQL"""
+    records = await records_for_range(db, start_date, end_date)
+    query = (
+        select(User.id.label("user_id"), User.employee_id, User.full_name, User.department, *_totals(records))
+        .join(records, records.user_id == User.id)
+        .where(records.date.between(start_date, end_date))
+        .group_by(User.id, User.employee_id, User.full_name, User.department)
+        .order_by(User.employee_id, User.id)
+    )
+    if department is not None:
+        query = query.where(User.department == department)
+    return [row._asdict() for row in await db.execute(query)]
+
+
+async def department_hours(db, start_date: date, end_date: date) -> list:
+    """Worked and overtime minutes per department over a date range, summed in SQL"""
+    records = await records_for_range(db, start_date, end_date)
+    department = func.coalesce(User.department, "").label("department")
+    employees = func.count(func.distinct(
+        case((records.worked_minutes.isnot(None), records.user_id))
+    )).label("employees")
+    query = (
+        select(department, employees, *_totals(records))
+        .select_from(records)
+        .join(User, User.id == records.user_id)
+        .where(records.date.between(start_date, end_date))
+        .group_by(department)
+        .order_by(department)
+    )
+    return [row._asdict() for row in await db.execute(query)]
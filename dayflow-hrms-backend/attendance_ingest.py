@@ -0,0 +1,270 @@
+"""
+Bulk ingestion of device punches: streamed NDJSON/CSV parsing, cached employee lookup and batched upserts
+"""
+import asyncio
+import csv
+import json
+import time
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable, NamedTuple, Optional
+from sqlalchemy import case, func, select
+from cache import TTLCache
+from config import settings
+from attendance_archive import archived_through
+from attendance_hours import hours_columns, overtime_minutes_sql, worked_minutes_sql
+from attendance_summary import refresh_summary_days
+from database import dialect_insert
+from models import AttendanceRecord, AttendanceStatus, User
+
+PUNCH_FIELDS = ("employee_id", "timestamp", "direction")
+DIRECTIONS = {"in": "in", "out": "out", "check_in": "in", "check_out": "out", "i": "in", "o": "out"}
+MAX_ERRORS_PER_BATCH = 20
+
+# employee_id -> user_id for active users; misses are resolved in one query per batch
+employee_directory = TTLCache(
+    maxsize=settings.EMPLOYEE_LOOKUP_CACHE_MAX_ENTRIES,
+    ttl=settings.EMPLOYEE_LOOKUP_CACHE_TTL_SECONDS,
+)
+
+
+class Punch(NamedTuple):
+    employee_id: str
+    timestamp: datetime
+    direction: str
+
+
+def invalidate_employee_lookup(user_id: int) -> int:
+    """Forget cached employee_id mappings for a user (call when a user is removed or deactivated)"""
+    return employee_directory.discard_where(lambda cached_user_id: cached_user_id == user_id)
+
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    # Stored like the interactive check-in path: naive server-local time
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _make_punch(employee_id, timestamp, direction) -> Punch:
+    if not employee_id:
+        raise ValueError("missing employee_id")
+    normalized = DIRECTIONS.get(str(direction).strip().lower())
+    if normalized is None:
+        raise ValueError(f"unknown direction {direction!r}")
+    return Punch(str(employee_id).strip(), _parse_timestamp(timestamp), normalized)
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterable[Punch | str]:
+    """Yield a Punch per line, or an error message for lines that cannot be parsed"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            yield _make_punch(item.get("employee_id"), item.get("timestamp"), item.get("direction"))
+        except (ValueError, TypeError, AttributeError) as e:
+            yield f"{e.__class__.__name__}: {e}"
+
+
+class CsvPunchParser:
+    """Parses CSV punch lines across chunks; a leading employee_id,timestamp,direction header is optional"""
+
+    def __init__(self):
+        self.columns: Optional[tuple[int, int, int]] = None
+
+    def __call__(self, lines: Iterable[str]) -> Iterable[Punch | str]:
+        for row in csv.reader(lines):
+            if not row or not any(row):
+                continue
+            if self.columns is None:
+                header = [field.strip().lower() for field in row]
+                self.columns = (0, 1, 2)
+                if set(PUNCH_FIELDS) <= set(header):
+                    self.columns = tuple(header.index(field) for field in PUNCH_FIELDS)
+                    continue
+            try:
+                yield _make_punch(*(row[i] for i in self.columns))
+            except (ValueError, IndexError) as e:
+                yield f"{e.__class__.__name__}: {e}"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """Re-split a streamed request body into lists of complete lines, one list per chunk"""
+    pending = b""
+    first = True
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        end = pending.rfind(b"\n")
+        if end < 0:
+            continue
+        # Decode each chunk once rather than line by line; only the first may carry a BOM
+        text = pending[:end].decode("utf-8-sig" if first else "utf-8")
+        pending = pending[end + 1:]
+        first = False
+        yield text.split("\n")
+    if pending.strip():
+        yield [pending.decode("utf-8-sig" if first else "utf-8")]
+
+
+async def resolve_user_ids(db, employee_ids: set[str]) -> dict[str, int]:
+    """Map employee IDs to active user IDs, querying only the IDs missing from the cache"""
+    resolved, missing = {}, []
+    for employee_id in employee_ids:
+        user_id = employee_directory.get(employee_id)
+        if user_id is None:
+            missing.append(employee_id)
+        else:
+            resolved[employee_id] = user_id
+    if missing:
+        rows = (await db.execute(
+            select(User.employee_id, User.id).where(User.employee_id.in_(missing), User.is_active.is_(True))
+        )).all()
+        for employee_id, user_id in rows:
+            employee_directory.set(employee_id, user_id)
+            resolved[employee_id] = user_id
+    return resolved
+
+
+def aggregate_punches(punches: list[Punch], user_ids: dict[str, int]) -> dict[tuple[int, date], list]:
+    """Collapse punches to one [first in, last out] pair per (user_id, date)"""
+    days: dict[tuple[int, date], list] = {}
+    for punch in punches:
+        user_id = user_ids.get(punch.employee_id)
+        if user_id is None:
+            continue
+        key = (user_id, punch.timestamp.date())
+        span = days.get(key)
+        if span is None:
+            span = days[key] = [None, None]
+        if punch.direction == "in":
+            if span[0] is None or punch.timestamp < span[0]:
+                span[0] = punch.timestamp
+        elif span[1] is None or punch.timestamp > span[1]:
+            span[1] = punch.timestamp
+    return days
+
+
+def attendance_upsert_statement(bind):
+    """Upsert on (user_id, date) merging punches into the earliest check-in and latest check-out"""
+    table = AttendanceRecord.__table__
+    stmt = dialect_insert(bind)(table)
+    excluded = stmt.excluded
+    earliest = func.least if bind.dialect.name == "postgresql" else func.min
+    latest = func.greatest if bind.dialect.name == "postgresql" else func.max
+    # Keep the earliest check-in and latest check-out seen so far; replays are idempotent
+    check_in = earliest(
+        func.coalesce(table.c.check_in, excluded.check_in),
+        func.coalesce(excluded.check_in, table.c.check_in),
+    )
+    check_out = latest(
+        func.coalesce(table.c.check_out, excluded.check_out),
+        func.coalesce(excluded.check_out, table.c.check_out),
+    )
+    worked = worked_minutes_sql(check_in, check_out, bind.dialect)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.date],
+        set_={
+            "check_in": check_in,
+            "check_out": check_out,
+            "worked_minutes": worked,
+            "overtime_minutes": overtime_minutes_sql(worked, bind.dialect),
+            "status": case(
+                (table.c.status == AttendanceStatus.ABSENT, excluded.status),
+                else_=table.c.status,
+            ),
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def ingest_batch(db, number: int, punches: list[Punch], errors: list[str]) -> dict:
+    """Resolve, aggregate and upsert one batch of punches in a single transaction"""
+    started = time.perf_counter()
+    received, invalid = len(punches) + len(errors), len(errors)
+    through = await archived_through(db)
+    if through is not None:
+        # Archived months are read-only: an upsert would land in the hot table, behind the archive
+        hot = [punch for punch in punches if punch.timestamp.date() > through]
+        if len(hot) < len(punches):
+            invalid += len(punches) - len(hot)
+            errors = errors + [f"{len(punches) - len(hot)} punches dated on or before {through}: period is archived"]
+            punches = hot
+    user_ids = await resolve_user_ids(db, {punch.employee_id for punch in punches})
+    unknown = sorted({punch.employee_id for punch in punches} - user_ids.keys())
+    days = aggregate_punches(punches, user_ids)
+    if days:
+        await db.execute(
+            attendance_upsert_statement(db.bind),
+            [
+                {
+                    "user_id": user_id,
+                    "date": day,
+                    "check_in": check_in,
+                    "check_out": check_out,
+                    "status": AttendanceStatus.PRESENT,
+                    **hours_columns(check_in, check_out),
+                }
+                for (user_id, day), (check_in, check_out) in days.items()
+            ],
+        )
+        # Upserts do not report the prior row state, so recount the touched days
+        await refresh_summary_days(db, {day for _, day in days})
+        await db.commit()
+    return {
+        "batch": number,
+        "punches": received,
+        "applied": sum(1 for punch in punches if punch.employee_id in user_ids),
+        "invalid": invalid,
+        "unknown_employees": unknown[:MAX_ERRORS_PER_BATCH],
+        "records_upserted": len(days),
+        "errors": errors[:MAX_ERRORS_PER_BATCH],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+async def ingest_stream(db, chunks: AsyncIterator[bytes], parser) -> list[dict]:
+    """Consume a streamed body and upsert it in PUNCH_INGEST_BATCH_SIZE batches
+
+    Parsing of the next batch overlaps with the upsert of the previous one; at
+    most one batch is in flight so the session is never used concurrently.
+    """
+    batch_size = max(1, settings.PUNCH_INGEST_BATCH_SIZE)
+    summaries: list[dict] = []
+    in_flight: Optional[asyncio.Task] = None
+    punches: list[Punch] = []
+    errors: list[str] = []
+    line_number = 0
+
+    async def submit(batch: list[Punch], batch_errors: list[str]) -> None:
+        nonlocal in_flight
+        if in_flight is not None:
+            summaries.append(await in_flight)
+        number = len(summaries) + 1
+        in_flight = asyncio.ensure_future(ingest_batch(db, number, batch, batch_errors))
+
+    try:
+        async for lines in iter_lines(chunks):
+            for parsed in parser(lines):
+                line_number += 1
+                if isinstance(parsed, str):
+                    errors.append(f"record {line_number}: {parsed}")
+                else:
+                    punches.append(parsed)
+                if len(punches) + len(errors) >= batch_size:
+                    await submit(punches, errors)
+                    punches, errors = [], []
+        if punches or errors:
+            await submit(punches, errors)
+        if in_flight is not None:
+            summaries.append(await in_flight)
+            in_flight = None
+    finally:
+        if in_flight is not None:
+            # The body failed mid-stream: let the pending batch finish before the session closes
+            await asyncio.gather(in_flight, return_exceptions=True)
+    return summaries
@@ -0,0 +1,110 @@
+"""
+Employee x day attendance matrix for one month, encoded as one status-code string per employee
+"""
+import calendar
+from datetime import date
+from typing import Optional
+from sqlalchemy import Integer, String, case, cast, extract, func, literal_column, select, union_all
+from attendance_archive import records_for_range
+from models import AttendanceRecord, AttendanceStatus, LeaveRequest, LeaveStatus, User
+
+NO_RECORD = "-"
+# Stored enum names -> one-character cell codes; attendance codes are the names' first letters
+ATTENDANCE_CODES = {"PRESENT": "P", "ABSENT": "A", "LATE": "L", "HALF_DAY": "H"}
+LEAVE_CODES = {"SICK": "S", "CASUAL": "C", "ANNUAL": "V", "UNPAID": "U"}
+CODE_LEGEND = {
+    NO_RECORD: "no record",
+    "P": "present", "A": "absent", "L": "late", "H": "half-day",
+    "S": "sick leave", "C": "casual leave", "V": "annual leave", "U": "unpaid leave",
+}
+EMPTY_OR_ABSENT = frozenset(map(ord, (NO_RECORD, "A")))
+# "L12" -> (11, ord("L")): day index and cell byte for every aggregated record token
+RECORD_TOKENS = {
+    f"{code}{day}": (day - 1, ord(code)) for code in ATTENDANCE_CODES.values() for day in range(1, 32)
+}
+
+
+def _day(column):
+    return cast(extract("day", column), Integer)
+
+
+def _cells_query(dialect, first: date, last: date, user_filter, records=AttendanceRecord):
+    """One statement over the month: a row per employee with records, and a row per approved leave
+
+    Records come back pre-aggregated as "P1,L2,A3,..." (code letter + day of month),
+    so 10k employees x 31 days is 10k rows read from the covering (date, user_id, status) index.
+    """
+    record_status = func.coalesce(cast(records.status, String), AttendanceStatus.PRESENT.name)
+    token = func.substr(record_status, 1, 1) + cast(_day(records.date), String)
+    if dialect.name == "postgresql":
+        tokens = func.string_agg(token, literal_column("','"))
+    else:
+        tokens = func.group_concat(token, ",")
+    attended = (
+        select(records.user_id, literal_column("0"), literal_column("0"), tokens)
+        .where(records.date.between(first, last))
+        .group_by(records.user_id)
+    )
+    leave = (
+        select(
+            LeaveRequest.user_id,
+            # Clip each leave to the month
+            case((LeaveRequest.start_date < first, literal_column("1")), else_=_day(LeaveRequest.start_date)),
+            case((LeaveRequest.end_date > last, literal_column(str(last.day))), else_=_day(LeaveRequest.end_date)),
+            cast(LeaveRequest.leave_type, String),
+        )
+        .where(
+            LeaveRequest.status == LeaveStatus.APPROVED,
+            LeaveRequest.start_date <= last,
+            LeaveRequest.end_date >= first,
+        )
+    )
+    if user_filter is not None:
+        attended = attended.where(records.user_id.in_(user_filter))
+        leave = leave.where(LeaveRequest.user_id.in_(user_filter))
+    return union_all(attended, leave)
+
+
+async def attendance_matrix(db, year: int, month: int, department: Optional[str] = None) -> dict:
+    """Status codes per active employee and day of the month (record wins over leave, absence does not)"""
+    days = calendar.monthrange(year, month)[1]
+    first, last = date(year, month, 1), date(year, month, days)
+
+    employees = select(User.id, User.employee_id, User.full_name).where(User.is_active == True)  # noqa: E712
+    user_filter = None
+    if department is not None:
+        employees = employees.where(User.department == department)
+        user_filter = select(User.id).where(User.department == department)
+    employees = (await db.execute(employees.order_by(User.employee_id, User.id))).all()
+
+    rows = {user_id: bytearray(NO_RECORD * days, "ascii") for user_id, _, _ in employees}
+    leaves = []
+    records = await records_for_range(db, first, last)
+    cells = _cells_query(db.get_bind().dialect, first, last, user_filter, records)
+    for user_id, first_day, last_day, value in (await db.execute(cells)).all():
+        row = rows.get(user_id)
+        if row is None:
+            continue  # inactive employee
+        if first_day:
+            leaves.append((row, first_day, last_day, ord(LEAVE_CODES[value])))
+            continue
+        for token in value.split(","):
+            day, code = RECORD_TOKENS[token]
+            row[day] = code
+    # Leave fills empty days and overrides an absence, never an attended day
+    for row, first_day, last_day, code in leaves:
+        for day in range(first_day - 1, last_day):
+            if row[day] in EMPTY_OR_ABSENT:
+                row[day] = code
+
+    return {
+        "year": year,
+        "month": month,
+        "department": department,
+        "days": days,
+        "legend": CODE_LEGEND,
+        "user_ids": [user_id for user_id, _, _ in employees],
+        "employee_ids": [employee_id for _, employee_id, _ in employees],
+        "names": [full_name for _, _, full_name in employees],
+        "rows": [rows[user_id].decode("ascii") for user_id, _, _ in employees],
+    }
@@ -0,0 +1,85 @@
+"""
+Attendance statistics computed with GROUP BY aggregates instead of loading records
+"""
+from datetime import date
+from typing import Optional
+from sqlalchemy import Date, cast, func, select, type_coerce
+from models import AttendanceRecord, AttendanceStatus, DailyAttendanceSummary
+
+STATUS_FIELDS = {
+    AttendanceStatus.PRESENT: "present_days",
+    AttendanceStatus.ABSENT: "absent_days",
+    AttendanceStatus.LATE: "late_days",
+    AttendanceStatus.HALF_DAY: "half_day_days",
+}
+
+
+def period_start(column, bucket: str, dialect):
+    """First day of the week (Monday) or month containing `column`, as a DATE in `dialect`'s SQL"""
+    if dialect.name == "postgresql":
+        return cast(func.date_trunc(bucket, column), Date)
+    modifiers = ("weekday 0", "-6 days") if bucket == "week" else ("start of month",)
+    return type_coerce(func.date(column, *modifiers), Date)
+
+
+def _summarize(counts: dict) -> dict:
+    total = sum(counts.values())
+    summary = {field: counts.get(status, 0) for status, field in STATUS_FIELDS.items()}
+    summary["total_days"] = total
+    summary["attendance_rate"] = round(summary["present_days"] / total * 100, 2) if total else 0.0
+    return summary
+
+
+async def _grouped_stats(db, query, date_column, status_column, count, bucket: Optional[str]) -> dict:
+    columns = [status_column, count]
+    if bucket:
+        # The session's bind, not the global engine: replica, async and scratch sessions differ
+        period = period_start(date_column, bucket, db.get_bind().dialect).label("period_start")
+        columns.insert(0, period)
+    query = query.with_only_columns(*columns, maintain_column_froms=True)
+
+    if not bucket:
+        rows = (await db.execute(query.group_by(status_column))).all()
+        return {**_summarize(dict(rows)), "bucket": None, "buckets": []}
+
+    rows = (await db.execute(query.group_by(period, status_column).order_by(period))).all()
+    totals: dict = {}
+    periods: dict[date, dict] = {}
+    for start, status_value, count_value in rows:
+        periods.setdefault(start, {})[status_value] = count_value
+        totals[status_value] = totals.get(status_value, 0) + count_value
+    return {
+        **_summarize(totals),
+        "bucket": bucket,
+        "buckets": [{"period_start": start, **_summarize(counts)} for start, counts in periods.items()],
+    }
+
+
+async def attendance_stats(db, conditions: list, bucket: Optional[str] = None, records=AttendanceRecord) -> dict:
+    """Status counts for the attendance records matching `conditions`, optionally per week/month
+
+    `records` is the entity the conditions are written against (see attendance_archive.attendance_source).
+    """
+    query = select(records.id).where(*conditions)
+    return await _grouped_stats(db, query, records.date, records.status, func.count(), bucket)
+
+
+async def summary_stats(
+    db,
+    department: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    bucket: Optional[str] = None,
+) -> dict:
+    """Same figures as attendance_stats, read from daily_attendance_summary (O(days), not O(records))"""
+    query = select(DailyAttendanceSummary.date)
+    if department is not None:
+        query = query.where(DailyAttendanceSummary.department == department)
+    if start_date:
+        query = query.where(DailyAttendanceSummary.date >= start_date)
+    if end_date:
+        query = query.where(DailyAttendanceSummary.date <= end_date)
+    return await _grouped_stats(
+        db, query, DailyAttendanceSummary.date, DailyAttendanceSummary.status,
+        func.sum(DailyAttendanceSummary.headcount), bucket
+    )
@@ -0,0 +1,155 @@
+"""
+Maintenance of the daily_attendance_summary rollup keyed by (date, department, status)
+"""
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+from sqlalchemy import delete, func, insert, select
+from attendance_archive import archived_through_sync, attendance_source, records_for_range
+from database import dialect_insert
+from models import AttendanceRecord, AttendanceStatus, DailyAttendanceSummary, User
+
+SUMMARY_COLUMNS = ["date", "department", "status", "headcount", "checked_in", "checked_out"]
+
+
+class SummaryContribution(NamedTuple):
+    """What one attendance record adds to the rollup"""
+    date: date
+    status: AttendanceStatus
+    checked_in: bool
+    checked_out: bool
+
+
+def contribution(record: Optional[AttendanceRecord]) -> Optional[SummaryContribution]:
+    if record is None:
+        return None
+    return SummaryContribution(
+        record.date,
+        AttendanceStatus(record.status or AttendanceStatus.PRESENT),
+        record.check_in is not None,
+        record.check_out is not None,
+    )
+
+
+def increment_summary_statement(bind, source=None):
+    table = DailyAttendanceSummary.__table__
+    stmt = dialect_insert(bind)(table)
+    if source is not None:
+        stmt = stmt.from_select(SUMMARY_COLUMNS, source)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.date, table.c.department, table.c.status],
+        set_={
+            "headcount": table.c.headcount + stmt.excluded.headcount,
+            "checked_in": table.c.checked_in + stmt.excluded.checked_in,
+            "checked_out": table.c.checked_out + stmt.excluded.checked_out,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def summary_delta_rows(
+    department: Optional[str],
+    before: Optional[SummaryContribution],
+    after: Optional[SummaryContribution],
+) -> list[dict]:
+    """Rollup increments that move one record's contribution from `before` to `after`"""
+    deltas: dict[tuple, list[int]] = {}
+    for sign, part in ((-1, before), (1, after)):
+        if part is None:
+            continue
+        delta = deltas.setdefault((part.date, part.status), [0, 0, 0])
+        delta[0] += sign
+        delta[1] += sign * part.checked_in
+        delta[2] += sign * part.checked_out
+    return [
+        {
+            "date": day,
+            "department": department or "",
+            "status": record_status,
+            "headcount": headcount,
+            "checked_in": checked_in,
+            "checked_out": checked_out,
+        }
+        for (day, record_status), (headcount, checked_in, checked_out) in deltas.items()
+        if headcount or checked_in or checked_out
+    ]
+
+
+async def apply_summary_delta(
+    db,
+    department: Optional[str],
+    before: Optional[SummaryContribution],
+    after: Optional[SummaryContribution],
+) -> None:
+    """Move one record's contribution from `before` to `after` inside the caller's transaction"""
+    rows = summary_delta_rows(department, before, after)
+    if rows:
+        await db.execute(increment_summary_statement(db.bind), rows)
+
+
+def _rollup(records, *conditions, negate: bool = False):
+    """Summary rows recomputed from `records` (attendance_records, or it plus the archive)"""
+    department = func.coalesce(User.department, "")
+    record_status = func.coalesce(records.status, AttendanceStatus.PRESENT)
+    counts = [func.count(), func.count(records.check_in), func.count(records.check_out)]
+    if negate:
+        counts = [-count for count in counts]
+    return (
+        select(records.date, department, record_status, *counts)
+        .join(User, User.id == records.user_id)
+        .where(*conditions)
+        .group_by(records.date, department, record_status)
+    )
+
+
+async def _shift_user_records(db, user_id: int, negate: bool) -> None:
+    records = await records_for_range(db)
+    await db.execute(increment_summary_statement(db.bind, _rollup(records, records.user_id == user_id, negate=negate)))
+
+
+async def subtract_user_records(db, user_id: int) -> None:
+    """Remove a user's records from the rollup before the records themselves are deleted"""
+    await _shift_user_records(db, user_id, negate=True)
+
+
+async def move_user_department(db, user: User, department: Optional[str]) -> None:
+    """Change a user's department, re-keying their rollup rows in the caller's transaction"""
+    if (department or "") == (user.department or ""):
+        user.department = department
+        return
+    # Counted under the department the rows were added with, then added back under the new one
+    await _shift_user_records(db, user.id, negate=True)
+    user.department = department
+    await db.flush()
+    await _shift_user_records(db, user.id, negate=False)
+
+
+def _refresh_statements(records, *conditions_on_date):
+    return [
+        delete(DailyAttendanceSummary).where(*(c(DailyAttendanceSummary.date) for c in conditions_on_date)),
+        insert(DailyAttendanceSummary).from_select(
+            SUMMARY_COLUMNS, _rollup(records, *(c(records.date) for c in conditions_on_date))
+        ),
+    ]
+
+
+async def refresh_summary_days(db, days: Iterable[date]) -> None:
+    """Recount whole days from attendance_records (used after batched upserts)"""
+    days = sorted(set(days))
+    if days:
+        records = await records_for_range(db, days[0], days[-1])
+        for stmt in _refresh_statements(records, lambda column: column.in_(days)):
+            await db.execute(stmt)
+
+
+def rebuild_summary(db, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recompute the rollup for a date range (all dates when unbounded) on a sync session"""
+    conditions = []
+    if start:
+        conditions.append(lambda column: column >= start)
+    if end:
+        conditions.append(lambda column: column <= end)
+    records = attendance_source(archived_through_sync(db), start, end)
+    for stmt in _refresh_statements(records, *conditions):
+        db.execute(stmt)
+    count = select(func.count()).select_from(DailyAttendanceSummary)
+    return db.scalar(count.where(*(c(DailyAttendanceSummary.date) for c in conditions)))
@@ -0,0 +1,94 @@
+"""
+End-of-day attendance sweep: ABSENT records for employees who never showed up, and open check-ins
+"""
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import Date, case, func, literal, or_, select, update
+from attendance_summary import rebuild_summary
+from config import settings
+from database import dialect_insert
+from models import AttendanceRecord, AttendanceStatus, LeaveRequest, LeaveStatus, User, UserRole
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MISSING_CHECKOUT_POLICIES = ("flag", "close")
+MISSING_CHECKOUT_NOTE = "[missing check-out]"
+AUTO_CLOSED_NOTE = "[check-out auto-closed]"
+
+
+def working_weekdays() -> set[int]:
+    """date.weekday() numbers listed in WORKING_DAYS"""
+    names = {name.strip().lower()[:3] for name in settings.WORKING_DAYS.split(",") if name.strip()}
+    unknown = names - set(WEEKDAYS)
+    if unknown:
+        raise ValueError(f"WORKING_DAYS has unknown day names: {', '.join(sorted(unknown))}")
+    return {WEEKDAYS.index(name) for name in names}
+
+
+def absent_insert_statement(bind, day: date):
+    """INSERT ... SELECT of an ABSENT record for every active employee (role employee, as on the
+    dashboard) with no record and no approved leave"""
+    record = AttendanceRecord.__table__
+    # Uncorrelated sets, each built once: per-user EXISTS probes pick the leave status index
+    # and rescan every approved leave for each employee
+    recorded = select(record.c.user_id).where(record.c.date == day)
+    on_leave = select(LeaveRequest.user_id).where(
+        LeaveRequest.status == LeaveStatus.APPROVED,
+        LeaveRequest.start_date <= day,
+        LeaveRequest.end_date >= day,
+    )
+    absentees = select(
+        User.id,
+        literal(day, Date),
+        literal(AttendanceStatus.ABSENT, record.c.status.type),
+    ).where(
+        User.is_active == True,  # noqa: E712
+        User.role == UserRole.EMPLOYEE,
+        # Not for days before the account existed
+        User.created_at < datetime.combine(day + timedelta(days=1), time()),
+        User.id.not_in(recorded),
+        User.id.not_in(on_leave),
+    )
+    # A check-in racing the sweep wins
+    return (
+        dialect_insert(bind)(record)
+        .from_select(["user_id", "date", "status"], absentees)
+        .on_conflict_do_nothing(index_elements=["user_id", "date"])
+    )
+
+
+def _with_note(column, note: str):
+    return case((column.is_(None), note), else_=column + " " + note)
+
+
+def _shifted(bind, column, minutes: int):
+    if bind.dialect.name == "postgresql":
+        return column + timedelta(minutes=minutes)
+    return func.datetime(column, f"+{minutes} minutes")
+
+
+def open_checkin_statement(bind, day: date, policy: str):
+    """UPDATE of records with a check-in but no check-out: note them, or close them after a standard day"""
+    record = AttendanceRecord.__table__
+    conditions = [record.c.date == day, record.c.check_in.isnot(None), record.c.check_out.is_(None)]
+    if policy == "close":
+        minutes = settings.STANDARD_WORKDAY_MINUTES
+        values = {
+            "check_out": _shifted(bind, record.c.check_in, minutes),
+            "worked_minutes": minutes,
+            "overtime_minutes": 0,
+            "notes": _with_note(record.c.notes, AUTO_CLOSED_NOTE),
+        }
+    else:
+        # Re-running must not stack the note
+        conditions.append(or_(record.c.notes.is_(None), ~record.c.notes.contains(MISSING_CHECKOUT_NOTE)))
+        values = {"notes": _with_note(record.c.notes, MISSING_CHECKOUT_NOTE)}
+    return update(record).where(*conditions).values(**values)
+
+
+def sweep_day(db, day: date, policy: str, mark_absent: bool = True) -> dict:
+    """Mark absences and handle open check-ins for one day, then recount its rollup (caller commits)"""
+    bind = db.get_bind()
+    absent = db.execute(absent_insert_statement(bind, day)).rowcount if mark_absent else 0
+    open_checkins = db.execute(open_checkin_statement(bind, day, policy)).rowcount
+    if absent or open_checkins:
+        rebuild_summary(db, day, day)
+    return {"date": day, "marked_absent": absent, "open_checkins": open_checkins}
@@ -1,35 +1,60 @@
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from cache import TTLCache
+from database import get_async_db
 from models import User
 from schemas import TokenData
 from config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
+
+
+class CachedPrincipal(NamedTuple):
+    """Verified token claims plus a detached snapshot of the user row"""
+    user_id: int
+    claims: dict
+    user: User
+
+
+# Authenticated principals keyed by sha256(token)
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, built on first use so startup skips the passlib/bcrypt import"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     # Truncate to 72 bytes for bcrypt compatibility
-    return pwd_context.hash(password[:72])
+    return get_pwd_context().hash(password[:72])
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -56,9 +81,26 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _snapshot_user(user: User) -> User:
+    """Copy the user's column values into a detached instance safe to share across sessions"""
+    values = {attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs}
+    snapshot = User(**values)
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def invalidate_user_principals(user_id: int) -> int:
+    """Drop every cached principal for a user (call after profile, role or password changes)"""
+    return principal_cache.discard_where(lambda principal: principal.user_id == user_id)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current authenticated user"""
     credentials_exception = HTTPException(
@@ -66,7 +108,17 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+    key = _token_key(token)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        if principal.claims.get("exp", 0) <= time.time():
+            principal_cache.pop(key)
+            raise credentials_exception
+        # Attach a copy to this request's session without touching the database
+        return await db.merge(principal.user, load=False)
+
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
@@ -76,13 +128,17 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_email(db, email=token_data.email)
+    user = (await db.scalars(select(User).where(User.email == token_data.email).limit(1))).first()
     if user is None:
         raise credentials_exception
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    
+
+    ttl = min(settings.AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        principal_cache.set(key, CachedPrincipal(user.id, payload, _snapshot_user(user)), ttl=ttl)
+
     return user
 
 
@@ -101,3 +157,28 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
             detail="Not authorized to perform this action"
         )
     return current_user
+
+
+def _device_token_valid(token: str) -> bool:
+    configured = [t.strip() for t in settings.DEVICE_INGEST_TOKENS.split(",") if t.strip()]
+    return any(hmac.compare_digest(token.encode(), t.encode()) for t in configured)
+
+
+async def get_ingest_caller(
+    x_device_token: Optional[str] = Header(None),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> str:
+    """Authorize punch ingestion with an X-Device-Token or an admin bearer token"""
+    if x_device_token:
+        if _device_token_valid(x_device_token):
+            return "device"
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid device token")
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await get_current_admin_user(await get_current_user(token, db))
+    return f"admin:{user.id}"
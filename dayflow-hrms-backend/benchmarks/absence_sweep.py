@@ -0,0 +1,86 @@
+"""
+Run time of the nightly absence / open check-in sweep behind `python -m jobs.mark_absent`.
+
+Seeds --employees active users; for one day, 60% of them have a record (a tenth
+of those still missing a check-out) and 10% are on approved leave. Then the day
+is swept twice with the same code the job runs: the first pass inserts the
+ABSENT records, the second shows the cost of an idempotent re-run.
+
+    python -m benchmarks.absence_sweep --employees 100000
+    python -m benchmarks.absence_sweep --url postgresql://.../bench --policy close
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DAY = date(2025, 1, 6)
+
+
+def seed(args) -> None:
+    from sqlalchemy import delete, insert, select
+    from database import Base, SessionLocal, engine
+    from models import AttendanceRecord, AttendanceStatus, DailyAttendanceSummary, LeaveRequest, LeaveStatus, LeaveType, User
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(delete(AttendanceRecord))
+        db.execute(delete(DailyAttendanceSummary))
+        db.execute(delete(LeaveRequest))
+        db.execute(delete(User).where(User.email.like("sweep%")))
+        db.execute(insert(User), [
+            {"email": f"sweep{n}@example.com", "full_name": f"Sweep {n}", "hashed_password": "x",
+             "employee_id": f"SWP{n:06d}", "department": f"Dept {n % 20}", "is_active": True,
+             "created_at": datetime(2024, 1, 1)}
+            for n in range(args.employees)
+        ])
+        user_ids = db.scalars(select(User.id).where(User.email.like("sweep%")).order_by(User.id)).all()
+        shift = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=9)
+        records = [
+            {"user_id": user_id, "date": DAY, "status": AttendanceStatus.PRESENT, "check_in": shift,
+             "check_out": None if n % 10 == 0 else shift + timedelta(hours=8)}
+            for n, user_id in enumerate(user_ids) if n % 10 < 6
+        ]
+        for offset in range(0, len(records), 50_000):
+            db.execute(insert(AttendanceRecord), records[offset:offset + 50_000])
+        db.execute(insert(LeaveRequest), [
+            {"user_id": user_id, "leave_type": LeaveType.ANNUAL, "reason": "bench",
+             "start_date": DAY - timedelta(days=2), "end_date": DAY + timedelta(days=2), "status": LeaveStatus.APPROVED}
+            for n, user_id in enumerate(user_ids) if n % 10 == 6
+        ])
+        db.commit()
+    print(f"{args.employees:,} employees, {len(records):,} records on {DAY}")
+
+
+def run(args) -> None:
+    from attendance_sweep import sweep_day
+    from database import SessionLocal
+
+    for attempt in ("first pass", "re-run"):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            result = sweep_day(db, DAY, args.policy)
+            db.commit()
+        print(f"- {attempt}: {result['marked_absent']:,} marked absent, {result['open_checkins']:,} open check-ins "
+              f"({args.policy}) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{BACKEND_DIR / 'bench_sweep.db'}")
+    parser.add_argument("--employees", type=int, default=100_000)
+    parser.add_argument("--policy", choices=("flag", "close"), default="flag")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+    seed(args)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
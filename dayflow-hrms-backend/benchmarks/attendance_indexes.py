@@ -0,0 +1,154 @@
+"""
+Before/after query plans for the hot-path composite indexes (alembic revision 0002).
+
+Seeds a scratch attendance table, then runs the check-in lookup, the per-user
+history page and the per-user payroll lookup with and without the indexes,
+printing EXPLAIN output and median timings.
+
+    python -m benchmarks.attendance_indexes --rows 10000000
+    python -m benchmarks.attendance_indexes --url postgresql://.../bench --rows 10000000
+
+Use a scratch database: the benchmark drops and recreates its tables.
+"""
+import argparse
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, text
+
+DDL = [
+    "DROP TABLE IF EXISTS bench_attendance",
+    "DROP TABLE IF EXISTS bench_payroll",
+    """CREATE TABLE bench_attendance (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        check_in TIMESTAMP,
+        check_out TIMESTAMP,
+        status VARCHAR(8)
+    )""",
+    """CREATE TABLE bench_payroll (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        net_salary FLOAT NOT NULL
+    )""",
+]
+
+# Pre-0002 schema only had a single-column index on date
+BASELINE_INDEXES = ["CREATE INDEX ix_bench_attendance_date ON bench_attendance (date)"]
+
+NEW_INDEXES = [
+    "CREATE UNIQUE INDEX uq_bench_attendance_user_id_date ON bench_attendance (user_id, date)",
+    "CREATE UNIQUE INDEX uq_bench_payroll_user_id_year_month ON bench_payroll (user_id, year, month)",
+]
+
+QUERIES = {
+    "check-in lookup": (
+        "SELECT id, check_in FROM bench_attendance WHERE user_id = :user_id AND date = :day",
+        lambda users, day: {"user_id": users // 2, "day": day},
+    ),
+    "my-records page": (
+        "SELECT id, date, status FROM bench_attendance WHERE user_id = :user_id "
+        "ORDER BY date DESC LIMIT 100",
+        lambda users, day: {"user_id": users // 3},
+    ),
+    "payroll period lookup": (
+        "SELECT id FROM bench_payroll WHERE user_id = :user_id AND year = :year AND month = :month",
+        lambda users, day: {"user_id": users // 2, "year": day.year, "month": day.month},
+    ),
+}
+
+
+def seed(engine, rows: int, users: int, batch: int = 50000) -> date:
+    days = max(1, rows // users)
+    start = date.today() - timedelta(days=days)
+    print(f"Seeding {rows:,} attendance rows ({users:,} users x {days:,} days)...")
+    started = time.perf_counter()
+    insert = text(
+        "INSERT INTO bench_attendance (id, user_id, date, check_in, check_out, status) "
+        "VALUES (:id, :user_id, :date, :check_in, :check_out, :status)"
+    )
+    buffer = []
+    with engine.begin() as conn:
+        for n in range(rows):
+            day = start + timedelta(days=n // users)
+            check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+            buffer.append({
+                "id": n + 1, "user_id": n % users + 1, "date": day,
+                "check_in": check_in, "check_out": check_in + timedelta(hours=8),
+                "status": "present",
+            })
+            if len(buffer) >= batch:
+                conn.execute(insert, buffer)
+                buffer.clear()
+        if buffer:
+            conn.execute(insert, buffer)
+        months = max(1, days // 30)
+        conn.execute(
+            text("INSERT INTO bench_payroll (id, user_id, month, year, net_salary) "
+                 "VALUES (:id, :user_id, :month, :year, 1000)"),
+            [
+                {"id": m * users + u + 1, "user_id": u + 1,
+                 "month": (start + timedelta(days=30 * m)).month,
+                 "year": (start + timedelta(days=30 * m)).year}
+                for m in range(months) for u in range(users)
+            ],
+        )
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+    return start + timedelta(days=days // 2)
+
+
+def explain(conn, sql: str, params: dict) -> list[str]:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    return [" | ".join(str(col) for col in row) for row in conn.execute(text(prefix + sql), params)]
+
+
+def measure(engine, users: int, day: date, label: str, repeat: int) -> None:
+    print(f"\n=== {label} ===")
+    with engine.connect() as conn:
+        for name, (sql, make_params) in QUERIES.items():
+            params = make_params(users, day)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append(time.perf_counter() - started)
+            print(f"- {name}: median {statistics.median(timings) * 1000:.3f} ms")
+            for line in explain(conn, sql, params):
+                print(f"    {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///./bench_attendance.db")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    with engine.begin() as conn:
+        for statement in DDL + BASELINE_INDEXES:
+            conn.execute(text(statement))
+    day = seed(engine, args.rows, args.users)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE bench_attendance"))
+            conn.execute(text("ANALYZE bench_payroll"))
+
+    measure(engine, args.users, day, "before (date index only)", args.repeat)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for statement in NEW_INDEXES:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE"))
+    print(f"\nBuilt composite indexes in {time.perf_counter() - started:.1f}s")
+
+    measure(engine, args.users, day, "after (composite indexes)", args.repeat)
+
+
+if __name__ == "__main__":
+    main()
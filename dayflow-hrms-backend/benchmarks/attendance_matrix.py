@@ -0,0 +1,95 @@
+"""
+Build time of the monthly employee x day matrix behind GET /api/attendance/matrix.
+
+Seeds --employees active users with a record for every day of one month (a mix
+of statuses) plus approved leave for every tenth employee, then times the
+matrix query and its JSON encoding through the same code the endpoint runs.
+
+    python -m benchmarks.attendance_matrix --employees 10000
+    python -m benchmarks.attendance_matrix --url postgresql://.../bench
+"""
+import argparse
+import asyncio
+import calendar
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+YEAR, MONTH = 2025, 1
+STATUSES = ("PRESENT", "PRESENT", "PRESENT", "LATE", "ABSENT", "HALF_DAY")
+
+
+def seed(args) -> None:
+    from sqlalchemy import delete, insert, select
+    from database import Base, SessionLocal, engine
+    from models import AttendanceRecord, AttendanceStatus, LeaveRequest, LeaveStatus, LeaveType, User
+
+    Base.metadata.create_all(bind=engine)
+    days = calendar.monthrange(YEAR, MONTH)[1]
+    with SessionLocal() as db:
+        db.execute(delete(AttendanceRecord))
+        db.execute(delete(LeaveRequest))
+        db.execute(delete(User).where(User.email.like("matrix%")))
+        db.execute(insert(User), [
+            {"email": f"matrix{n}@example.com", "full_name": f"Matrix {n}", "hashed_password": "x",
+             "employee_id": f"MTX{n:06d}", "department": f"Dept {n % 10}", "is_active": True}
+            for n in range(args.employees)
+        ])
+        user_ids = db.scalars(select(User.id).where(User.email.like("matrix%"))).all()
+        records = [
+            {"user_id": user_id, "date": date(YEAR, MONTH, day),
+             "status": AttendanceStatus[STATUSES[(user_id + day) % len(STATUSES)]]}
+            for user_id in user_ids
+            for day in range(1, days + 1)
+        ]
+        for offset in range(0, len(records), 50_000):
+            db.execute(insert(AttendanceRecord), records[offset:offset + 50_000])
+        db.execute(insert(LeaveRequest), [
+            {"user_id": user_id, "leave_type": LeaveType.ANNUAL, "reason": "bench",
+             "start_date": date(YEAR, MONTH, 1) - timedelta(days=3), "end_date": date(YEAR, MONTH, 5),
+             "status": LeaveStatus.APPROVED}
+            for user_id in user_ids[::10]
+        ])
+        db.commit()
+    print(f"{args.employees:,} employees x {days} days = {len(records):,} records")
+
+
+async def run(args) -> None:
+    from attendance_matrix import attendance_matrix
+    from database import AsyncSessionLocal, SessionLocal, ThreadedAsyncSession
+    from schemas import AttendanceMatrix
+
+    for department in (None, "Dept 3"):
+        timings = []
+        for _ in range(args.repeat):
+            db = AsyncSessionLocal() if AsyncSessionLocal is not None else ThreadedAsyncSession(SessionLocal())
+            started = time.perf_counter()
+            matrix = await attendance_matrix(db, YEAR, MONTH, department)
+            built = time.perf_counter()
+            body = AttendanceMatrix.model_validate(matrix).model_dump_json()
+            timings.append((built - started, time.perf_counter() - built))
+            await db.close()
+        query, encode = min(timings)
+        print(f"- department={department}: {len(matrix['rows']):,} rows, query+build {query * 1000:.0f} ms, "
+              f"JSON {encode * 1000:.0f} ms, {len(body) / 1e6:.2f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{BACKEND_DIR / 'bench_matrix.db'}")
+    parser.add_argument("--employees", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+    seed(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
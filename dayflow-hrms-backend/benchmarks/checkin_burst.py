@@ -0,0 +1,94 @@
+"""
+Shift-start burst: every employee checks in at once through POST /api/attendance/check-in.
+
+Seeds employees into a scratch database and drives the app in-process over
+httpx's ASGI transport with --concurrency requests in flight, once per run.
+Pick the write path with --mode: "off" is the direct per-request transaction,
+anything else enables ATTENDANCE_WRITE_BEHIND with that durability. Needs httpx.
+
+    python -m benchmarks.checkin_burst --employees 5000 --mode off
+    python -m benchmarks.checkin_burst --employees 5000 --mode journal
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+async def run(args) -> None:
+    import httpx
+    from sqlalchemy import delete, func, insert, select
+    from auth import create_access_token
+    from database import SessionLocal, engine
+    from models import AttendanceRecord, DailyAttendanceSummary, User
+    from schema_check import create_schema
+    import main
+
+    create_schema(engine)
+    with SessionLocal() as db:
+        db.execute(delete(AttendanceRecord))
+        db.execute(delete(DailyAttendanceSummary))
+        db.execute(delete(User).where(User.email.like("burst%")))
+        db.execute(insert(User), [
+            {"email": f"burst{n}@example.com", "full_name": f"Burst {n}", "hashed_password": "x",
+             "employee_id": f"BURST{n:06d}", "department": f"Dept {n % 20}", "is_active": True}
+            for n in range(args.employees)
+        ])
+        db.commit()
+    # A journal left by an interrupted run would replay into the fresh table
+    if os.path.exists(os.environ["ATTENDANCE_JOURNAL_PATH"]):
+        os.remove(os.environ["ATTENDANCE_JOURNAL_PATH"])
+    tokens = [create_access_token({"sub": f"burst{n}@example.com"}) for n in range(args.employees)]
+
+    latencies: list[float] = []
+    gate = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def check_in(token: str) -> int:
+                async with gate:
+                    started = time.perf_counter()
+                    response = await client.post("/api/attendance/check-in", headers={"Authorization": f"Bearer {token}"})
+                    latencies.append(time.perf_counter() - started)
+                    return response.status_code
+
+            started = time.perf_counter()
+            codes = await asyncio.gather(*(check_in(token) for token in tokens))
+            acked = time.perf_counter() - started
+    # Leaving the lifespan flushes whatever write-behind still holds
+    drained = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        stored = db.scalar(select(func.count()).select_from(AttendanceRecord))
+    latencies.sort()
+    print(f"mode={args.mode}: {args.employees:,} check-ins, concurrency {args.concurrency}")
+    print(f"- acknowledged in {acked:.2f}s ({args.employees / acked:,.0f}/s), durable after {drained:.2f}s")
+    print(f"- latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"- status codes {sorted(set(codes))}, {stored:,} records stored")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{BACKEND_DIR / 'bench_checkin.db'}")
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mode", choices=("off", "memory", "journal", "fsync", "commit"), default="journal")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+    os.environ["ATTENDANCE_WRITE_BEHIND"] = "false" if args.mode == "off" else "true"
+    if args.mode != "off":
+        os.environ["ATTENDANCE_WRITE_BEHIND_DURABILITY"] = args.mode
+    os.environ.setdefault("ATTENDANCE_JOURNAL_PATH", str(BACKEND_DIR / "bench_checkin_journal.ndjson"))
+    sys.path.insert(0, str(BACKEND_DIR))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
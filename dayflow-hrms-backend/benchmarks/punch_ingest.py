@@ -0,0 +1,96 @@
+"""
+Throughput of the bulk punch ingestion path (parse, employee lookup, aggregate, upsert).
+
+Seeds employees into a scratch database, builds an NDJSON or CSV body of
+in/out punches and feeds it through the same code the
+/api/attendance/punches/bulk endpoint runs, in 64 KiB chunks like a streamed upload.
+
+    python -m benchmarks.punch_ingest --punches 500000 --employees 20000
+    python -m benchmarks.punch_ingest --format csv --url postgresql://.../bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CHUNK = 64 * 1024
+
+
+def build_body(punches: int, employees: int, fmt: str) -> bytes:
+    lines = ["employee_id,timestamp,direction"] if fmt == "csv" else []
+    start = datetime.combine(date.today() - timedelta(days=punches // (employees * 2) + 1), datetime.min.time())
+    for n in range(punches):
+        employee = n % employees
+        day = n // (employees * 2)
+        direction = "in" if (n // employees) % 2 == 0 else "out"
+        hour = 9 if direction == "in" else 17
+        stamp = (start + timedelta(days=day, hours=hour, minutes=employee % 50)).isoformat()
+        if fmt == "csv":
+            lines.append(f"BENCH{employee:06d},{stamp},{direction}")
+        else:
+            lines.append(json.dumps({"employee_id": f"BENCH{employee:06d}", "timestamp": stamp, "direction": direction}))
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def chunked(body: bytes):
+    for offset in range(0, len(body), CHUNK):
+        # Yield to the loop between chunks like an ASGI receive() would
+        await asyncio.sleep(0)
+        yield body[offset:offset + CHUNK]
+
+
+async def run(args) -> None:
+    from sqlalchemy import delete, insert
+    from attendance_ingest import CsvPunchParser, employee_directory, ingest_stream, parse_ndjson
+    from database import AsyncSessionLocal, Base, SessionLocal, ThreadedAsyncSession, engine
+    from models import AttendanceRecord, User
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(delete(AttendanceRecord))
+        db.execute(delete(User).where(User.employee_id.like("BENCH%")))
+        db.execute(insert(User), [
+            {"email": f"bench{n}@example.com", "full_name": f"Bench {n}", "hashed_password": "x",
+             "employee_id": f"BENCH{n:06d}", "is_active": True}
+            for n in range(args.employees)
+        ])
+        db.commit()
+
+    body = build_body(args.punches, args.employees, args.format)
+    print(f"{args.punches:,} punches, {args.employees:,} employees, {len(body) / 1e6:.1f} MB {args.format}")
+
+    for label in ("cold cache", "warm cache (replay)"):
+        if label == "cold cache":
+            employee_directory.clear()
+        db = AsyncSessionLocal() if AsyncSessionLocal is not None else ThreadedAsyncSession(SessionLocal())
+        parser = CsvPunchParser() if args.format == "csv" else parse_ndjson
+        started = time.perf_counter()
+        batches = await ingest_stream(db, chunked(body), parser)
+        elapsed = time.perf_counter() - started
+        await db.close()
+        upserted = sum(b["records_upserted"] for b in batches)
+        print(f"- {label}: {elapsed:.2f}s, {args.punches / elapsed:,.0f} punches/s, "
+              f"{len(batches)} batches, {upserted:,} record upserts")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{BACKEND_DIR / 'bench_ingest.db'}")
+    parser.add_argument("--punches", type=int, default=500_000)
+    parser.add_argument("--employees", type=int, default=20_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
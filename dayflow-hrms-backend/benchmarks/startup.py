@@ -0,0 +1,81 @@
+"""
+Cold-start timing for one app worker under each DB_SCHEMA_MODE.
+
+Each run is a fresh interpreter that imports `main` and enters the app lifespan,
+which is what every uvicorn/gunicorn worker (or serverless cold start) pays.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --url postgresql://.../dayflow_hrms --modes verify
+
+The default SQLite URL points at a scratch file that is created and stamped
+at the migration head so the verify mode has something to check.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import": imported - started, "lifespan": ready - imported}))
+"""
+
+
+def run_child(env: dict) -> dict:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+        check=True, capture_output=True, text=True,
+    )
+    timings = json.loads(out.stdout.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - started
+    return timings
+
+
+def prepare_database(url: str) -> None:
+    """Create the tables and stamp the migration head (what `alembic upgrade head` leaves behind)"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ["DATABASE_URL"] = url
+    from database import engine
+    from schema_check import create_schema
+
+    create_schema(engine)
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{BACKEND_DIR / 'bench_startup.db'}")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=["create_all", "verify", "off"])
+    parser.add_argument("--no-prepare", action="store_true", help="use the database as-is")
+    args = parser.parse_args()
+
+    if not args.no_prepare:
+        prepare_database(args.url)
+
+    print(f"{'mode':<12}{'import ms':>12}{'lifespan ms':>14}{'process ms':>13}   (median of {args.runs})")
+    for mode in args.modes:
+        env = dict(os.environ, DATABASE_URL=args.url, DB_SCHEMA_MODE=mode)
+        runs = [run_child(env) for _ in range(args.runs)]
+        row = {key: statistics.median(r[key] for r in runs) * 1000 for key in ("import", "lifespan", "process")}
+        print(f"{mode:<12}{row['import']:>12.1f}{row['lifespan']:>14.1f}{row['process']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
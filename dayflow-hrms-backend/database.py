@@ -1,14 +1,321 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import CursorResult, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from config import settings
+from query_stats import instrument_engine
+from slow_queries import slow_query_log
+
+# Async drivers used when DB_ASYNC is enabled
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class PoolTelemetry:
+    """Counters for connection checkouts, including time spent waiting on the pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _TimedCheckoutMixin:
+    """Times every checkout so pool starvation shows up in metrics"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.telemetry = PoolTelemetry()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.telemetry.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.telemetry.record(time.perf_counter() - started)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+
+def sqlite_archive_path(database: Optional[str]) -> str:
+    """Attendance archive file for a SQLite database: <name>_archive<ext> beside it unless configured"""
+    if database in (None, "", ":memory:"):
+        return ":memory:"
+    if settings.ATTENDANCE_ARCHIVE_SQLITE_PATH:
+        return settings.ATTENDANCE_ARCHIVE_SQLITE_PATH
+    root, ext = os.path.splitext(database)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def attach_sqlite_archive(dbapi_connection, connection_info: dict, archive: str) -> None:
+    """Attach the attendance archive as schema "archive" (creating the file when missing)"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("ATTACH DATABASE ? AS archive", (archive,))
+    cursor.execute(f"PRAGMA archive.journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.close()
+    connection_info["archive_attached"] = True
+
+
+def _sqlite_listeners(url: str) -> dict:
+    """Pragmas on every new connection, plus the attendance archive once its file exists
+
+    The archive job creates the file; until then connections skip the ATTACH, so databases
+    that never archive get no extra file. A connection opened before the first archive run
+    attaches it at its next checkout.
+    """
+    archive = sqlite_archive_path(make_url(url).database)
+
+    def attach_if_archived(dbapi_connection, connection_record) -> None:
+        if not connection_record.info.get("archive_attached") and archive != ":memory:" and os.path.exists(archive):
+            attach_sqlite_archive(dbapi_connection, connection_record.info, archive)
+
+    def on_connect(dbapi_connection, connection_record):
+        _set_sqlite_pragmas(dbapi_connection, connection_record)
+        attach_if_archived(dbapi_connection, connection_record)
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        attach_if_archived(dbapi_connection, connection_record)
+
+    return {"connect": on_connect, "checkout": on_checkout}
+
+
+def _engine_options(url: str, asynchronous: bool) -> dict:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    poolclass = InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool
+    kwargs = {}
+    connect_args = {}
+
+    if backend == "sqlite":
+        if not asynchronous:
+            connect_args["check_same_thread"] = False
+        in_memory = parsed.database in (None, "", ":memory:")
+        if not in_memory:
+            kwargs.update(
+                poolclass=poolclass,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+            )
+    else:
+        kwargs.update(
+            poolclass=poolclass,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+            timeout = str(int(settings.DB_STATEMENT_TIMEOUT_MS))
+            if asynchronous:
+                connect_args["server_settings"] = {"statement_timeout": timeout}
+            else:
+                connect_args["options"] = f"-c statement_timeout={timeout}"
+
+    kwargs["connect_args"] = connect_args
+    return kwargs
+
+
+def _timed_statements() -> bool:
+    # The per-request stats and the slow-query log both feed on the statement timing hooks
+    return settings.SQL_INSTRUMENTATION or settings.SLOW_QUERY_LOG
+
+
+def build_engine(url: str) -> Engine:
+    """Create an engine with pool sizing and per-dialect tuning taken from settings"""
+    new_engine = create_engine(url, **_engine_options(url, asynchronous=False))
+    if make_url(url).get_backend_name() == "sqlite":
+        for name, listener in _sqlite_listeners(url).items():
+            event.listen(new_engine, name, listener)
+    if _timed_statements():
+        instrument_engine(new_engine)
+    return new_engine
+
+
+def build_async_engine(url: str) -> AsyncEngine:
+    """Async counterpart of build_engine using asyncpg / aiosqlite"""
+    parsed = make_url(url)
+    async_url = parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()])
+    new_engine = create_async_engine(async_url, **_engine_options(url, asynchronous=True))
+    if parsed.get_backend_name() == "sqlite":
+        for name, listener in _sqlite_listeners(url).items():
+            event.listen(new_engine.sync_engine, name, listener)
+    if _timed_statements():
+        instrument_engine(new_engine.sync_engine)
+        slow_query_log.register_async_engine(new_engine)
+    return new_engine
+
+
+def pool_status(target: Engine | AsyncEngine) -> dict:
+    """Live pool occupancy plus checkout wait telemetry for an engine"""
+    pool = target.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+            timeout_s=pool.timeout(),
+        )
+    telemetry = getattr(pool, "telemetry", None)
+    if telemetry is not None:
+        status.update(telemetry.snapshot())
+    return status
+
+
+def dialect_insert(bind: Engine | AsyncEngine):
+    """Dialect-specific insert() construct, which adds on_conflict_do_update / do_nothing"""
+    backend = bind.dialect.name
+    if backend == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif backend == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {backend}")
+    return insert
+
+
+# Set per request by ReadYourWritesMiddleware; holds a flag once the request writes to the primary
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+def _mark_request_write(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes["primary"] = True
+
+
+def request_wrote_primary() -> bool:
+    writes = _request_writes.get()
+    return bool(writes and writes.get("primary"))
+
+
+class ReadYourWritesMiddleware:
+    """Scopes the primary-write marker to a single HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_writes.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_writes.reset(token)
+
+
+class RoutingSession(Session):
+    """Reads go to the replica until the current request writes to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary, replica = self.info["primary"], self.info["replica"]
+        if self._flushing or getattr(clause, "is_dml", False) or request_wrote_primary():
+            return primary
+        return replica
+
 
 # Create database engine
-engine = create_engine(settings.DATABASE_URL)
+engine = build_engine(settings.DATABASE_URL)
+event.listen(engine, "after_cursor_execute", _mark_request_write)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async engine; routers fall back to the sync engine via ThreadedAsyncSession
+async_engine = build_async_engine(settings.DATABASE_URL) if settings.DB_ASYNC else None
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _mark_request_write)
+
+# Optional read replica for GET-only list and report endpoints
+read_engine = build_engine(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else None
+ReadSessionLocal = (
+    sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False,
+        info={"primary": engine, "replica": read_engine},
+    )
+    if read_engine is not None
+    else SessionLocal
+)
+async_read_engine = (
+    build_async_engine(settings.READ_DATABASE_URL)
+    if settings.READ_DATABASE_URL and settings.DB_ASYNC
+    else None
+)
+AsyncReadSessionLocal = (
+    async_sessionmaker(
+        sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+        info={"primary": async_engine.sync_engine, "replica": async_read_engine.sync_engine},
+    )
+    if async_read_engine is not None
+    else AsyncSessionLocal
+)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -20,3 +327,94 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ThreadedAsyncSession:
+    """AsyncSession-compatible facade over a sync Session.
+
+    Each database call runs in the threadpool, so async routes keep working on
+    the sync engine when DB_ASYNC is off. Row-returning results are buffered
+    before leaving the worker thread, matching AsyncSession semantics.
+    """
+
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return self.sync_session.get_bind(mapper, clause=clause, **kw)
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def _execute_buffered(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        if isinstance(result, CursorResult) and not result.returns_rows:
+            return result
+        return result.freeze()()
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self._execute_buffered, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalars()
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalar()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def merge(self, instance, load: bool = True):
+        return await run_in_threadpool(self.sync_session.merge, instance, load=load)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def _async_session(async_factory, sync_factory):
+    if async_factory is not None:
+        async with async_factory() as session:
+            yield session
+    else:
+        session = ThreadedAsyncSession(sync_factory())
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+# Async dependency used by the async routers
+async def get_async_db():
+    async for session in _async_session(AsyncSessionLocal, SessionLocal):
+        yield session
+
+
+# Read-only async dependency for GET list/report routes (replica when configured)
+async def get_async_read_db():
+    async for session in _async_session(AsyncReadSessionLocal, ReadSessionLocal):
+        yield session
@@ -0,0 +1,127 @@
+"""
+Streaming CSV/XLSX exports read through a server-side cursor with constant memory
+"""
+import csv
+import enum
+import io
+import tempfile
+from datetime import date, datetime
+from typing import Iterator, Sequence
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from config import settings
+from database import ReadSessionLocal
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+XLSX_READ_SIZE = 64 * 1024
+# Rows per worksheet in Excel, header included; longer exports continue on another sheet
+XLSX_MAX_ROWS = 1_048_576
+# Text starting with these is run as a formula by spreadsheet apps opening a CSV
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _cell(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _rows(query) -> Iterator[list]:
+    """Yield rows from a fresh read session, fetching EXPORT_YIELD_PER rows at a time"""
+    # A session of its own: the response body is produced after the request's session closed
+    with ReadSessionLocal() as db:
+        result = db.execute(query.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        for partition in result.partitions():
+            for row in partition:
+                yield [_cell(value) for value in row]
+
+
+def _csv_text(value):
+    """Quote text that a spreadsheet would otherwise evaluate (CSV formula injection)"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunks(query, header: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for n, row in enumerate(_rows(query), start=1):
+        writer.writerow([_csv_text(value) for value in row])
+        if n % settings.EXPORT_YIELD_PER == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx_sheet_name(sheet: str, number: int) -> str:
+    if number == 1:
+        return sheet[:31]
+    suffix = f" ({number})"
+    return sheet[:31 - len(suffix)] + suffix
+
+
+def _xlsx_text(worksheet, value):
+    """Keep text starting with "=" a string; openpyxl would store it as a formula"""
+    if isinstance(value, str) and value.startswith("="):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.data_type = "s"
+        return cell
+    return value
+
+
+def _xlsx_chunks(query, header: Sequence[str], sheet: str) -> Iterator[bytes]:
+    """The workbook is spooled whole before its first byte can be sent (a zip's directory
+    comes last), so large ranges take a while to start downloading; CSV streams at once"""
+    from openpyxl import Workbook
+
+    # Write-only workbooks spool rows to a temp file instead of keeping them in memory
+    workbook = Workbook(write_only=True)
+    sheets = 0
+    rows_left = 0
+    for row in _rows(query):
+        if rows_left == 0:
+            sheets += 1
+            worksheet = workbook.create_sheet(_xlsx_sheet_name(sheet, sheets))
+            worksheet.append(list(header))
+            rows_left = XLSX_MAX_ROWS - 1
+        worksheet.append([_xlsx_text(worksheet, value) for value in row])
+        rows_left -= 1
+    if sheets == 0:
+        workbook.create_sheet(_xlsx_sheet_name(sheet, 1)).append(list(header))
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while chunk := spool.read(XLSX_READ_SIZE):
+            yield chunk
+
+
+def export_response(query, header: Sequence[str], export_format: str, filename: str, sheet: str) -> StreamingResponse:
+    """Stream `query` (a select of plain columns) as a CSV or XLSX attachment"""
+    if export_format == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="XLSX export requires openpyxl; install it or request format=csv"
+            )
+        body = _xlsx_chunks(query, header, sheet)
+    else:
+        body = _csv_chunks(query, header)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
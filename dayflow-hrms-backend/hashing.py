@@ -0,0 +1,163 @@
+"""
+Dedicated executor for bcrypt work so password checks never occupy the request threadpool
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+from config import settings
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    from auth import verify_password
+    return verify_password(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    from auth import get_password_hash
+    return get_password_hash(password)
+
+
+class PasswordHashPool:
+    """Bounded bcrypt executor with an admission queue and latency metrics"""
+
+    def __init__(self, workers: int, max_queue: int, use_processes: bool = False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._max_pending = 0
+        self._rejected = 0
+        self._completed = 0
+        self._verify_latencies: deque[float] = deque(maxlen=1024)
+        self._queue_waits: deque[float] = deque(maxlen=1024)
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use so importing the app does not spawn workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="pwhash"
+                        )
+        return self._executor
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many concurrent sign-in attempts, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self._max_pending = max(self._max_pending, self._pending)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def _run(self, fn, *args):
+        self._admit()
+        submitted = time.perf_counter()
+        try:
+            future = self.executor.submit(_timed, fn, *args)
+            result, started, finished = await asyncio.wrap_future(future)
+        finally:
+            self._release()
+        self._queue_waits.append(max(0.0, started - submitted))
+        return result, finished - submitted
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the hashing pool"""
+        result, elapsed = await self._run(_verify, plain_password, hashed_password)
+        self._verify_latencies.append(elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the hashing pool"""
+        result, _ = await self._run(_hash, password)
+        return result
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Hash a batch through admission control, at most one password per worker at a time
+
+        Sign-ins queue behind one window of the batch rather than the whole import;
+        like hash(), raises 429 when the queue is already full.
+        """
+        hashed: list[str] = []
+        for start in range(0, len(passwords), self.workers):
+            window = passwords[start:start + self.workers]
+            hashed.extend(await asyncio.gather(*(self.hash(password) for password in window)))
+        return hashed
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and latency figures for sizing the pool"""
+        with self._lock:
+            pending = self._pending
+            max_pending = self._max_pending
+            rejected = self._rejected
+            completed = self._completed
+        return {
+            "executor": "process" if self.use_processes else "thread",
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(pending, self.workers),
+            "queue_depth": max(0, pending - self.workers),
+            "max_pending": max_pending,
+            "completed": completed,
+            "rejected": rejected,
+            "verify_latency_ms": _summary(self._verify_latencies),
+            "queue_wait_ms": _summary(self._queue_waits),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _timed(fn, *args):
+    # time.perf_counter is system-wide on Linux, so worker processes report comparable stamps
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter()
+
+
+def _summary(samples) -> dict:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+    def pick(q: float) -> float:
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+    return {
+        "count": len(values),
+        "avg": round(sum(values) / len(values) * 1000, 2),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+password_hasher = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=settings.PASSWORD_HASH_USE_PROCESSES,
+)
@@ -0,0 +1,45 @@
+"""
+Credit the monthly leave accrual (LEAVE_ACCRUAL_DAYS) to every active employee.
+
+    python -m jobs.accrue_leave
+    python -m jobs.accrue_leave --month 2025-01 --months 3
+
+Each month is a handful of INSERT ... SELECT statements (a ledger entry and a
+balance upsert per leave type) in one transaction, for employees active and
+created before the month ends. A month is recorded in leave_accrual_runs when
+credited, so re-running it is a no-op. Schedule it on the first of the month.
+"""
+import argparse
+import time
+from datetime import date, datetime
+from database import SessionLocal
+from leave_balance import accrue_month
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--month", type=_month, default=date.today().replace(day=1),
+                        help="last month to credit, YYYY-MM (default: this month)")
+    parser.add_argument("--months", type=int, default=1, help="number of months ending at --month")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for offset in range(args.months - 1, -1, -1):
+            index = args.month.year * 12 + args.month.month - 1 - offset
+            period = date(index // 12, index % 12 + 1, 1)
+            employees = accrue_month(db, period)
+            db.commit()
+            if employees is None:
+                print(f"{period:%Y-%m}: already credited, skipped")
+            else:
+                print(f"{period:%Y-%m}: credited {employees} employees")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Move closed months of attendance_records into the archive.
+
+    python -m jobs.archive_attendance
+    python -m jobs.archive_attendance --hot-months 6 --vacuum
+    python -m jobs.archive_attendance --no-wait
+
+Every month older than ATTENDANCE_HOT_MONTHS is copied to archive.attendance_records
+(a separate attached database file on SQLite, the "archive" schema on PostgreSQL,
+optionally in ATTENDANCE_ARCHIVE_TABLESPACE) and recorded in attendance_archive_periods,
+one transaction per month. From then on the API answers those months from the archive.
+The job then waits ARCHIVE_CATALOG_TTL_SECONDS, so every worker has picked up the
+new boundary, and removes the copied months from the hot table: on PostgreSQL by
+dropping the monthly partition, on SQLite with a DELETE (--vacuum reclaims the space).
+With --no-wait the removal is left to the next run.
+
+On PostgreSQL the job also creates the monthly partitions for the next
+ATTENDANCE_PARTITION_MONTHS_AHEAD months; schedule it at least monthly.
+Re-running is safe: copies skip rows already archived.
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import text
+from attendance_archive import (
+    closed_months, copy_month, ensure_archive_storage, ensure_partitions,
+    hot_cutoff, is_partitioned, purge_month, unpurged_months,
+)
+from config import settings
+from database import SessionLocal, engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hot-months", type=int, default=settings.ATTENDANCE_HOT_MONTHS,
+                        help="whole months kept in attendance_records besides the current one")
+    parser.add_argument("--no-wait", action="store_true", help="do not wait to purge the months copied by this run")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite database after purging")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cutoff = hot_cutoff(args.hot_months)
+    with SessionLocal() as db:
+        if is_partitioned(db):
+            this_month = date.today().replace(day=1)
+            created = ensure_partitions(db, this_month, settings.ATTENDANCE_PARTITION_MONTHS_AHEAD + 1)
+            db.commit()
+            print(f"Partitions created: {', '.join(created) or 'none'}")
+        ensure_archive_storage(db)
+        db.commit()
+
+        for first in closed_months(db, cutoff):
+            rows = copy_month(db, first)
+            db.commit()
+            print(f"Archived {first:%Y-%m}: {rows} records")
+
+        if not args.no_wait:
+            grace = settings.ARCHIVE_CATALOG_TTL_SECONDS
+            if unpurged_months(db, datetime.now(timezone.utc)):
+                print(f"Waiting {grace}s for the archive boundary to reach every worker")
+                time.sleep(grace)
+        archived_before = datetime.now(timezone.utc) - timedelta(seconds=settings.ARCHIVE_CATALOG_TTL_SECONDS)
+        purged = 0
+        for first in unpurged_months(db, archived_before):
+            rows = purge_month(db, first)
+            db.commit()
+            purged += 1
+            print(f"Purged {first:%Y-%m} from attendance_records: {rows} records")
+
+    if args.vacuum and purged and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM main"))
+            conn.execute(text("VACUUM archive"))
+    print(f"Hot data starts at {cutoff:%Y-%m}; {purged} months purged in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
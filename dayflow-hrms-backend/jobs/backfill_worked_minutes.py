@@ -0,0 +1,42 @@
+"""
+Compute worked_minutes and overtime_minutes for attendance records.
+
+    python -m jobs.backfill_worked_minutes
+    python -m jobs.backfill_worked_minutes --recompute --batch-size 20000
+
+Fills records that have both a check-in and a check-out but no worked_minutes
+(run once after migration 0005). With --recompute every record is recalculated,
+e.g. after changing STANDARD_WORKDAY_MINUTES. Each id range of --batch-size
+rows is one short UPDATE ... SET transaction, so the job can run while the
+application is serving traffic and can be interrupted and resumed.
+"""
+import argparse
+import time
+from sqlalchemy import func, select
+from attendance_hours import backfill_statement
+from database import SessionLocal
+from models import AttendanceRecord
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=10000, help="record ids per transaction")
+    parser.add_argument("--recompute", action="store_true", help="recalculate records that already have values")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    updated = 0
+    with SessionLocal() as db:
+        first, last = db.execute(select(func.min(AttendanceRecord.id), func.max(AttendanceRecord.id))).one()
+        if first is None:
+            print("No attendance records")
+            return
+        for low in range(first, last + 1, args.batch_size):
+            high = min(low + args.batch_size - 1, last)
+            updated += db.execute(backfill_statement(db.get_bind().dialect, low, high, args.recompute)).rowcount
+            db.commit()
+    print(f"Updated {updated} records in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
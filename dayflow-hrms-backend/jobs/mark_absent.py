@@ -0,0 +1,56 @@
+"""
+Close out finished days: record absences and deal with forgotten check-outs.
+
+    python -m jobs.mark_absent
+    python -m jobs.mark_absent --date 2025-01-31 --days 31
+    python -m jobs.mark_absent --policy close
+
+For each day (default: yesterday) every active employee (role employee) without an attendance
+record and without approved leave gets an ABSENT record (on WORKING_DAYS only,
+unless --all-days). Records with a check-in but no check-out are noted as
+"[missing check-out]" or, with --policy close (MISSING_CHECKOUT_POLICY),
+closed after STANDARD_WORKDAY_MINUTES. Each day is two set-based statements
+plus a rollup recount in one transaction, so re-running a day is harmless.
+Schedule it nightly after midnight; today and archived months are refused.
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from attendance_archive import archived_through_sync
+from attendance_sweep import MISSING_CHECKOUT_POLICIES, sweep_day, working_weekdays
+from config import settings
+from database import SessionLocal
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today() - timedelta(days=1),
+                        help="last day to sweep (default: yesterday)")
+    parser.add_argument("--days", type=int, default=1, help="number of days ending at --date")
+    parser.add_argument("--policy", choices=MISSING_CHECKOUT_POLICIES, default=settings.MISSING_CHECKOUT_POLICY,
+                        help="what to do with records missing a check-out")
+    parser.add_argument("--all-days", action="store_true", help="also mark absences on days outside WORKING_DAYS")
+    args = parser.parse_args()
+    if args.policy not in MISSING_CHECKOUT_POLICIES:
+        sys.exit(f"MISSING_CHECKOUT_POLICY must be one of {', '.join(MISSING_CHECKOUT_POLICIES)}")
+    if args.date >= date.today():
+        sys.exit("Only finished days can be swept; --date must be before today")
+
+    started = time.perf_counter()
+    weekdays = working_weekdays()
+    with SessionLocal() as db:
+        through = archived_through_sync(db)
+        for offset in range(args.days - 1, -1, -1):
+            day = args.date - timedelta(days=offset)
+            if through is not None and day <= through:
+                print(f"{day}: archived, skipped")
+                continue
+            result = sweep_day(db, day, args.policy, mark_absent=args.all_days or day.weekday() in weekdays)
+            db.commit()
+            print(f"{day}: {result['marked_absent']} marked absent, {result['open_checkins']} open check-ins ({args.policy})")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
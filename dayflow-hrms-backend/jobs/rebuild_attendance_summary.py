@@ -0,0 +1,33 @@
+"""
+Rebuild daily_attendance_summary from attendance_records.
+
+    python -m jobs.rebuild_attendance_summary
+    python -m jobs.rebuild_attendance_summary --start 2025-01-01 --end 2025-01-31
+
+Run after restoring or bulk-editing attendance data, or after department
+reorganizations done directly in the database (the users API re-keys the
+rollup itself; the rollup keeps the department a record was counted under).
+The range is replaced in one transaction.
+"""
+import argparse
+import time
+from datetime import date
+from attendance_summary import rebuild_summary
+from database import SessionLocal
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=date.fromisoformat, help="first day to rebuild (default: earliest)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day to rebuild (default: latest)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        rows = rebuild_summary(db, args.start, args.end)
+        db.commit()
+    print(f"Rebuilt {rows} summary rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Recompute leave_balances from the leave ledger and leave requests.
+
+    python -m jobs.rebuild_leave_balances
+
+Accrued days come from the ledger's accrual and adjustment entries; taken and
+pending days from approved and pending requests (working days per WORKING_DAYS).
+Days taken that the ledger does not record yet, such as leave approved before
+balances existed, get ledger entries first. Run once after migrating to balances,
+and after changing WORKING_DAYS. Everything is replaced in one transaction.
+"""
+import argparse
+import time
+from database import SessionLocal
+from leave_balance import rebuild_balances
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        rows = rebuild_balances(db)
+        db.commit()
+    print(f"Rebuilt {rows} leave balances in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
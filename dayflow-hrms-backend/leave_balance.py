@@ -0,0 +1,265 @@
+"""
+Leave ledger and materialized balances per (user, leave type, year), kept in step with leave requests
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import Date, Float, Integer, String, delete, func, literal, select, update
+from attendance_sweep import working_weekdays
+from config import settings
+from database import dialect_insert
+from models import LeaveAccrualRun, LeaveBalance, LeaveLedgerEntry, LeaveRequest, LeaveStatus, LeaveType, User
+
+BALANCE_KEY = ["user_id", "leave_type", "year"]
+
+
+def accrual_days() -> dict[LeaveType, float]:
+    """Monthly accrual per balance-tracked leave type, from LEAVE_ACCRUAL_DAYS ("annual:1.5,...")"""
+    accruals = {}
+    for item in settings.LEAVE_ACCRUAL_DAYS.split(","):
+        if item.strip():
+            name, _, days = item.partition(":")
+            accruals[LeaveType(name.strip().lower())] = float(days)
+    return accruals
+
+
+def leave_days(start_date: date, end_date: date) -> dict[int, float]:
+    """Working days (WORKING_DAYS) a leave covers, split by calendar year"""
+    weekdays = working_weekdays()
+    days: dict[int, float] = {}
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            days[day.year] = days.get(day.year, 0.0) + 1
+        day += timedelta(days=1)
+    return days
+
+
+def _balance_upsert_statement(bind, source=None):
+    """Add accrued/taken/pending deltas to balance rows, creating missing ones"""
+    table = LeaveBalance.__table__
+    stmt = dialect_insert(bind)(table)
+    if source is not None:
+        stmt = stmt.from_select(BALANCE_KEY + ["accrued", "taken", "pending"], source)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=BALANCE_KEY,
+        set_={
+            "accrued": table.c.accrued + excluded.accrued,
+            "taken": table.c.taken + excluded.taken,
+            "pending": table.c.pending + excluded.pending,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _share(leave_status: Optional[LeaveStatus], days: float) -> tuple:
+    """(pending, taken) days a request in `leave_status` holds; rejected and deleted hold none"""
+    if leave_status == LeaveStatus.PENDING:
+        return days, 0.0
+    if leave_status == LeaveStatus.APPROVED:
+        return 0.0, days
+    return 0.0, 0.0
+
+
+async def apply_leave_change(
+    db,
+    leave: LeaveRequest,
+    before: Optional[LeaveStatus],
+    after: Optional[LeaveStatus],
+    actor_id: Optional[int] = None,
+) -> None:
+    """Move a request's days between pending and taken, recording taken/restored days in the ledger,
+    inside the caller's transaction (before/after None = request not existing)"""
+    await apply_leave_changes(db, [leave], before, after, actor_id)
+
+
+async def apply_leave_changes(
+    db,
+    leaves,
+    before: Optional[LeaveStatus],
+    after: Optional[LeaveStatus],
+    actor_id: Optional[int] = None,
+) -> None:
+    """apply_leave_change for many requests (objects or rows) making the same transition,
+    as one balance upsert and one ledger insert"""
+    tracked = accrual_days()
+    before = LeaveStatus(before) if before is not None else None
+    after = LeaveStatus(after) if after is not None else None
+    # One row per balance key: a multi-row upsert may not touch the same row twice
+    balances: dict[tuple, list] = defaultdict(lambda: [0.0, 0.0])
+    entries = []
+    for leave in leaves:
+        if LeaveType(leave.leave_type) not in tracked:
+            continue
+        for year, days in leave_days(leave.start_date, leave.end_date).items():
+            (pending_before, taken_before), (pending_after, taken_after) = _share(before, days), _share(after, days)
+            pending, taken = pending_after - pending_before, taken_after - taken_before
+            if pending or taken:
+                balance = balances[(leave.user_id, leave.leave_type, year)]
+                balance[0] += taken
+                balance[1] += pending
+            if taken:
+                entries.append({"user_id": leave.user_id, "leave_type": leave.leave_type, "year": year,
+                                "kind": "taken" if taken > 0 else "restored", "days": -taken,
+                                "leave_request_id": leave.id, "created_by": actor_id})
+    if balances:
+        await db.execute(_balance_upsert_statement(db.bind), [
+            {"user_id": user_id, "leave_type": leave_type, "year": year,
+             "accrued": 0.0, "taken": taken, "pending": pending}
+            for (user_id, leave_type, year), (taken, pending) in balances.items()
+        ])
+    if entries:
+        await db.execute(LeaveLedgerEntry.__table__.insert(), entries)
+
+
+async def reserve_leave(db, leave: LeaveRequest) -> None:
+    """Hold a new (flushed) request's days as pending; with LEAVE_BALANCE_ENFORCED, only if the
+    balance covers them
+
+    The check and the hold are one conditional UPDATE per year on the balance's primary key,
+    so concurrent requests cannot both spend the same days.
+    """
+    leave_type = LeaveType(leave.leave_type)
+    if leave_type not in accrual_days():
+        return
+    if not settings.LEAVE_BALANCE_ENFORCED:
+        await apply_leave_change(db, leave, None, LeaveStatus.PENDING)
+        return
+    for year, days in leave_days(leave.start_date, leave.end_date).items():
+        held = await db.execute(
+            update(LeaveBalance)
+            .where(
+                LeaveBalance.user_id == leave.user_id,
+                LeaveBalance.leave_type == leave_type,
+                LeaveBalance.year == year,
+                LeaveBalance.accrued - LeaveBalance.taken - LeaveBalance.pending >= days,
+            )
+            .values(pending=LeaveBalance.pending + days)
+        )
+        if held.rowcount != 1:
+            balance = await db.get(LeaveBalance, (leave.user_id, leave_type, year))
+            available = balance.accrued - balance.taken - balance.pending if balance is not None else 0.0
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Insufficient {leave_type.value} leave for {year}: "
+                       f"{available:g} days available, {days:g} requested"
+            )
+
+
+def balance_response(user_id: int, leave_type: LeaveType, year: int, balance: Optional[LeaveBalance]) -> dict:
+    accrued, taken, pending = (balance.accrued, balance.taken, balance.pending) if balance else (0.0, 0.0, 0.0)
+    return {
+        "user_id": user_id, "leave_type": leave_type, "year": year,
+        "accrued": accrued, "taken": taken, "pending": pending, "available": accrued - taken - pending,
+    }
+
+
+async def leave_balances(db, user_id: int, year: int) -> list[dict]:
+    """Balance of every tracked leave type for one user and year (a primary-key range read)"""
+    rows = await db.scalars(select(LeaveBalance).where(LeaveBalance.user_id == user_id, LeaveBalance.year == year))
+    stored = {LeaveType(row.leave_type): row for row in rows}
+    return [balance_response(user_id, leave_type, year, stored.get(leave_type)) for leave_type in accrual_days()]
+
+
+async def adjust_balance(db, user_id: int, leave_type: LeaveType, year: int, days: float,
+                         note: Optional[str], actor_id: int) -> None:
+    """Manual credit (positive) or debit (negative) of accrued days, e.g. opening balances"""
+    await db.execute(_balance_upsert_statement(db.bind), [
+        {"user_id": user_id, "leave_type": leave_type, "year": year, "accrued": days, "taken": 0.0, "pending": 0.0}
+    ])
+    await db.execute(LeaveLedgerEntry.__table__.insert(), [
+        {"user_id": user_id, "leave_type": leave_type, "year": year, "kind": "adjustment", "days": days,
+         "note": note, "created_by": actor_id}
+    ])
+
+
+def accrue_month(db, period: date) -> Optional[int]:
+    """Credit one month's accrual to every active employee with set-based statements (sync session;
+    caller commits). Returns the number of employees, or None when the month was already credited."""
+    period = period.replace(day=1)
+    claimed = db.execute(
+        dialect_insert(db.bind)(LeaveAccrualRun).values(period=period).on_conflict_do_nothing()
+    ).rowcount
+    if not claimed:
+        return None
+    next_month = (period + timedelta(days=32)).replace(day=1)
+    employees = select(User.id).where(
+        User.is_active == True,  # noqa: E712
+        User.created_at < datetime.combine(next_month, time()),
+    )
+    count = db.scalar(select(func.count()).select_from(employees.subquery()))
+    leave_type_column = LeaveBalance.__table__.c.leave_type
+    for leave_type, days in accrual_days().items():
+        credit = (
+            literal(leave_type, leave_type_column.type).label("leave_type"),
+            literal(period.year, Integer).label("year"),
+            literal(days, Float).label("days"),
+        )
+        db.execute(
+            LeaveLedgerEntry.__table__.insert().from_select(
+                ["user_id", "leave_type", "year", "days", "kind", "period"],
+                employees.add_columns(*credit, literal("accrual", String), literal(period, Date)),
+            )
+        )
+        db.execute(_balance_upsert_statement(
+            db.bind, employees.add_columns(*credit, literal(0.0, Float), literal(0.0, Float)),
+        ))
+    db.execute(update(LeaveAccrualRun).where(LeaveAccrualRun.period == period).values(employees=count))
+    return count
+
+
+def rebuild_balances(db) -> int:
+    """Recompute every balance from the ledger's accruals/adjustments and the current requests,
+    first adding ledger entries for days taken that it does not record yet (e.g. leave approved
+    before balances existed). Sync session; caller commits. Returns the number of balance rows."""
+    tracked = list(accrual_days())
+    ledger = LeaveLedgerEntry.__table__
+    totals = defaultdict(lambda: [0.0, 0.0, 0.0])  # (user, type, year) -> accrued, taken, pending
+    for user_id, leave_type, year, days in db.execute(
+        select(ledger.c.user_id, ledger.c.leave_type, ledger.c.year, func.sum(ledger.c.days))
+        .where(ledger.c.kind.in_(("accrual", "adjustment")), ledger.c.leave_type.in_(tracked))
+        .group_by(ledger.c.user_id, ledger.c.leave_type, ledger.c.year)
+    ):
+        totals[(user_id, leave_type, year)][0] = days
+    recorded = {
+        (request_id, year): -days
+        for request_id, year, days in db.execute(
+            select(ledger.c.leave_request_id, ledger.c.year, func.sum(ledger.c.days))
+            .where(ledger.c.kind.in_(("taken", "restored")), ledger.c.leave_request_id.isnot(None))
+            .group_by(ledger.c.leave_request_id, ledger.c.year)
+        )
+    }
+    corrections = []
+    for leave in db.execute(
+        select(LeaveRequest.id, LeaveRequest.user_id, LeaveRequest.leave_type, LeaveRequest.start_date,
+               LeaveRequest.end_date, LeaveRequest.status)
+        .where(LeaveRequest.leave_type.in_(tracked))
+    ).yield_per(settings.EXPORT_YIELD_PER):
+        for year, days in leave_days(leave.start_date, leave.end_date).items():
+            pending, taken = _share(leave.status, days)
+            balance = totals[(leave.user_id, leave.leave_type, year)]
+            balance[1] += taken
+            balance[2] += pending
+            missing = taken - recorded.get((leave.id, year), 0.0)
+            if missing:
+                corrections.append({"user_id": leave.user_id, "leave_type": leave.leave_type, "year": year,
+                                    "kind": "taken" if missing > 0 else "restored", "days": -missing,
+                                    "leave_request_id": leave.id, "note": "balance rebuild"})
+    if corrections:
+        db.execute(ledger.insert(), corrections)
+    db.execute(delete(LeaveBalance))
+    if totals:
+        db.execute(LeaveBalance.__table__.insert(), [
+            {"user_id": user_id, "leave_type": leave_type, "year": year,
+             "accrued": accrued, "taken": taken, "pending": pending}
+            for (user_id, leave_type, year), (accrued, taken, pending) in totals.items()
+        ])
+    return len(totals)
+
+
+async def delete_user_balances(db, user_id: int) -> None:
+    """Drop a user's balances and ledger (their requests go with the user)"""
+    await db.execute(delete(LeaveLedgerEntry).where(LeaveLedgerEntry.user_id == user_id))
+    await db.execute(delete(LeaveBalance).where(LeaveBalance.user_id == user_id))
@@ -0,0 +1,62 @@
+"""
+Date-range lookups on leave requests: overlap checks and who is on leave, over the
+(user_id, start_date, end_date) index
+"""
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import and_, select
+from models import LeaveRequest, LeaveStatus, User
+
+# Requests that occupy their dates; rejected ones do not
+BLOCKING_STATUSES = (LeaveStatus.PENDING, LeaveStatus.APPROVED)
+
+
+def overlapping(start_date: date, end_date: date):
+    """Range predicate for leave sharing at least one day with [start_date, end_date]"""
+    return and_(LeaveRequest.start_date <= end_date, LeaveRequest.end_date >= start_date)
+
+
+async def ensure_no_overlap(
+    db,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    exclude_id: Optional[int] = None,
+) -> None:
+    """Raise 409 if the user already has pending or approved leave on any of these days
+
+    Locks the user's row first (PostgreSQL), so two concurrent requests for the same
+    user cannot both pass the check; call it before inserting or re-opening the request.
+    """
+    await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+    query = select(LeaveRequest.id, LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.status).where(
+        LeaveRequest.user_id == user_id,
+        overlapping(start_date, end_date),
+        LeaveRequest.status.in_(BLOCKING_STATUSES),
+    )
+    if exclude_id is not None:
+        query = query.where(LeaveRequest.id != exclude_id)
+    clash = (await db.execute(query.order_by(LeaveRequest.start_date).limit(1))).first()
+    if clash:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Overlaps {clash.status.value} leave request {clash.id} "
+                   f"({clash.start_date.isoformat()} to {clash.end_date.isoformat()})"
+        )
+
+
+def on_leave_query(start_date: date, end_date: date, department: Optional[str] = None,
+                   include_pending: bool = False):
+    """Leave overlapping [start_date, end_date] with its employee, optionally for one department"""
+    query = select(
+        LeaveRequest.user_id, User.employee_id, User.full_name.label("user_name"), User.department,
+        LeaveRequest.id.label("leave_request_id"), LeaveRequest.leave_type,
+        LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.status,
+    ).join(User, User.id == LeaveRequest.user_id).where(
+        overlapping(start_date, end_date),
+        LeaveRequest.status.in_(BLOCKING_STATUSES if include_pending else (LeaveStatus.APPROVED,)),
+    )
+    if department:
+        query = query.where(User.department == department)
+    return query.order_by(User.department, User.full_name, LeaveRequest.start_date, LeaveRequest.id)
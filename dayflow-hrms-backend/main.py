@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
+from database import engine, ReadYourWritesMiddleware
 from config import settings
+from hashing import password_hasher
+from query_stats import QueryStatsMiddleware
+from schema_check import prepare_schema
+from attendance_buffer import attendance_buffer
 
 # Import routers
-from routers import auth_routes, user_routes, attendance_routes, leave_routes, payroll_routes, master_employee_routes
+from routers import auth_routes, user_routes, attendance_routes, leave_routes, payroll_routes, master_employee_routes, ops_routes, report_routes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A single alembic_version check; create_all only for an empty development database (DB_SCHEMA_MODE)
+    await run_in_threadpool(prepare_schema, engine)
+    if settings.ATTENDANCE_WRITE_BEHIND:
+        # Replays the journal and loads today's records before the first punch is accepted
+        await run_in_threadpool(attendance_buffer.start)
+    yield
+    await run_in_threadpool(attendance_buffer.stop)
+    password_hasher.shutdown()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -15,9 +31,17 @@ app = FastAPI(
     description="Human Resource Management System API with JWT authentication",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan,
 )
 
+# Route replica reads back to the primary once a request has written
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Count SQL statements and DB time per request
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(QueryStatsMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +49,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Queries", "X-DB-N-Plus-One", "X-Next-Cursor"],
 )
 
 # Include routers
@@ -34,6 +59,8 @@ app.include_router(attendance_routes.router)
 app.include_router(leave_routes.router)
 app.include_router(payroll_routes.router)
 app.include_router(master_employee_routes.router)
+app.include_router(ops_routes.router)
+app.include_router(report_routes.router)
 
 
 @app.get("/")
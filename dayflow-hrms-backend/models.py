@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, Float, ForeignKey, Text, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, Float, ForeignKey, Text, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -85,14 +85,33 @@ class User(Base):
     payroll_records = relationship("PayrollRecord", back_populates="user", cascade="all, delete-orphan")
 
 
+class LoginIdCounter(Base):
+    """Last issued login-ID serial per company prefix and joining year"""
+    __tablename__ = "login_id_counters"
+
+    prefix = Column(String, primary_key=True)
+    joining_year = Column(Integer, primary_key=True)
+    last_serial = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class AttendanceRecord(Base):
     __tablename__ = "attendance_records"
+    __table_args__ = (
+        # One record per employee per day; also serves the check-in/check-out lookup
+        Index("uq_attendance_records_user_id_date", "user_id", "date", unique=True),
+        # Date-range scans (monthly matrix, rollup refresh) answered from the index alone
+        Index("ix_attendance_records_date_user_id_status", "date", "user_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    date = Column(Date, nullable=False, index=True)
+    date = Column(Date, nullable=False)
     check_in = Column(DateTime(timezone=True), nullable=True)
     check_out = Column(DateTime(timezone=True), nullable=True)
+    # Derived from check_in/check_out on every write (NULL until both exist)
+    worked_minutes = Column(Integer, nullable=True)
+    overtime_minutes = Column(Integer, nullable=True)
     status = Column(Enum(AttendanceStatus), default=AttendanceStatus.PRESENT)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -102,8 +121,37 @@ class AttendanceRecord(Base):
     user = relationship("User", back_populates="attendance_records")
 
 
+class AttendanceArchivePeriod(Base):
+    """A closed month of attendance copied to archive.attendance_records (purged from the hot table once purged_at is set)"""
+    __tablename__ = "attendance_archive_periods"
+
+    period_start = Column(Date, primary_key=True)
+    period_end = Column(Date, nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    purged_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class DailyAttendanceSummary(Base):
+    """Attendance rollup per day, department and status, maintained alongside attendance writes"""
+    __tablename__ = "daily_attendance_summary"
+
+    date = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True, default="")  # "" for users without a department
+    status = Column(Enum(AttendanceStatus), primary_key=True)
+    headcount = Column(Integer, nullable=False, default=0)
+    checked_in = Column(Integer, nullable=False, default=0)
+    checked_out = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        Index("ix_leave_requests_user_id_created_at", "user_id", "created_at"),
+        Index("ix_leave_requests_status_created_at", "status", "created_at"),
+        Index("ix_leave_requests_user_id_start_date_end_date", "user_id", "start_date", "end_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -114,7 +162,7 @@ class LeaveRequest(Base):
     status = Column(Enum(LeaveStatus), default=LeaveStatus.PENDING)
     admin_notes = Column(Text, nullable=True)
     approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # leave list cursor key
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
@@ -122,8 +170,54 @@ class LeaveRequest(Base):
     approver = relationship("User", foreign_keys=[approved_by])
 
 
+class LeaveBalance(Base):
+    """Materialized leave balance per user, leave type and year; available = accrued - taken - pending"""
+    __tablename__ = "leave_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    leave_type = Column(Enum(LeaveType), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    accrued = Column(Float, nullable=False, default=0.0)
+    taken = Column(Float, nullable=False, default=0.0)
+    pending = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class LeaveLedgerEntry(Base):
+    """One change to a leave balance: accrual, adjustment, or days taken / restored by a request"""
+    __tablename__ = "leave_ledger"
+    __table_args__ = (
+        Index("ix_leave_ledger_user_id_year", "user_id", "year"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    leave_type = Column(Enum(LeaveType), nullable=False)
+    year = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False)  # accrual, adjustment, taken, restored
+    days = Column(Float, nullable=False)  # signed change to the balance
+    leave_request_id = Column(Integer, ForeignKey("leave_requests.id", ondelete="SET NULL"), nullable=True)
+    period = Column(Date, nullable=True)  # accrual month
+    note = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class LeaveAccrualRun(Base):
+    """Months already credited by the accrual job, so re-running a month is a no-op"""
+    __tablename__ = "leave_accrual_runs"
+
+    period = Column(Date, primary_key=True)
+    employees = Column(Integer, nullable=False, default=0)
+    ran_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class PayrollRecord(Base):
     __tablename__ = "payroll_records"
+    __table_args__ = (
+        Index("uq_payroll_records_user_id_year_month", "user_id", "year", "month", unique=True),
+        Index("ix_payroll_records_year_month", "year", "month"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,124 @@
+"""
+Opaque keyset cursors for list endpoints (offset paging stays available)
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, NamedTuple, Optional, Sequence
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, String, literal, tuple_
+from sqlalchemy.types import TypeDecorator
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# The cursor travels in a header rather than a {items, next_cursor} envelope so list bodies
+# stay plain arrays for existing clients; documented on every paginated route
+PAGINATED_RESPONSES = {
+    200: {
+        "description": "One page of results as a plain array",
+        "headers": {
+            NEXT_CURSOR_HEADER: {
+                "description": "Present when more rows exist; pass it back as ?cursor= for the next page",
+                "schema": {"type": "string"},
+            },
+        },
+    },
+}
+
+
+class SortKey(NamedTuple):
+    column: Any
+    descending: bool = False
+
+
+def _signature(keys: Sequence[SortKey]) -> str:
+    return ",".join(f"{key.column.key}{'-' if key.descending else '+'}" for key in keys)
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    return value
+
+
+def _load(value):
+    if isinstance(value, list):
+        kind, text = value
+        return datetime.fromisoformat(text) if kind == "dt" else date.fromisoformat(text)
+    return value
+
+
+def encode_cursor(keys: Sequence[SortKey], row) -> str:
+    """Cursor pointing just past `row` in the given sort order"""
+    payload = [_signature(keys), [_dump(getattr(row, key.column.key)) for key in keys]]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(keys: Sequence[SortKey], cursor: str) -> list:
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        signature, values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = [_load(value) for value in values]
+    except (ValueError, TypeError, binascii.Error):
+        raise invalid
+    if signature != _signature(keys) or len(values) != len(keys):
+        raise invalid
+    return values
+
+
+class CursorDateTime(TypeDecorator):
+    """Datetime cursor value, bound in the format of the dialect executing the query
+
+    server_default timestamps are stored by SQLite as "YYYY-MM-DD HH:MM:SS" text; binding the
+    same text there makes equal rows compare equal instead of sorting before SQLAlchemy's
+    ".ffffff" format. The dialect is the executing connection's, so replica, async and
+    scratch sessions each get their own.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(String()) if dialect.name == "sqlite" else self.impl_instance
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        text = value.strftime("%Y-%m-%d %H:%M:%S")
+        if value.microsecond:
+            text += f".{value.microsecond:06d}"
+        return text
+
+
+def _bind(column, value):
+    if isinstance(value, datetime):
+        return literal(value, CursorDateTime(timezone=getattr(column.type, "timezone", False)))
+    return value
+
+
+def paginate(query, keys: Sequence[SortKey], cursor: Optional[str], skip: int, limit: int):
+    """Order by `keys` and fetch one row past the page; a cursor replaces the offset
+
+    All keys share one direction so the seek is a single row-value comparison
+    that both PostgreSQL and SQLite can answer from a matching index.
+    """
+    descending = keys[0].descending
+    assert all(key.descending == descending for key in keys), "mixed sort directions are not supported"
+    columns = [key.column for key in keys]
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in columns))
+    if cursor:
+        values = decode_cursor(keys, cursor)
+        bound = tuple_(*(_bind(column, value) for column, value in zip(columns, values)))
+        query = query.filter(tuple_(*columns) < bound if descending else tuple_(*columns) > bound)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def finish_page(rows: list, keys: Sequence[SortKey], limit: int, response: Response) -> list:
+    """Trim the look-ahead row and advertise the next cursor in the X-Next-Cursor header"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(keys, rows[-1])
+    return rows
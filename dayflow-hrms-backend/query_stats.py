@@ -0,0 +1,138 @@
+"""
+Per-request SQL instrumentation: statement counts, DB time and N+1 detection
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import settings
+
+logger = logging.getLogger("dayflow.sql")
+
+
+class RequestQueryStats:
+    """SQL statements issued while serving one request"""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "")
+
+    def record(self, statement: str, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.shapes[statement] += 1
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes issued at least `threshold` times (likely N+1 loops)"""
+        if threshold <= 0:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+# Extra per-statement consumers (e.g. the slow-query log):
+# listener(conn, statement, parameters, executemany, elapsed, stats)
+statement_listeners = []
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    elapsed = time.perf_counter() - started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for listener in statement_listeners:
+        listener(conn, statement, parameters, executemany, elapsed, stats)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(target: Engine) -> None:
+    """Attach the timing hooks to an engine (use engine.sync_engine for async engines)"""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Collects per-request SQL stats; adds Server-Timing / X-DB-Queries headers in development
+    and emits a structured log line otherwise. Flags repeated statement shapes as N+1."""
+
+    def __init__(self, app):
+        self.app = app
+        self.expose_headers = settings.ENVIRONMENT == "development"
+        self.threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and self.expose_headers:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries"'.encode()))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                suspects = stats.repeated_shapes(self.threshold)
+                if suspects:
+                    headers.append((b"x-db-n-plus-one", str(max(n for _, n in suspects)).encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope: dict, stats: RequestQueryStats) -> None:
+        suspects = stats.repeated_shapes(self.threshold)
+        for shape, n in suspects:
+            logger.warning(json.dumps({
+                "event": "sql.n_plus_one",
+                "method": scope.get("method"),
+                "route": stats.route,
+                "repeats": n,
+                "statement": " ".join(shape.split())[:500],
+            }))
+        if not self.expose_headers and stats.count:
+            logger.info(json.dumps({
+                "event": "sql.request",
+                "method": scope.get("method"),
+                "route": stats.route,
+                "queries": stats.count,
+                "db_ms": round(stats.total_time * 1000, 2),
+                "distinct_statements": len(stats.shapes),
+            }))
@@ -2,6 +2,7 @@
 Recreate database with fresh schema
 """
 from database import engine, Base
+from schema_check import create_schema
 from models import User, MasterEmployee, AttendanceRecord, LeaveRequest, PayrollRecord
 import os
 import time
@@ -22,8 +23,8 @@ if os.path.exists(db_path):
             print(f"Error dropping tables: {e}")
         time.sleep(1)
 
-# Create all tables with new schema
-Base.metadata.create_all(bind=engine)
+# Create all tables with new schema, stamped at the migration head
+create_schema(engine)
 print("✓ Created all tables with fresh schema")
 print("\nTables created:")
 for table in Base.metadata.sorted_tables:    print(f"  - {table.name}")
\ No newline at end of file
@@ -1,28 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date
-from database import get_db
+import time
+from database import get_async_db, get_async_read_db
 from models import User, AttendanceRecord
-from schemas import AttendanceRecordCreate, AttendanceRecordResponse, AttendanceRecordUpdate, AttendanceStats
-from auth import get_current_user, get_current_admin_user
+from schemas import AttendanceCheckAck, AttendanceMatrix, DepartmentHours, EmployeeHours, AttendanceRecordCreate, AttendanceRecordResponse, AttendanceRecordUpdate, AttendanceStats, PunchIngestResult
+from auth import get_current_user, get_current_admin_user, get_ingest_caller
+from attendance_ingest import CsvPunchParser, ingest_stream, parse_ndjson
+from attendance_stats import attendance_stats, summary_stats
+from attendance_summary import apply_summary_delta, contribution
+from attendance_buffer import attendance_buffer
+from attendance_matrix import attendance_matrix
+from attendance_hours import apply_worked_minutes, department_hours, employee_hours
+from attendance_archive import archived_through, get_archived_record, records_for_range
+from pagination import PAGINATED_RESPONSES, SortKey, finish_page, paginate
 
 router = APIRouter(prefix="/api/attendance", tags=["Attendance"])
 
+ARCHIVED_DETAIL = "Attendance for archived periods is read-only"
+WRITE_BEHIND_RESPONSES = {202: {"model": AttendanceCheckAck, "description": "Queued (ATTENDANCE_WRITE_BEHIND)"}}
 
-@router.post("/check-in", response_model=AttendanceRecordResponse, status_code=status.HTTP_201_CREATED)
-def check_in(
+
+async def _write_behind(current_user: User, direction: str) -> JSONResponse:
+    ack = await attendance_buffer.punch(current_user, direction)
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(AttendanceCheckAck(**ack)))
+
+
+def _record_order(records) -> tuple:
+    return (SortKey(records.date, descending=True), SortKey(records.id, descending=True))
+
+
+async def _writable_record(db: AsyncSession, record_id: int) -> AttendanceRecord:
+    """A hot record for an admin edit; archived months are read-only"""
+    record = await db.get(AttendanceRecord, record_id)
+    if record is None:
+        if await get_archived_record(db, record_id) is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ARCHIVED_DETAIL)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attendance record not found"
+        )
+    through = await archived_through(db)
+    if through is not None and record.date <= through:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ARCHIVED_DETAIL)
+    return record
+
+
+@router.post(
+    "/check-in",
+    response_model=AttendanceRecordResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses=WRITE_BEHIND_RESPONSES,
+)
+async def check_in(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Check in for today"""
+    """Check in for today (202 with an acknowledgement when write-behind is enabled)"""
+    if attendance_buffer.running:
+        return await _write_behind(current_user, "in")
+
     today = date.today()
     
     # Check if already checked in today
-    existing = db.query(AttendanceRecord).filter(
-        AttendanceRecord.user_id == current_user.id,
-        AttendanceRecord.date == today
-    ).first()
+    existing = (await db.scalars(
+        select(AttendanceRecord).where(
+            AttendanceRecord.user_id == current_user.id,
+            AttendanceRecord.date == today
+        ).limit(1)
+    )).first()
     
     if existing and existing.check_in:
         raise HTTPException(
@@ -30,12 +81,17 @@ def check_in(
             detail="Already checked in today"
         )
     
+    # The principal snapshot can predate a department change; the rollup keys on the stored one
+    department = await db.scalar(select(User.department).where(User.id == current_user.id))
+
     if existing:
         # Update existing record
+        before = contribution(existing)
         existing.check_in = datetime.now()
         existing.status = "present"
-        db.commit()
-        db.refresh(existing)
+        await apply_summary_delta(db, department, before, contribution(existing))
+        await db.commit()
+        await db.refresh(existing)
         return existing
     else:
         # Create new record
@@ -46,24 +102,38 @@ def check_in(
             status="present"
         )
         db.add(attendance)
-        db.commit()
-        db.refresh(attendance)
+        await apply_summary_delta(db, department, None, contribution(attendance))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent check-in won the (user_id, date) unique index
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Already checked in today"
+            )
+        await db.refresh(attendance)
         return attendance
 
 
-@router.post("/check-out", response_model=AttendanceRecordResponse)
-def check_out(
+@router.post("/check-out", response_model=AttendanceRecordResponse, responses=WRITE_BEHIND_RESPONSES)
+async def check_out(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Check out for today"""
+    """Check out for today (202 with an acknowledgement when write-behind is enabled)"""
+    if attendance_buffer.running:
+        return await _write_behind(current_user, "out")
+
     today = date.today()
     
     # Get today's attendance record
-    attendance = db.query(AttendanceRecord).filter(
-        AttendanceRecord.user_id == current_user.id,
-        AttendanceRecord.date == today
-    ).first()
+    attendance = (await db.scalars(
+        select(AttendanceRecord).where(
+            AttendanceRecord.user_id == current_user.id,
+            AttendanceRecord.date == today
+        ).limit(1)
+    )).first()
     
     if not attendance or not attendance.check_in:
         raise HTTPException(
@@ -78,106 +148,212 @@ def check_out(
         )
     
     # Update check out time
+    before = contribution(attendance)
     attendance.check_out = datetime.now()
-    db.commit()
-    db.refresh(attendance)
+    apply_worked_minutes(attendance)
+    department = await db.scalar(select(User.department).where(User.id == current_user.id))
+    await apply_summary_delta(db, department, before, contribution(attendance))
+    await db.commit()
+    await db.refresh(attendance)
     return attendance
 
 
-@router.get("/my-records", response_model=List[AttendanceRecordResponse])
-def get_my_attendance_records(
+@router.post("/punches/bulk", response_model=PunchIngestResult)
+async def ingest_punches(
+    request: Request,
+    caller: str = Depends(get_ingest_caller),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk-ingest device punches from a streamed NDJSON or CSV body (Admin or device token)
+
+    Each line carries employee_id, timestamp and direction (in/out). Punches are
+    merged into one record per employee per day (earliest in, latest out) and
+    committed batch by batch, so replaying a partially failed upload is safe.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        parser = CsvPunchParser()
+    elif content_type in ("application/x-ndjson", "application/jsonl", "application/json-seq", ""):
+        parser = parse_ndjson
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send punches as application/x-ndjson or text/csv"
+        )
+
+    started = time.perf_counter()
+    batches = await ingest_stream(db, request.stream(), parser)
+    elapsed = time.perf_counter() - started
+    # Device punches may have touched today's records behind the write-behind map
+    attendance_buffer.forget()
+    total = sum(batch["punches"] for batch in batches)
+    return {
+        "batches": batches,
+        "total_punches": total,
+        "applied": sum(batch["applied"] for batch in batches),
+        "invalid": sum(batch["invalid"] for batch in batches),
+        "records_upserted": sum(batch["records_upserted"] for batch in batches),
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "punches_per_second": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+@router.get("/my-records", response_model=List[AttendanceRecordResponse], responses=PAGINATED_RESPONSES)
+async def get_my_attendance_records(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's attendance records"""
-    query = db.query(AttendanceRecord).filter(
-        AttendanceRecord.user_id == current_user.id
+    source = await records_for_range(db, start_date, end_date)
+    order = _record_order(source)
+    query = select(source).where(
+        source.user_id == current_user.id
     )
     
     # Apply date filters
     if start_date:
-        query = query.filter(AttendanceRecord.date >= start_date)
+        query = query.where(source.date >= start_date)
     if end_date:
-        query = query.filter(AttendanceRecord.date <= end_date)
+        query = query.where(source.date <= end_date)
     
-    records = query.order_by(AttendanceRecord.date.desc()).offset(skip).limit(limit).all()
-    return records
+    records = (await db.scalars(
+        paginate(query, order, cursor, skip, limit)
+    )).all()
+    return finish_page(records, order, limit, response)
 
 
 @router.get("/my-stats", response_model=AttendanceStats)
-def get_my_attendance_stats(
+async def get_my_attendance_stats(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    bucket: Optional[str] = Query(None, pattern="^(week|month)$"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get current user's attendance statistics"""
-    query = db.query(AttendanceRecord).filter(
-        AttendanceRecord.user_id == current_user.id
-    )
-    
+    """Get current user's attendance statistics, optionally broken down by week or month"""
+    source = await records_for_range(db, start_date, end_date)
+    conditions = [source.user_id == current_user.id]
     if start_date:
-        query = query.filter(AttendanceRecord.date >= start_date)
+        conditions.append(source.date >= start_date)
     if end_date:
-        query = query.filter(AttendanceRecord.date <= end_date)
+        conditions.append(source.date <= end_date)
     
-    records = query.all()
-    total_days = len(records)
-    present_days = len([r for r in records if r.status == "present"])
-    absent_days = len([r for r in records if r.status == "absent"])
-    late_days = len([r for r in records if r.status == "late"])
-    
-    attendance_rate = (present_days / total_days * 100) if total_days > 0 else 0.0
+    return await attendance_stats(db, conditions, bucket, source)
+
+
+@router.get("/stats", response_model=AttendanceStats)
+async def get_attendance_stats(
+    department: Optional[str] = None,
+    user_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    bucket: Optional[str] = Query(None, pattern="^(week|month)$"),
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get attendance statistics for a department, an employee or the whole company (Admin only)"""
+    if user_id is None:
+        return await summary_stats(db, department, start_date, end_date, bucket)
+
+    source = await records_for_range(db, start_date, end_date)
+    conditions = [source.user_id == user_id]
+    if department:
+        conditions.append(source.user.has(User.department == department))
+    if start_date:
+        conditions.append(source.date >= start_date)
+    if end_date:
+        conditions.append(source.date <= end_date)
     
-    return {
-        "total_days": total_days,
-        "present_days": present_days,
-        "absent_days": absent_days,
-        "late_days": late_days,
-        "attendance_rate": round(attendance_rate, 2)
-    }
+    return await attendance_stats(db, conditions, bucket, source)
+
+
+@router.get("/matrix", response_model=AttendanceMatrix)
+async def get_attendance_matrix(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    department: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Employee x day status codes for a month, one string per employee (Admin only)
+
+    Day d of the month is character d-1 of each row; `legend` maps the codes.
+    Approved leave fills days without a record and replaces absences.
+    """
+    return await attendance_matrix(db, year, month, department)
+
+
+@router.get("/hours/employees", response_model=List[EmployeeHours])
+async def get_employee_hours(
+    start_date: date,
+    end_date: date,
+    department: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Worked and overtime minutes per employee for a date range (Admin only)"""
+    return await employee_hours(db, start_date, end_date, department)
 
 
-@router.get("/all", response_model=List[AttendanceRecordResponse])
-def get_all_attendance_records(
+@router.get("/hours/departments", response_model=List[DepartmentHours])
+async def get_department_hours(
+    start_date: date,
+    end_date: date,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Worked and overtime minutes per department for a date range (Admin only)"""
+    return await department_hours(db, start_date, end_date)
+
+
+@router.get("/all", response_model=List[AttendanceRecordResponse], responses=PAGINATED_RESPONSES)
+async def get_all_attendance_records(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     user_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all attendance records (Admin only)"""
-    query = db.query(AttendanceRecord)
+    source = await records_for_range(db, start_date, end_date)
+    order = _record_order(source)
+    query = select(source)
     
     # Apply filters
     if user_id:
-        query = query.filter(AttendanceRecord.user_id == user_id)
+        query = query.where(source.user_id == user_id)
     if start_date:
-        query = query.filter(AttendanceRecord.date >= start_date)
+        query = query.where(source.date >= start_date)
     if end_date:
-        query = query.filter(AttendanceRecord.date <= end_date)
+        query = query.where(source.date <= end_date)
     if status:
-        query = query.filter(AttendanceRecord.status == status)
+        query = query.where(source.status == status)
     
-    records = query.order_by(AttendanceRecord.date.desc()).offset(skip).limit(limit).all()
-    return records
+    records = (await db.scalars(
+        paginate(query, order, cursor, skip, limit)
+    )).all()
+    return finish_page(records, order, limit, response)
 
 
 @router.get("/{record_id}", response_model=AttendanceRecordResponse)
-def get_attendance_record(
+async def get_attendance_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get attendance record by ID"""
-    record = db.query(AttendanceRecord).filter(AttendanceRecord.id == record_id).first()
+    record = await db.get(AttendanceRecord, record_id) or await get_archived_record(db, record_id)
     
     if not record:
         raise HTTPException(
@@ -196,22 +372,17 @@ def get_attendance_record(
 
 
 @router.put("/{record_id}", response_model=AttendanceRecordResponse)
-def update_attendance_record(
+async def update_attendance_record(
     record_id: int,
     record_update: AttendanceRecordUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update attendance record (Admin only)"""
-    record = db.query(AttendanceRecord).filter(AttendanceRecord.id == record_id).first()
-    
-    if not record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Attendance record not found"
-        )
+    record = await _writable_record(db, record_id)
     
     # Update fields
+    before = contribution(record)
     if record_update.check_in is not None:
         record.check_in = record_update.check_in
     if record_update.check_out is not None:
@@ -220,27 +391,29 @@ def update_attendance_record(
         record.status = record_update.status
     if record_update.notes is not None:
         record.notes = record_update.notes
+    apply_worked_minutes(record)
     
-    db.commit()
-    db.refresh(record)
+    department = await db.scalar(select(User.department).where(User.id == record.user_id))
+    await apply_summary_delta(db, department, before, contribution(record))
+    await db.commit()
+    attendance_buffer.forget(record.user_id)
+    await db.refresh(record)
     return record
 
 
 @router.delete("/{record_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_attendance_record(
+async def delete_attendance_record(
     record_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete attendance record (Admin only)"""
-    record = db.query(AttendanceRecord).filter(AttendanceRecord.id == record_id).first()
-    
-    if not record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Attendance record not found"
-        )
+    record = await _writable_record(db, record_id)
     
-    db.delete(record)
-    db.commit()
+    department = await db.scalar(select(User.department).where(User.id == record.user_id))
+    await apply_summary_delta(db, department, contribution(record), None)
+    user_id = record.user_id
+    await db.delete(record)
+    await db.commit()
+    attendance_buffer.forget(user_id)
     return None
@@ -1,11 +1,16 @@
+from typing import List
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from datetime import timedelta
 from secrets import choice
 import string
-from database import get_db
-from models import User, UserRole, MasterEmployee
+from database import get_async_db, SessionLocal
+from models import User, UserRole, MasterEmployee, LoginIdCounter
 from schemas import (
     UserCreate,
     UserResponse,
@@ -14,33 +19,80 @@ from schemas import (
     AuthResponse,
     AdminCreateUserRequest,
     AdminCreateUserResponse,
+    AdminBulkCreateUserResult,
     ChangePasswordRequest,
     AdminResetPasswordResponse,
 )
 from auth import (
-    get_password_hash,
-    verify_password,
     create_access_token,
     get_user_by_email,
     get_current_admin_user,
     get_current_user,
+    invalidate_user_principals,
 )
+from hashing import password_hasher
 from config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 
-def _generate_login_id(db: Session, first_name: str, last_name: str, joining_year: int) -> tuple[str, int]:
+def _format_login_id(first_name: str, last_name: str, joining_year: int, serial: int) -> str:
     prefix = settings.COMPANY_PREFIX or "OI"
     fn = (first_name or "").strip()[:2].upper().ljust(2, "X")
     ln = (last_name or "").strip()[:2].upper().ljust(2, "X")
-    # Find next serial for the year
-    current_max = db.query(func.max(User.joining_serial)).filter(User.joining_year == joining_year).scalar()
-    next_serial = (current_max or 0) + 1
-    login_id = f"{prefix}{fn}{ln}{joining_year}{next_serial:04d}"
+    return f"{prefix}{fn}{ln}{joining_year}{serial:04d}"
+
+
+def _reserve_serials(db: Session, joining_year: int, count: int = 1) -> int:
+    """Atomically reserve `count` consecutive serials for a joining year; returns the first one.
+
+    Commits on its own so the counter row lock is held only for this statement.
+    """
+    prefix = settings.COMPANY_PREFIX or "OI"
+    advance = (
+        update(LoginIdCounter)
+        .where(LoginIdCounter.prefix == prefix, LoginIdCounter.joining_year == joining_year)
+        .values(last_serial=LoginIdCounter.last_serial + count)
+        .returning(LoginIdCounter.last_serial)
+    )
+    last_serial = db.execute(advance).scalar()
+    if last_serial is None:
+        # First reservation for this year: seed from serials issued before the counter existed
+        seed = db.query(func.max(User.joining_serial)).filter(User.joining_year == joining_year).scalar() or 0
+        db.add(LoginIdCounter(prefix=prefix, joining_year=joining_year, last_serial=seed + count))
+        try:
+            db.flush()
+            last_serial = seed + count
+        except IntegrityError:
+            # Another request created the row first; advance it instead
+            db.rollback()
+            last_serial = db.execute(advance).scalar()
+    db.commit()
+    return last_serial - count + 1
+
+
+def _generate_login_id(db: Session, first_name: str, last_name: str, joining_year: int) -> tuple[str, int]:
+    next_serial = _reserve_serials(db, joining_year)
+    login_id = _format_login_id(first_name, last_name, joining_year, next_serial)
     return login_id, next_serial
 
 
+def _allocate_login_ids(db: Session, rows: List[AdminCreateUserRequest]) -> list[tuple[str, int]]:
+    """Assign login IDs for a whole batch, reserving one block of serials per joining year"""
+    per_year: dict[int, int] = {}
+    for row in rows:
+        per_year[row.date_of_joining.year] = per_year.get(row.date_of_joining.year, 0) + 1
+    next_serial = {year: _reserve_serials(db, year, count) for year, count in per_year.items()}
+
+    allocated = []
+    for row in rows:
+        year = row.date_of_joining.year
+        serial = next_serial[year]
+        next_serial[year] += 1
+        allocated.append((_format_login_id(row.first_name, row.last_name, year, serial), serial))
+    return allocated
+
+
 def _generate_temp_password(length: int = 12) -> str:
     alphabet = string.ascii_letters + string.digits + "!@#$%^&*()"  # simple strong set
     return "".join(choice(alphabet) for _ in range(length))
@@ -56,21 +108,27 @@ def register_disabled():
 
 
 @router.post("/admin/create-user", response_model=AdminCreateUserResponse, status_code=status.HTTP_201_CREATED)
-def admin_create_user(
+async def admin_create_user(
     payload: AdminCreateUserRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_admin_user),
 ):
     """Admin-only endpoint to create user with generated login_id and temp password."""
     joining_year = payload.date_of_joining.year
-    login_id, joining_serial = _generate_login_id(db, payload.first_name, payload.last_name, joining_year)
+    # The serial reservation is shared with bulk provisioning and commits on its own
+    login_id, joining_serial = await db.run_sync(
+        _generate_login_id, payload.first_name, payload.last_name, joining_year
+    )
 
     # uniqueness checks
-    if db.query(User).filter(or_(User.login_id == login_id, User.email == payload.email)).first():
+    existing = await db.scalars(
+        select(User.id).where(or_(User.login_id == login_id, User.email == payload.email)).limit(1)
+    )
+    if existing.first() is not None:
         raise HTTPException(status_code=400, detail="User with same login_id or email already exists")
 
     temp_password = _generate_temp_password()
-    hashed_password = get_password_hash(temp_password)
+    hashed_password = await password_hasher.hash(temp_password)
     full_name = f"{payload.first_name} {payload.last_name}".strip()
 
     # create master employee record (keeps pre-approval ledger)
@@ -86,7 +144,7 @@ def admin_create_user(
         is_registered=True,
     )
     db.add(master_emp)
-    db.flush()
+    await db.flush()
 
     db_user = User(
         master_employee_id=master_emp.id,
@@ -106,22 +164,126 @@ def admin_create_user(
         must_change_password=True,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    db.refresh(master_emp)
+    await db.commit()
+    await db.refresh(db_user)
 
     return AdminCreateUserResponse(user=db_user, temp_password=temp_password)
 
 
+async def _find_user_by_login(db: AsyncSession, identifier: str):
+    return (await db.scalars(
+        select(User).where(or_(User.login_id == identifier, User.email == identifier)).limit(1)
+    )).first()
+
+
+def _provision_users(rows: List[AdminCreateUserRequest]):
+    """Create users chunk by chunk, yielding one NDJSON result line per input row"""
+    db = SessionLocal()
+    try:
+        emails = [row.email for row in rows]
+        taken = {
+            email for (email,) in db.query(User.email).filter(User.email.in_(emails))
+        } | {
+            email for (email,) in db.query(MasterEmployee.work_email).filter(MasterEmployee.work_email.in_(emails))
+        }
+        seen: set[str] = set()
+        accepted: list[tuple[int, AdminCreateUserRequest]] = []
+        for idx, row in enumerate(rows, start=1):
+            if row.email in taken or row.email in seen:
+                yield _result_line(idx, row, status="error", detail="User with same email already exists")
+                continue
+            seen.add(row.email)
+            accepted.append((idx, row))
+
+        login_ids = _allocate_login_ids(db, [row for _, row in accepted])
+        chunk_size = max(1, settings.BULK_PROVISION_CHUNK_SIZE)
+        for start in range(0, len(accepted), chunk_size):
+            chunk = accepted[start:start + chunk_size]
+            chunk_ids = login_ids[start:start + chunk_size]
+            temp_passwords = [_generate_temp_password() for _ in chunk]
+            try:
+                # The generator runs in a worker thread; hash on the pool's event-loop admission path
+                hashed_passwords = from_thread.run(password_hasher.hash_many, temp_passwords)
+            except HTTPException as e:
+                for idx, row in chunk:
+                    yield _result_line(idx, row, status="error", detail=e.detail)
+                continue
+
+            master_rows = []
+            user_rows = []
+            for (_, row), (login_id, serial), hashed in zip(chunk, chunk_ids, hashed_passwords):
+                common = {
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "date_of_joining": row.date_of_joining,
+                    "joining_year": row.date_of_joining.year,
+                    "joining_serial": serial,
+                    "role": row.role,
+                }
+                master_rows.append({**common, "employee_id": login_id, "work_email": row.email, "is_registered": True})
+                user_rows.append({
+                    **common,
+                    "login_id": login_id,
+                    "email": row.email,
+                    "hashed_password": hashed,
+                    "full_name": f"{row.first_name} {row.last_name}".strip(),
+                    "employee_id": login_id,
+                    "department": row.department,
+                    "position": row.position,
+                    "must_change_password": True,
+                    "is_active": True,
+                })
+
+            try:
+                master_ids = db.scalars(
+                    insert(MasterEmployee).returning(MasterEmployee.id, sort_by_parameter_order=True),
+                    master_rows,
+                ).all()
+                for user_row, master_id in zip(user_rows, master_ids):
+                    user_row["master_employee_id"] = master_id
+                user_ids = db.scalars(
+                    insert(User).returning(User.id, sort_by_parameter_order=True),
+                    user_rows,
+                ).all()
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                for idx, row in chunk:
+                    yield _result_line(idx, row, status="error", detail=f"Batch insert failed: {e.__class__.__name__}")
+                continue
+
+            for (idx, row), (login_id, _), temp_password, user_id in zip(chunk, chunk_ids, temp_passwords, user_ids):
+                yield _result_line(
+                    idx, row, status="created", user_id=user_id, login_id=login_id, temp_password=temp_password
+                )
+    finally:
+        db.close()
+
+
+def _result_line(idx: int, row: AdminCreateUserRequest, **fields) -> str:
+    return AdminBulkCreateUserResult(row=idx, email=row.email, **fields).model_dump_json() + "\n"
+
+
+@router.post("/admin/create-users/bulk")
+def admin_create_users_bulk(
+    rows: List[AdminCreateUserRequest],
+    current_user=Depends(get_current_admin_user),
+):
+    """Admin-only bulk provisioning; streams one JSON result per row (NDJSON), including temp passwords."""
+    if len(rows) > settings.BULK_PROVISION_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_PROVISION_MAX_ROWS} rows per request, got {len(rows)}",
+        )
+    return StreamingResponse(_provision_users(rows), media_type="application/x-ndjson")
+
+
 @router.post("/login", response_model=AuthResponse)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login with login_id or email and get access token"""
-    identifier = login_data.login
-    user = db.query(User).filter(
-        or_(User.login_id == identifier, User.email == identifier)
-    ).first()
+    user = await _find_user_by_login(db, login_data.login)
 
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect credentials",
@@ -143,19 +305,20 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/change-password-first", response_model=UserResponse)
-def change_password_first(
+async def change_password_first(
     payload: ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),
 ):
     """Change password on first login and clear must_change_password flag."""
-    if not verify_password(payload.current_password, current_user.hashed_password):
+    if not await password_hasher.verify(payload.current_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
-    current_user.hashed_password = get_password_hash(payload.new_password)
+    current_user.hashed_password = await password_hasher.hash(payload.new_password)
     current_user.must_change_password = False
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    invalidate_user_principals(current_user.id)
+    await db.refresh(current_user)
     return current_user
 
 
@@ -166,22 +329,23 @@ def logout():
 
 
 @router.post("/admin/reset-password/{user_id}", response_model=AdminResetPasswordResponse)
-def admin_reset_password(
+async def admin_reset_password(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_admin_user),
 ):
     """Admin-only endpoint to reset a user's password and generate new temp password."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Generate new temp password
     temp_password = _generate_temp_password()
-    user.hashed_password = get_password_hash(temp_password)
+    user.hashed_password = await password_hasher.hash(temp_password)
     user.must_change_password = True
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    invalidate_user_principals(user.id)
+    await db.refresh(user)
     
     return AdminResetPasswordResponse(user=user, temp_password=temp_password)
@@ -1,20 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
-from database import get_db
-from models import User, LeaveRequest
-from schemas import LeaveRequestCreate, LeaveRequestResponse, LeaveRequestUpdate
+from database import get_async_db, get_async_read_db
+from models import User, LeaveRequest, LeaveLedgerEntry, LeaveStatus
+from schemas import (
+    LeaveRequestCreate, LeaveRequestResponse, LeaveRequestUpdate, OnLeaveEntry,
+    LeaveBulkDecision, LeaveBulkDecisionResult,
+    LeaveBalanceResponse, LeaveBalanceAdjustment, LeaveLedgerEntryResponse
+)
 from auth import get_current_user, get_current_admin_user
+from leave_calendar import BLOCKING_STATUSES, ensure_no_overlap, on_leave_query
+from leave_balance import (
+    accrual_days, adjust_balance, apply_leave_change, apply_leave_changes, leave_balances, reserve_leave
+)
+from pagination import PAGINATED_RESPONSES, SortKey, finish_page, paginate
 
 router = APIRouter(prefix="/api/leave", tags=["Leave Management"])
 
+LEAVE_ORDER = (SortKey(LeaveRequest.created_at, descending=True), SortKey(LeaveRequest.id, descending=True))
+# List pages are one users join selecting just these columns, serialized straight from the rows
+LEAVE_LIST_COLUMNS = (
+    LeaveRequest.id, LeaveRequest.user_id, func.coalesce(User.full_name, "Unknown").label("user_name"),
+    LeaveRequest.leave_type, LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.reason,
+    LeaveRequest.status, LeaveRequest.admin_notes, LeaveRequest.approved_by,
+    LeaveRequest.created_at, LeaveRequest.updated_at,
+)
+
+
+def _leave_list_query():
+    return select(*LEAVE_LIST_COLUMNS).outerjoin(User, User.id == LeaveRequest.user_id)
+
+
+def _leave_list_item(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "user_name": row.user_name,
+        "leave_type": row.leave_type.value,
+        "start_date": row.start_date.isoformat(),
+        "end_date": row.end_date.isoformat(),
+        "reason": row.reason,
+        "status": row.status.value,
+        "admin_notes": row.admin_notes,
+        "approved_by": row.approved_by,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
 
 @router.post("/", response_model=LeaveRequestResponse, status_code=status.HTTP_201_CREATED)
-def create_leave_request(
+async def create_leave_request(
     leave_data: LeaveRequestCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new leave request"""
     # Validate dates
@@ -23,6 +63,7 @@ def create_leave_request(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="End date must be after start date"
         )
+    await ensure_no_overlap(db, current_user.id, leave_data.start_date, leave_data.end_date)
     
     # Create leave request
     leave_request = LeaveRequest(
@@ -35,105 +76,208 @@ def create_leave_request(
     )
     
     db.add(leave_request)
-    db.commit()
-    db.refresh(leave_request)
+    await db.flush()
+    # Holds the days as pending in the same transaction (refused when enforced and short)
+    await reserve_leave(db, leave_request)
+    await db.commit()
+    await db.refresh(leave_request)
     return leave_request
 
 
-@router.get("/my-requests")
-def get_my_leave_requests(
+@router.get("/my-requests", responses=PAGINATED_RESPONSES)
+async def get_my_leave_requests(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's leave requests"""
-    query = db.query(LeaveRequest).filter(
+    query = _leave_list_query().where(
         LeaveRequest.user_id == current_user.id
     )
     
     # Apply status filter
     if status:
-        query = query.filter(LeaveRequest.status == status)
-    
-    requests = query.order_by(LeaveRequest.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Map to include user name
-    result = []
-    for req in requests:
-        req_dict = {
-            "id": req.id,
-            "user_id": req.user_id,
-            "user_name": current_user.full_name,
-            "leave_type": req.leave_type.value,
-            "start_date": req.start_date.isoformat(),
-            "end_date": req.end_date.isoformat(),
-            "reason": req.reason,
-            "status": req.status.value,
-            "admin_notes": req.admin_notes,
-            "approved_by": req.approved_by,
-            "created_at": req.created_at.isoformat() if req.created_at else None,
-            "updated_at": req.updated_at.isoformat() if req.updated_at else None,
-        }
-        result.append(req_dict)
+        query = query.where(LeaveRequest.status == status)
     
-    return result
+    rows = finish_page((await db.execute(
+        paginate(query, LEAVE_ORDER, cursor, skip, limit)
+    )).all(), LEAVE_ORDER, limit, response)
+    return [_leave_list_item(row) for row in rows]
 
 
-@router.get("/all")
-def get_all_leave_requests(
+@router.get("/all", responses=PAGINATED_RESPONSES)
+async def get_all_leave_requests(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     user_id: Optional[int] = None,
     status: Optional[str] = None,
     leave_type: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all leave requests (Admin only)"""
-    query = db.query(LeaveRequest)
+    query = _leave_list_query()
     
     # Apply filters
     if user_id:
-        query = query.filter(LeaveRequest.user_id == user_id)
+        query = query.where(LeaveRequest.user_id == user_id)
     if status:
-        query = query.filter(LeaveRequest.status == status)
+        query = query.where(LeaveRequest.status == status)
     if leave_type:
-        query = query.filter(LeaveRequest.leave_type == leave_type)
+        query = query.where(LeaveRequest.leave_type == leave_type)
     
-    requests = query.order_by(LeaveRequest.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Map to include user name
-    result = []
-    for req in requests:
-        req_dict = {
-            "id": req.id,
-            "user_id": req.user_id,
-            "user_name": req.user.full_name if req.user else "Unknown",
-            "leave_type": req.leave_type.value,
-            "start_date": req.start_date.isoformat(),
-            "end_date": req.end_date.isoformat(),
-            "reason": req.reason,
-            "status": req.status.value,
-            "admin_notes": req.admin_notes,
-            "approved_by": req.approved_by,
-            "created_at": req.created_at.isoformat() if req.created_at else None,
-            "updated_at": req.updated_at.isoformat() if req.updated_at else None,
-        }
-        result.append(req_dict)
-    
-    return result
+    rows = finish_page((await db.execute(
+        paginate(query, LEAVE_ORDER, cursor, skip, limit)
+    )).all(), LEAVE_ORDER, limit, response)
+    return [_leave_list_item(row) for row in rows]
+
+
+@router.post("/bulk-decision", response_model=LeaveBulkDecisionResult)
+async def bulk_decide_leave_requests(
+    decision: LeaveBulkDecision,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Approve or reject many pending leave requests at once (Admin only)"""
+    if decision.decision == LeaveStatus.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Decision must be approved or rejected"
+        )
+    request_ids = list(dict.fromkeys(decision.request_ids))
+    values = {"status": decision.decision, "approved_by": current_user.id}
+    if decision.admin_notes:
+        values["admin_notes"] = decision.admin_notes
+    # One conditional UPDATE: requests decided meanwhile (or by a concurrent call) are left alone
+    decided = (await db.execute(
+        update(LeaveRequest)
+        .where(LeaveRequest.id.in_(request_ids), LeaveRequest.status == LeaveStatus.PENDING)
+        .values(**values)
+        .returning(LeaveRequest.id, LeaveRequest.user_id, LeaveRequest.leave_type,
+                   LeaveRequest.start_date, LeaveRequest.end_date)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await apply_leave_changes(db, decided, LeaveStatus.PENDING, decision.decision, current_user.id)
+    await db.commit()
+
+    decided_ids = {row.id for row in decided}
+    others = [request_id for request_id in request_ids if request_id not in decided_ids]
+    current = dict((await db.execute(
+        select(LeaveRequest.id, LeaveRequest.status).where(LeaveRequest.id.in_(others))
+    )).all()) if others else {}
+    results = []
+    for request_id in request_ids:
+        if request_id in decided_ids:
+            results.append({"id": request_id, "outcome": decision.decision.value, "status": decision.decision})
+        elif request_id in current:
+            results.append({"id": request_id, "outcome": "not_pending", "status": current[request_id]})
+        else:
+            results.append({"id": request_id, "outcome": "not_found", "status": None})
+    return {"updated": len(decided_ids), "results": results}
+
+
+@router.get("/on-leave", response_model=List[OnLeaveEntry])
+async def get_employees_on_leave(
+    start_date: date,
+    end_date: date,
+    department: Optional[str] = None,
+    include_pending: bool = False,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get who is on approved (optionally also pending) leave between two dates (Admin only)"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date must be after start date"
+        )
+    rows = await db.execute(on_leave_query(start_date, end_date, department, include_pending))
+    return [row._asdict() for row in rows]
+
+
+@router.get("/balance", response_model=List[LeaveBalanceResponse])
+async def get_my_leave_balance(
+    year: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get current user's leave balances for a year (default: this year)"""
+    return await leave_balances(db, current_user.id, year or date.today().year)
+
+
+@router.get("/balance/{user_id}", response_model=List[LeaveBalanceResponse])
+async def get_leave_balance(
+    user_id: int,
+    year: Optional[int] = None,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get an employee's leave balances for a year (Admin only)"""
+    return await leave_balances(db, user_id, year or date.today().year)
+
+
+@router.post("/balance/adjust", response_model=List[LeaveBalanceResponse])
+async def adjust_leave_balance(
+    adjustment: LeaveBalanceAdjustment,
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Credit or debit an employee's leave balance, e.g. opening or carried-over days (Admin only)"""
+    if adjustment.leave_type not in accrual_days():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{adjustment.leave_type.value} leave is not balance-tracked"
+        )
+    if not await db.get(User, adjustment.user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    await adjust_balance(
+        db, adjustment.user_id, adjustment.leave_type, adjustment.year,
+        adjustment.days, adjustment.note, current_user.id
+    )
+    await db.commit()
+    return await leave_balances(db, adjustment.user_id, adjustment.year)
+
+
+@router.get("/ledger", response_model=List[LeaveLedgerEntryResponse])
+async def get_leave_ledger(
+    year: Optional[int] = None,
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the balance changes behind a user's leave balances (own, or any user for admins)"""
+    if user_id is not None and user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this ledger"
+        )
+    return (await db.scalars(
+        select(LeaveLedgerEntry)
+        .where(
+            LeaveLedgerEntry.user_id == (user_id or current_user.id),
+            LeaveLedgerEntry.year == (year or date.today().year)
+        )
+        .order_by(LeaveLedgerEntry.id)
+    )).all()
 
 
 @router.get("/{request_id}", response_model=LeaveRequestResponse)
-def get_leave_request(
+async def get_leave_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get leave request by ID"""
-    leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == request_id).first()
+    leave_request = await db.get(LeaveRequest, request_id)
     
     if not leave_request:
         raise HTTPException(
@@ -152,14 +296,14 @@ def get_leave_request(
 
 
 @router.put("/{request_id}", response_model=LeaveRequestResponse)
-def update_leave_request(
+async def update_leave_request(
     request_id: int,
     request_update: LeaveRequestUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update leave request status (Admin only)"""
-    leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == request_id).first()
+    leave_request = await db.get(LeaveRequest, request_id)
     
     if not leave_request:
         raise HTTPException(
@@ -169,25 +313,32 @@ def update_leave_request(
     
     # Update fields
     if request_update.status is not None:
+        previous = leave_request.status
+        if previous not in BLOCKING_STATUSES and request_update.status in BLOCKING_STATUSES:
+            # Re-opening a rejected request must not double-book its dates
+            await ensure_no_overlap(
+                db, leave_request.user_id, leave_request.start_date, leave_request.end_date, leave_request.id
+            )
         leave_request.status = request_update.status
         leave_request.approved_by = current_user.id
+        await apply_leave_change(db, leave_request, previous, request_update.status, current_user.id)
     if request_update.admin_notes is not None:
         leave_request.admin_notes = request_update.admin_notes
     
-    db.commit()
-    db.refresh(leave_request)
+    await db.commit()
+    await db.refresh(leave_request)
     return leave_request
 
 
 @router.post("/{request_id}/approve", response_model=LeaveRequestResponse)
-def approve_leave_request(
+async def approve_leave_request(
     request_id: int,
     admin_notes: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Approve a leave request (Admin only)"""
-    leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == request_id).first()
+    leave_request = await db.get(LeaveRequest, request_id)
     
     if not leave_request:
         raise HTTPException(
@@ -203,23 +354,24 @@ def approve_leave_request(
     
     leave_request.status = "approved"
     leave_request.approved_by = current_user.id
+    await apply_leave_change(db, leave_request, LeaveStatus.PENDING, LeaveStatus.APPROVED, current_user.id)
     if admin_notes:
         leave_request.admin_notes = admin_notes
     
-    db.commit()
-    db.refresh(leave_request)
+    await db.commit()
+    await db.refresh(leave_request)
     return leave_request
 
 
 @router.post("/{request_id}/reject", response_model=LeaveRequestResponse)
-def reject_leave_request(
+async def reject_leave_request(
     request_id: int,
     admin_notes: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reject a leave request (Admin only)"""
-    leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == request_id).first()
+    leave_request = await db.get(LeaveRequest, request_id)
     
     if not leave_request:
         raise HTTPException(
@@ -235,22 +387,23 @@ def reject_leave_request(
     
     leave_request.status = "rejected"
     leave_request.approved_by = current_user.id
+    await apply_leave_change(db, leave_request, LeaveStatus.PENDING, LeaveStatus.REJECTED, current_user.id)
     if admin_notes:
         leave_request.admin_notes = admin_notes
     
-    db.commit()
-    db.refresh(leave_request)
+    await db.commit()
+    await db.refresh(leave_request)
     return leave_request
 
 
 @router.delete("/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_leave_request(
+async def delete_leave_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete leave request"""
-    leave_request = db.query(LeaveRequest).filter(LeaveRequest.id == request_id).first()
+    leave_request = await db.get(LeaveRequest, request_id)
     
     if not leave_request:
         raise HTTPException(
@@ -267,6 +420,7 @@ def delete_leave_request(
             detail="Not authorized to delete this request"
         )
     
-    db.delete(leave_request)
-    db.commit()
+    await apply_leave_change(db, leave_request, leave_request.status, None, current_user.id)
+    await db.delete(leave_request)
+    await db.commit()
     return None
@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
@@ -12,9 +12,12 @@ from schemas import (
     MasterEmployeeBulkResult,
 )
 from auth import get_current_admin_user
+from pagination import PAGINATED_RESPONSES, SortKey, finish_page, paginate
 
 router = APIRouter(prefix="/api/master-employees", tags=["Master Employees"])
 
+MASTER_EMPLOYEE_ORDER = (SortKey(MasterEmployee.employee_id), SortKey(MasterEmployee.id))
+
 
 @router.post("/", response_model=MasterEmployeeResponse, status_code=status.HTTP_201_CREATED)
 def create_master_employee(
@@ -118,10 +121,12 @@ def bulk_import_master_employees(
     return MasterEmployeeBulkResult(inserted=inserted, skipped=skipped, updated=updated, errors=errors)
 
 
-@router.get("/", response_model=List[MasterEmployeeResponse])
+@router.get("/", response_model=List[MasterEmployeeResponse], responses=PAGINATED_RESPONSES)
 def list_master_employees(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
     is_registered: bool | None = None,
     role: UserRole | None = None,
     search: str | None = None,
@@ -142,4 +147,5 @@ def list_master_employees(
                 MasterEmployee.work_email.ilike(like),
             )
         )
-    return query.order_by(MasterEmployee.employee_id).offset(skip).limit(limit).all()
+    rows = paginate(query, MASTER_EMPLOYEE_ORDER, cursor, skip, limit).all()
+    return finish_page(rows, MASTER_EMPLOYEE_ORDER, limit, response)
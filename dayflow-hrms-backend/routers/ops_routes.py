@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from auth import get_current_admin_user
+from database import engine, async_engine, read_engine, async_read_engine, pool_status
+from hashing import password_hasher
+from attendance_buffer import attendance_buffer
+from slow_queries import slow_query_log
+
+router = APIRouter(prefix="/api/ops", tags=["Operations"])
+
+
+@router.get("/hashing")
+def get_hashing_metrics(current_user=Depends(get_current_admin_user)):
+    """Password hashing pool queue depth and verify latency (Admin only)"""
+    return password_hasher.stats()
+
+
+@router.get("/db-pool")
+def get_db_pool_metrics(current_user=Depends(get_current_admin_user)):
+    """Connection pool occupancy, overflow and checkout wait times (Admin only)"""
+    pools = {"primary": pool_status(engine)}
+    if async_engine is not None:
+        pools["primary_async"] = pool_status(async_engine)
+    if read_engine is not None:
+        pools["replica"] = pool_status(read_engine)
+    if async_read_engine is not None:
+        pools["replica_async"] = pool_status(async_read_engine)
+    return pools
+
+
+@router.get("/attendance-buffer")
+def get_attendance_buffer_metrics(current_user=Depends(get_current_admin_user)):
+    """Write-behind check-in queue depth and flush counts (Admin only)"""
+    return attendance_buffer.stats()
+
+
+@router.get("/slow-queries")
+def get_slow_queries(current_user=Depends(get_current_admin_user)):
+    """Slowest statement shapes recorded above SLOW_QUERY_THRESHOLD_MS (Admin only)"""
+    return {
+        "threshold_ms": round(slow_query_log.threshold * 1000),
+        "capacity": slow_query_log.capacity,
+        "entries": slow_query_log.entries(),
+    }
+
+
+@router.post("/slow-queries/{fingerprint}/explain")
+async def explain_slow_query(fingerprint: str, current_user=Depends(get_current_admin_user)):
+    """Capture EXPLAIN / EXPLAIN QUERY PLAN for a recorded slow statement (Admin only)"""
+    plan = await slow_query_log.explain(fingerprint)
+    if plan is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Slow query not found"
+        )
+    return {"fingerprint": fingerprint, "plan": plan}
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries(current_user=Depends(get_current_admin_user)):
+    """Reset the slow-query log (Admin only)"""
+    slow_query_log.clear()
+    return None
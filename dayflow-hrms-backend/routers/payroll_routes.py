@@ -1,23 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_async_db, get_async_read_db
 from models import User, PayrollRecord
 from schemas import PayrollRecordCreate, PayrollRecordResponse, PayrollRecordUpdate
 from auth import get_current_user, get_current_admin_user
+from pagination import PAGINATED_RESPONSES, SortKey, finish_page, paginate
 
 router = APIRouter(prefix="/api/payroll", tags=["Payroll"])
 
+PAYROLL_ORDER = (
+    SortKey(PayrollRecord.year, descending=True),
+    SortKey(PayrollRecord.month, descending=True),
+    SortKey(PayrollRecord.id, descending=True),
+)
+
 
 @router.post("/", response_model=PayrollRecordResponse, status_code=status.HTTP_201_CREATED)
-def create_payroll_record(
+async def create_payroll_record(
     payroll_data: PayrollRecordCreate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new payroll record (Admin only)"""
     # Check if user exists
-    user = db.query(User).filter(User.id == payroll_data.user_id).first()
+    user = await db.get(User, payroll_data.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -25,11 +34,13 @@ def create_payroll_record(
         )
     
     # Check if payroll record already exists for this month/year
-    existing = db.query(PayrollRecord).filter(
-        PayrollRecord.user_id == payroll_data.user_id,
-        PayrollRecord.month == payroll_data.month,
-        PayrollRecord.year == payroll_data.year
-    ).first()
+    existing = (await db.scalars(
+        select(PayrollRecord).where(
+            PayrollRecord.user_id == payroll_data.user_id,
+            PayrollRecord.month == payroll_data.month,
+            PayrollRecord.year == payroll_data.year
+        ).limit(1)
+    )).first()
     
     if existing:
         raise HTTPException(
@@ -54,73 +65,82 @@ def create_payroll_record(
     )
     
     db.add(payroll)
-    db.commit()
-    db.refresh(payroll)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Payroll record already exists for {payroll_data.month}/{payroll_data.year}"
+        )
+    await db.refresh(payroll)
     return payroll
 
 
-@router.get("/my-records", response_model=List[PayrollRecordResponse])
-def get_my_payroll_records(
+@router.get("/my-records", response_model=List[PayrollRecordResponse], responses=PAGINATED_RESPONSES)
+async def get_my_payroll_records(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     year: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's payroll records"""
-    query = db.query(PayrollRecord).filter(
+    query = select(PayrollRecord).where(
         PayrollRecord.user_id == current_user.id
     )
     
     # Apply year filter
     if year:
-        query = query.filter(PayrollRecord.year == year)
+        query = query.where(PayrollRecord.year == year)
     
-    records = query.order_by(
-        PayrollRecord.year.desc(),
-        PayrollRecord.month.desc()
-    ).offset(skip).limit(limit).all()
+    records = (await db.scalars(
+        paginate(query, PAYROLL_ORDER, cursor, skip, limit)
+    )).all()
     
-    return records
+    return finish_page(records, PAYROLL_ORDER, limit, response)
 
 
-@router.get("/all", response_model=List[PayrollRecordResponse])
-def get_all_payroll_records(
+@router.get("/all", response_model=List[PayrollRecordResponse], responses=PAGINATED_RESPONSES)
+async def get_all_payroll_records(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     user_id: Optional[int] = None,
     month: Optional[int] = None,
     year: Optional[int] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all payroll records (Admin only)"""
-    query = db.query(PayrollRecord)
+    query = select(PayrollRecord)
     
     # Apply filters
     if user_id:
-        query = query.filter(PayrollRecord.user_id == user_id)
+        query = query.where(PayrollRecord.user_id == user_id)
     if month:
-        query = query.filter(PayrollRecord.month == month)
+        query = query.where(PayrollRecord.month == month)
     if year:
-        query = query.filter(PayrollRecord.year == year)
+        query = query.where(PayrollRecord.year == year)
     
-    records = query.order_by(
-        PayrollRecord.year.desc(),
-        PayrollRecord.month.desc()
-    ).offset(skip).limit(limit).all()
+    records = (await db.scalars(
+        paginate(query, PAYROLL_ORDER, cursor, skip, limit)
+    )).all()
     
-    return records
+    return finish_page(records, PAYROLL_ORDER, limit, response)
 
 
 @router.get("/{record_id}", response_model=PayrollRecordResponse)
-def get_payroll_record(
+async def get_payroll_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get payroll record by ID"""
-    record = db.query(PayrollRecord).filter(PayrollRecord.id == record_id).first()
+    record = await db.get(PayrollRecord, record_id)
     
     if not record:
         raise HTTPException(
@@ -139,14 +159,14 @@ def get_payroll_record(
 
 
 @router.put("/{record_id}", response_model=PayrollRecordResponse)
-def update_payroll_record(
+async def update_payroll_record(
     record_id: int,
     record_update: PayrollRecordUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update payroll record (Admin only)"""
-    record = db.query(PayrollRecord).filter(PayrollRecord.id == record_id).first()
+    record = await db.get(PayrollRecord, record_id)
     
     if not record:
         raise HTTPException(
@@ -174,19 +194,19 @@ def update_payroll_record(
     if record_update.notes is not None:
         record.notes = record_update.notes
     
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     return record
 
 
 @router.delete("/{record_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_payroll_record(
+async def delete_payroll_record(
     record_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete payroll record (Admin only)"""
-    record = db.query(PayrollRecord).filter(PayrollRecord.id == record_id).first()
+    record = await db.get(PayrollRecord, record_id)
     
     if not record:
         raise HTTPException(
@@ -194,16 +214,16 @@ def delete_payroll_record(
             detail="Payroll record not found"
         )
     
-    db.delete(record)
-    db.commit()
+    await db.delete(record)
+    await db.commit()
     return None
 
 
 @router.get("/user/{user_id}/latest", response_model=PayrollRecordResponse)
-def get_latest_payroll(
+async def get_latest_payroll(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get latest payroll record for a user"""
     # Check permission
@@ -213,12 +233,14 @@ def get_latest_payroll(
             detail="Not authorized to view this record"
         )
     
-    record = db.query(PayrollRecord).filter(
-        PayrollRecord.user_id == user_id
-    ).order_by(
-        PayrollRecord.year.desc(),
-        PayrollRecord.month.desc()
-    ).first()
+    record = (await db.scalars(
+        select(PayrollRecord).where(
+            PayrollRecord.user_id == user_id
+        ).order_by(
+            PayrollRecord.year.desc(),
+            PayrollRecord.month.desc()
+        ).limit(1)
+    )).first()
     
     if not record:
         raise HTTPException(
@@ -0,0 +1,131 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import or_, select
+from typing import Optional
+from datetime import date
+from models import User, AttendanceRecord, LeaveRequest, PayrollRecord
+from auth import get_current_admin_user
+from exports import export_response
+from attendance_archive import archived_through_sync, attendance_source
+from database import ReadSessionLocal
+
+router = APIRouter(prefix="/api/reports", tags=["Reports"])
+
+FORMAT = Query("csv", pattern="^(csv|xlsx)$")
+
+
+def _period(prefix: str, start_date: Optional[date], end_date: Optional[date]) -> str:
+    return "_".join([prefix] + [d.isoformat() for d in (start_date, end_date) if d])
+
+
+@router.get("/attendance")
+def export_attendance(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    department: Optional[str] = None,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    format: str = FORMAT,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Download attendance records as CSV or XLSX, streamed row by row (Admin only)"""
+    with ReadSessionLocal() as db:
+        source = attendance_source(archived_through_sync(db), start_date, end_date)
+    query = select(
+        source.id, User.employee_id, User.full_name, User.department,
+        source.date, source.check_in, source.check_out,
+        source.worked_minutes, source.overtime_minutes,
+        source.status, source.notes,
+    ).join(User, User.id == source.user_id)
+    
+    if start_date:
+        query = query.where(source.date >= start_date)
+    if end_date:
+        query = query.where(source.date <= end_date)
+    if department:
+        query = query.where(User.department == department)
+    if user_id:
+        query = query.where(source.user_id == user_id)
+    if status:
+        query = query.where(source.status == status)
+    
+    return export_response(
+        query.order_by(source.date, source.id),
+        ["id", "employee_id", "employee_name", "department", "date", "check_in", "check_out",
+         "worked_minutes", "overtime_minutes", "status", "notes"],
+        format, _period("attendance", start_date, end_date), "Attendance",
+    )
+
+
+@router.get("/leave")
+def export_leave_requests(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    department: Optional[str] = None,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    leave_type: Optional[str] = None,
+    format: str = FORMAT,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Download leave requests overlapping a date range as CSV or XLSX (Admin only)"""
+    query = select(
+        LeaveRequest.id, User.employee_id, User.full_name, User.department,
+        LeaveRequest.leave_type, LeaveRequest.start_date, LeaveRequest.end_date,
+        LeaveRequest.status, LeaveRequest.reason, LeaveRequest.admin_notes,
+        LeaveRequest.approved_by, LeaveRequest.created_at,
+    ).join(User, User.id == LeaveRequest.user_id)
+    
+    if start_date:
+        query = query.where(LeaveRequest.end_date >= start_date)
+    if end_date:
+        query = query.where(LeaveRequest.start_date <= end_date)
+    if department:
+        query = query.where(User.department == department)
+    if user_id:
+        query = query.where(LeaveRequest.user_id == user_id)
+    if status:
+        query = query.where(LeaveRequest.status == status)
+    if leave_type:
+        query = query.where(LeaveRequest.leave_type == leave_type)
+    
+    return export_response(
+        query.order_by(LeaveRequest.start_date, LeaveRequest.id),
+        ["id", "employee_id", "employee_name", "department", "leave_type", "start_date", "end_date",
+         "status", "reason", "admin_notes", "approved_by", "created_at"],
+        format, _period("leave", start_date, end_date), "Leave",
+    )
+
+
+@router.get("/payroll")
+def export_payroll(
+    year: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    department: Optional[str] = None,
+    user_id: Optional[int] = None,
+    format: str = FORMAT,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Download payroll records as CSV or XLSX (Admin only)"""
+    query = select(
+        PayrollRecord.id, User.employee_id, User.full_name, User.department,
+        PayrollRecord.year, PayrollRecord.month, PayrollRecord.base_salary, PayrollRecord.allowances,
+        PayrollRecord.deductions, PayrollRecord.bonus, PayrollRecord.tax, PayrollRecord.net_salary,
+        PayrollRecord.payment_date, PayrollRecord.payment_method,
+    ).join(User, User.id == PayrollRecord.user_id)
+    
+    if year:
+        query = query.where(PayrollRecord.year == year)
+    if month:
+        query = query.where(PayrollRecord.month == month)
+    if department:
+        query = query.where(User.department == department)
+    if user_id:
+        query = query.where(PayrollRecord.user_id == user_id)
+    
+    filename = "_".join(["payroll"] + [str(v) for v in (year, month) if v])
+    return export_response(
+        query.order_by(PayrollRecord.year, PayrollRecord.month, PayrollRecord.id),
+        ["id", "employee_id", "employee_name", "department", "year", "month", "base_salary", "allowances",
+         "deductions", "bonus", "tax", "net_salary", "payment_date", "payment_method"],
+        format, filename, "Payroll",
+    )
@@ -1,34 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_async_db, get_async_read_db
 from models import User
 from schemas import UserResponse, UserUpdate, DashboardStats
-from auth import get_current_user, get_current_admin_user, get_password_hash
+from auth import get_current_user, get_current_admin_user, invalidate_user_principals
+from hashing import password_hasher
+from attendance_ingest import invalidate_employee_lookup
+from attendance_summary import move_user_department, subtract_user_records
+from attendance_archive import delete_archived_user_records
+from attendance_buffer import attendance_buffer
+from leave_balance import delete_user_balances
+from pagination import PAGINATED_RESPONSES, SortKey, finish_page, paginate
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
+USER_ORDER = (SortKey(User.id),)
+
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 
 @router.put("/me", response_model=UserResponse)
-def update_current_user(
+async def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user information"""
+    # current_user comes from the auth session; edit this session's copy
+    current_user = await db.get(User, current_user.id)
+
     # Update user fields
     if user_update.email:
         # Check if email is already taken
-        existing = db.query(User).filter(
-            User.email == user_update.email,
-            User.id != current_user.id
-        ).first()
+        existing = (await db.scalars(
+            select(User).where(
+                User.email == user_update.email,
+                User.id != current_user.id
+            ).limit(1)
+        )).first()
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,7 +54,7 @@ def update_current_user(
     if user_update.full_name:
         current_user.full_name = user_update.full_name
     if user_update.department:
-        current_user.department = user_update.department
+        await move_user_department(db, current_user, user_update.department)
     if user_update.position:
         current_user.position = user_update.position
     if user_update.phone:
@@ -53,50 +68,53 @@ def update_current_user(
     if user_update.emergency_contact:
         current_user.emergency_contact = user_update.emergency_contact
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        current_user.hashed_password = await password_hasher.hash(user_update.password)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    invalidate_user_principals(current_user.id)
+    await db.refresh(current_user)
     return current_user
 
 
-@router.get("/", response_model=List[UserResponse])
-def get_all_users(
+@router.get("/", response_model=List[UserResponse], responses=PAGINATED_RESPONSES)
+async def get_all_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     department: Optional[str] = None,
     role: Optional[str] = None,
     search: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all users (Admin only)"""
-    query = db.query(User)
+    query = select(User)
     
     # Apply filters
     if department:
-        query = query.filter(User.department == department)
+        query = query.where(User.department == department)
     if role:
-        query = query.filter(User.role == role)
+        query = query.where(User.role == role)
     if search:
-        query = query.filter(
+        query = query.where(
             (User.full_name.ilike(f"%{search}%")) |
             (User.email.ilike(f"%{search}%")) |
             (User.employee_id.ilike(f"%{search}%"))
         )
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    users = (await db.scalars(paginate(query, USER_ORDER, cursor, skip, limit))).all()
+    return finish_page(users, USER_ORDER, limit, response)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(
+async def get_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user by ID (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -106,14 +124,14 @@ def get_user(
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user by ID (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,10 +140,12 @@ def update_user(
     
     # Update user fields
     if user_update.email:
-        existing = db.query(User).filter(
-            User.email == user_update.email,
-            User.id != user_id
-        ).first()
+        existing = (await db.scalars(
+            select(User).where(
+                User.email == user_update.email,
+                User.id != user_id
+            ).limit(1)
+        )).first()
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -136,7 +156,7 @@ def update_user(
     if user_update.full_name:
         user.full_name = user_update.full_name
     if user_update.department:
-        user.department = user_update.department
+        await move_user_department(db, user, user_update.department)
     if user_update.position:
         user.position = user_update.position
     if user_update.phone:
@@ -144,21 +164,22 @@ def update_user(
     if user_update.avatar:
         user.avatar = user_update.avatar
     if user_update.password:
-        user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = await password_hasher.hash(user_update.password)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    invalidate_user_principals(user.id)
+    await db.refresh(user)
     return user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(
+async def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete user by ID (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -172,36 +193,47 @@ def delete_user(
             detail="Cannot delete your own account"
         )
     
-    db.delete(user)
-    db.commit()
+    # Attendance records go with the user (ORM cascade); take them out of the rollup first
+    await subtract_user_records(db, user_id)
+    await delete_archived_user_records(db, user_id)
+    await delete_user_balances(db, user_id)
+    await db.delete(user)
+    await db.commit()
+    invalidate_user_principals(user_id)
+    invalidate_employee_lookup(user_id)
+    attendance_buffer.forget(user_id)
     return None
 
 
 @router.get("/stats/dashboard", response_model=DashboardStats)
-def get_dashboard_stats(
+async def get_dashboard_stats(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get dashboard statistics (Admin only)"""
-    from models import AttendanceRecord, LeaveRequest
+    from models import DailyAttendanceSummary, LeaveRequest
     from datetime import date
-    from sqlalchemy import func
     
-    total_employees = db.query(User).filter(User.role == "employee").count()
+    total_employees = await db.scalar(
+        select(func.count()).select_from(User).where(User.role == "employee")
+    )
     
     today = date.today()
-    present_today = db.query(AttendanceRecord).filter(
-        AttendanceRecord.date == today,
-        AttendanceRecord.check_in.isnot(None)
-    ).count()
+    present_today = await db.scalar(
+        select(func.coalesce(func.sum(DailyAttendanceSummary.checked_in), 0)).where(
+            DailyAttendanceSummary.date == today
+        )
+    )
     
     absent_today = total_employees - present_today
     
-    pending_leave_requests = db.query(LeaveRequest).filter(
-        LeaveRequest.status == "pending"
-    ).count()
+    pending_leave_requests = await db.scalar(
+        select(func.count()).select_from(LeaveRequest).where(
+            LeaveRequest.status == "pending"
+        )
+    )
     
-    total_departments = db.query(func.count(func.distinct(User.department))).scalar()
+    total_departments = await db.scalar(select(func.count(func.distinct(User.department))))
     
     return {
         "total_employees": total_employees,
@@ -0,0 +1,121 @@
+"""
+Startup schema handling: a single-query Alembic head check, plus create_all for an empty development database
+"""
+import ast
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from config import settings
+
+ALEMBIC_DIR = Path(__file__).resolve().parent / "alembic"
+SCHEMA_MODES = ("create_all", "verify", "off")
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the Alembic head revision"""
+
+
+def schema_mode() -> str:
+    """Resolve DB_SCHEMA_MODE; "auto" means create_all in development and verify elsewhere
+
+    Both modes check the Alembic head; create_all only additionally builds an empty database.
+    """
+    mode = settings.DB_SCHEMA_MODE.lower()
+    if mode == "auto":
+        return "create_all" if settings.ENVIRONMENT == "development" else "verify"
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"DB_SCHEMA_MODE must be one of auto, {', '.join(SCHEMA_MODES)}; got {mode!r}")
+    return mode
+
+
+def _revision_ids(value) -> tuple:
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def expected_heads() -> set[str]:
+    """Head revision(s) of the migration scripts shipped with this build"""
+    # Read the revision identifiers straight from the scripts: importing
+    # alembic.script would cost more than the whole check is worth at startup
+    revisions, parents = set(), set()
+    for path in (ALEMBIC_DIR / "versions").glob("*.py"):
+        values = {}
+        for node in ast.parse(path.read_text()).body:
+            if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.value is not None:
+                values[node.target.id] = node.value
+            elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                values[node.targets[0].id] = node.value
+        if "revision" in values:
+            revisions.add(ast.literal_eval(values["revision"]))
+            if "down_revision" in values:
+                parents.update(_revision_ids(ast.literal_eval(values["down_revision"])))
+    return revisions - parents
+
+
+def current_revisions(bind: Engine) -> set[str]:
+    """Revision(s) recorded in the database's alembic_version table"""
+    with bind.connect() as conn:
+        return set(conn.scalars(text("SELECT version_num FROM alembic_version")))
+
+
+def _unversioned(exc: DBAPIError) -> SchemaOutOfDate:
+    return SchemaOutOfDate(
+        "Could not read alembic_version; run `alembic upgrade head` "
+        "(or `alembic stamp 0001` then `alembic upgrade head` for a database created by create_all)"
+    )
+
+
+def verify_schema(bind: Engine) -> None:
+    """Fail fast unless the database has been migrated to the current head"""
+    try:
+        current = current_revisions(bind)
+    except DBAPIError as exc:
+        raise _unversioned(exc) from exc
+    _check_heads(current)
+
+
+def _check_heads(current: set[str]) -> None:
+    heads = expected_heads()
+    if current != heads:
+        raise SchemaOutOfDate(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+            f"expected {', '.join(sorted(heads))}; run `alembic upgrade head`"
+        )
+
+
+def create_schema(bind: Engine) -> None:
+    """Build every table with create_all and stamp the head, as `alembic upgrade head` would leave it"""
+    from database import Base
+    import models  # noqa: F401  (registers the tables on Base.metadata)
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+        conn.execute(text("DELETE FROM alembic_version"))
+        for head in sorted(expected_heads()):
+            conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:v)"), {"v": head})
+
+
+def ensure_schema(bind: Engine) -> None:
+    """Build and stamp an empty database; otherwise fail unless it is at the current head"""
+    try:
+        current = current_revisions(bind)
+    except DBAPIError as exc:
+        # create_all cannot add columns to existing tables, so it only ever builds an empty database
+        from sqlalchemy import inspect
+        if inspect(bind).get_table_names():
+            raise _unversioned(exc) from exc
+        create_schema(bind)
+        return
+    _check_heads(current)
+
+
+def prepare_schema(bind: Engine) -> str:
+    """Apply the configured startup schema step and return the mode that ran"""
+    mode = schema_mode()
+    if mode == "create_all":
+        ensure_schema(bind)
+    elif mode == "verify":
+        verify_schema(bind)
+    return mode
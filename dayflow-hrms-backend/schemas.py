@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime, date
 from models import UserRole, AttendanceStatus, LeaveStatus, LeaveType
 
@@ -125,6 +125,16 @@ class AdminCreateUserResponse(BaseModel):
     temp_password: str
 
 
+class AdminBulkCreateUserResult(BaseModel):
+    row: int
+    email: EmailStr
+    status: str  # "created" or "error"
+    user_id: Optional[int] = None
+    login_id: Optional[str] = None
+    temp_password: Optional[str] = None
+    detail: Optional[str] = None
+
+
 class ChangePasswordRequest(BaseModel):
     current_password: str
     new_password: str
@@ -159,6 +169,8 @@ class AttendanceRecordResponse(AttendanceRecordBase):
     user_id: int
     check_in: Optional[datetime] = None
     check_out: Optional[datetime] = None
+    worked_minutes: Optional[int] = None
+    overtime_minutes: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -166,6 +178,66 @@ class AttendanceRecordResponse(AttendanceRecordBase):
         from_attributes = True
 
 
+class AttendanceCheckAck(BaseModel):
+    user_id: int
+    date: date
+    status: AttendanceStatus
+    check_in: Optional[datetime] = None
+    check_out: Optional[datetime] = None
+    durability: str
+
+
+class EmployeeHours(BaseModel):
+    user_id: int
+    employee_id: Optional[str] = None
+    full_name: str
+    department: Optional[str] = None
+    days_worked: int
+    worked_minutes: int
+    overtime_minutes: int
+
+
+class DepartmentHours(BaseModel):
+    department: str
+    employees: int
+    days_worked: int
+    worked_minutes: int
+    overtime_minutes: int
+
+
+class AttendanceMatrix(BaseModel):
+    year: int
+    month: int
+    department: Optional[str] = None
+    days: int
+    legend: Dict[str, str]
+    user_ids: List[int]
+    employee_ids: List[Optional[str]]
+    names: List[str]
+    rows: List[str]
+
+
+class PunchBatchSummary(BaseModel):
+    batch: int
+    punches: int
+    applied: int
+    invalid: int
+    unknown_employees: List[str] = []
+    records_upserted: int
+    errors: List[str] = []
+    elapsed_ms: float
+
+
+class PunchIngestResult(BaseModel):
+    batches: List[PunchBatchSummary]
+    total_punches: int
+    applied: int
+    invalid: int
+    records_upserted: int
+    elapsed_ms: float
+    punches_per_second: float
+
+
 # Leave Schemas
 class LeaveRequestBase(BaseModel):
     leave_type: LeaveType
@@ -196,6 +268,70 @@ class LeaveRequestResponse(LeaveRequestBase):
         from_attributes = True
 
 
+class LeaveBulkDecision(BaseModel):
+    request_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    decision: LeaveStatus
+    admin_notes: Optional[str] = None
+
+
+class LeaveBulkDecisionOutcome(BaseModel):
+    id: int
+    outcome: str  # approved, rejected, not_pending, not_found
+    status: Optional[LeaveStatus] = None
+
+
+class LeaveBulkDecisionResult(BaseModel):
+    updated: int
+    results: List[LeaveBulkDecisionOutcome]
+
+
+class OnLeaveEntry(BaseModel):
+    user_id: int
+    employee_id: Optional[str] = None
+    user_name: str
+    department: Optional[str] = None
+    leave_request_id: int
+    leave_type: LeaveType
+    start_date: date
+    end_date: date
+    status: LeaveStatus
+
+
+class LeaveBalanceResponse(BaseModel):
+    user_id: int
+    leave_type: LeaveType
+    year: int
+    accrued: float
+    taken: float
+    pending: float
+    available: float
+
+
+class LeaveBalanceAdjustment(BaseModel):
+    user_id: int
+    leave_type: LeaveType
+    year: int
+    days: float
+    note: Optional[str] = None
+
+
+class LeaveLedgerEntryResponse(BaseModel):
+    id: int
+    user_id: int
+    leave_type: LeaveType
+    year: int
+    kind: str
+    days: float
+    leave_request_id: Optional[int] = None
+    period: Optional[date] = None
+    note: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Payroll Schemas
 class PayrollRecordBase(BaseModel):
     month: int = Field(..., ge=1, le=12)
@@ -246,9 +382,22 @@ class DashboardStats(BaseModel):
     total_departments: int
 
 
+class AttendanceStatsBucket(BaseModel):
+    period_start: date
+    total_days: int
+    present_days: int
+    absent_days: int
+    late_days: int
+    half_day_days: int
+    attendance_rate: float
+
+
 class AttendanceStats(BaseModel):
     total_days: int
     present_days: int
     absent_days: int
     late_days: int
+    half_day_days: int = 0
     attendance_rate: float
+    bucket: Optional[str] = None
+    buckets: List[AttendanceStatsBucket] = []
@@ -2,13 +2,14 @@
 Seed script to create initial admin and employee users for testing
 """
 from database import SessionLocal, engine
+from schema_check import ensure_schema
 from models import User, UserRole, Base, MasterEmployee
 from auth import get_password_hash
 from datetime import date
 
 def seed_users():
-    # Ensure tables exist
-    Base.metadata.create_all(bind=engine)
+    # Create and stamp the tables on an empty database; an existing one must be at the migration head
+    ensure_schema(engine)
 
     db = SessionLocal()
 
@@ -0,0 +1,183 @@
+"""
+Slow-query recorder: keeps the top-N slowest statement shapes with on-demand EXPLAIN plans
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from config import settings
+from query_stats import statement_listeners
+
+logger = logging.getLogger("dayflow.sql.slow")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse literals, IN-lists and whitespace so equivalent statements share one shape"""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PARAM_LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def bind_shape(parameters, executemany: bool):
+    """Types of the bound parameters (values are never exposed)"""
+    if executemany and parameters:
+        return {"rows": len(parameters), "row": bind_shape(parameters[0], False)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class SlowQueryEntry:
+    def __init__(self, fingerprint: str, sql: str, dialect: str):
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.dialect = dialect
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.last_seen: Optional[datetime] = None
+        self.routes: Counter = Counter()
+        self.bind_shape = None
+        self.plan: Optional[list] = None
+        self.plan_captured_at: Optional[datetime] = None
+        # Kept in memory only, to replay EXPLAIN on demand
+        self._engine: Optional[Engine] = None
+        self._statement: Optional[str] = None
+        self._parameters = None
+
+    def as_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "dialect": self.dialect,
+            "count": self.count,
+            "avg_ms": round(self.total_time / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max_time * 1000, 2),
+            "last_ms": round(self.last_time * 1000, 2),
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "routes": dict(self.routes.most_common(5)),
+            "bind_shape": self.bind_shape,
+            "plan": self.plan,
+            "plan_captured_at": self.plan_captured_at.isoformat() if self.plan_captured_at else None,
+        }
+
+
+class SlowQueryLog:
+    """Bounded collection of the slowest statement shapes seen above a threshold"""
+
+    def __init__(self, threshold_ms: int, capacity: int):
+        self.threshold = threshold_ms / 1000
+        self.capacity = capacity
+        self._entries: dict[str, SlowQueryEntry] = {}
+        self._async_engines: dict[Engine, AsyncEngine] = {}
+        self._lock = threading.Lock()
+
+    def register_async_engine(self, async_engine: AsyncEngine) -> None:
+        """Let EXPLAIN replay statements recorded on an async engine's sync facade"""
+        self._async_engines[async_engine.sync_engine] = async_engine
+
+    def observe(self, conn, statement, parameters, executemany, elapsed, stats) -> None:
+        if elapsed < self.threshold or statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        sql = normalize_sql(statement)
+        fingerprint = hashlib.sha1(sql.encode()).hexdigest()[:12]
+        route = stats.route if stats is not None else None
+        shape = bind_shape(parameters, executemany)
+
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                if len(self._entries) >= self.capacity:
+                    fastest = min(self._entries.values(), key=lambda e: e.max_time)
+                    if fastest.max_time >= elapsed:
+                        return
+                    del self._entries[fastest.fingerprint]
+                entry = SlowQueryEntry(fingerprint, sql, conn.dialect.name)
+                self._entries[fingerprint] = entry
+            entry.count += 1
+            entry.total_time += elapsed
+            entry.last_time = elapsed
+            entry.last_seen = datetime.now(timezone.utc)
+            entry.bind_shape = shape
+            if route:
+                entry.routes[route] += 1
+            if elapsed >= entry.max_time:
+                entry.max_time = elapsed
+                entry._engine = conn.engine
+                entry._statement = statement
+                entry._parameters = None if executemany else parameters
+
+        logger.warning(json.dumps({
+            "event": "sql.slow",
+            "fingerprint": fingerprint,
+            "ms": round(elapsed * 1000, 2),
+            "route": route,
+            "sql": sql[:1000],
+            "bind_shape": shape,
+        }))
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e.max_time, reverse=True)
+            return [entry.as_dict() for entry in entries]
+
+    def get(self, fingerprint: str) -> Optional[SlowQueryEntry]:
+        return self._entries.get(fingerprint)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def explain(self, fingerprint: str) -> Optional[list]:
+        """Capture the query plan for the slowest sample of a shape; None if unknown"""
+        entry = self._entries.get(fingerprint)
+        if entry is None or entry._statement is None:
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if entry.dialect == "sqlite" else "EXPLAIN "
+        sql = prefix + entry._statement
+        params = entry._parameters if entry._parameters is not None else ()
+
+        def run(conn):
+            return [
+                " | ".join(str(col) for col in row)
+                for row in conn.exec_driver_sql(sql, params).fetchall()
+            ]
+
+        async_engine = self._async_engines.get(entry._engine)
+        if async_engine is not None:
+            async with async_engine.connect() as conn:
+                plan = await conn.run_sync(run)
+        else:
+            def run_sync():
+                with entry._engine.connect() as conn:
+                    return run(conn)
+            plan = await run_in_threadpool(run_sync)
+
+        entry.plan = plan
+        entry.plan_captured_at = datetime.now(timezone.utc)
+        return plan
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    capacity=settings.SLOW_QUERY_CAPACITY,
+)
+
+if settings.SLOW_QUERY_LOG:
+    statement_listeners.append(slow_query_log.observe)
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Settings are read on import: point the app at a scratch SQLite database first
+DB_DIR = tempfile.mkdtemp(prefix="dayflow-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'test.db')}"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PASSWORD = "pw123456"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from auth import get_password_hash
+    from database import SessionLocal, engine
+    from schema_check import create_schema
+    from models import User, UserRole
+    import main
+
+    create_schema(engine)
+    hashed = get_password_hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all([
+            User(email="admin@example.com", full_name="Admin", hashed_password=hashed, role=UserRole.ADMIN,
+                 employee_id="ADM001", department="HR", is_active=True),
+            User(email="employee@example.com", full_name="Employee", hashed_password=hashed,
+                 role=UserRole.EMPLOYEE, employee_id="EMP001", department="IT", is_active=True),
+        ])
+        db.commit()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def _login(client, login: str) -> dict:
+    response = client.post("/api/auth/login", json={"login": login, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _login(client, "admin@example.com")
+
+
+@pytest.fixture(scope="session")
+def employee_headers(client):
+    return _login(client, "employee@example.com")
@@ -0,0 +1,21 @@
+import os
+
+from sqlalchemy import func, select
+
+
+def test_archive_file_is_created_by_the_job_only(client, admin_headers):
+    from attendance_archive import archive_records, ensure_archive_storage
+    from database import SessionLocal, engine, sqlite_archive_path
+
+    archive = sqlite_archive_path(engine.url.database)
+    assert client.get("/api/attendance/all", headers=admin_headers).status_code == 200
+    assert not os.path.exists(archive)
+
+    with SessionLocal() as db:
+        ensure_archive_storage(db)
+        db.commit()
+    assert os.path.exists(archive)
+    # Connections opened before the file existed attach it at checkout
+    with engine.connect() as first, engine.connect() as second:
+        for connection in (first, second):
+            assert connection.scalar(select(func.count()).select_from(archive_records)) == 0
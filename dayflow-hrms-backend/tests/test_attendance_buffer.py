@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+
+def _punch(user_id):
+    from attendance_buffer import BufferedPunch, DayState
+    from models import AttendanceStatus
+
+    now = datetime.now()
+    return BufferedPunch(user_id, date.today(), "in", now, None, DayState(AttendanceStatus.PRESENT, now, None))
+
+
+def test_flush_drops_permanently_failing_punches(monkeypatch):
+    from attendance_buffer import AttendanceWriteBehind
+
+    buffer = AttendanceWriteBehind("memory", 0, 100, "unused.journal")
+    written, attempts = [], {"transient": 0}
+
+    def write(punches):
+        if attempts["transient"] < 2:
+            attempts["transient"] += 1
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        if any(punch.user_id == 999 for punch in punches):
+            raise IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+        written.extend(punch.user_id for punch in punches)
+
+    monkeypatch.setattr(buffer, "_write", write)
+    monkeypatch.setattr("attendance_buffer.RETRY_DELAY_SECONDS", 0)
+    batch = [(_punch(user_id), None) for user_id in (1, 2, 999, 3, 4)]
+    for punch, _ in batch:
+        buffer._pending[punch.user_id] = buffer._pending.get(punch.user_id, 0) + 1
+
+    buffer._flush(batch)
+
+    assert attempts["transient"] == 2
+    assert sorted(written) == [1, 2, 3, 4]
+    assert buffer.flushed_punches == 4 and buffer.dropped_punches == 1
+    assert buffer._pending == {} and buffer._stale == {999}
@@ -0,0 +1,19 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def test_period_start_follows_the_given_dialect():
+    from attendance_stats import period_start
+    from models import AttendanceRecord
+
+    def compiled(dialect):
+        return str(period_start(AttendanceRecord.date, "month", dialect).compile(dialect=dialect))
+
+    assert "date_trunc" in compiled(postgresql.dialect())
+    assert compiled(sqlite.dialect()).startswith("date(")
+
+
+def test_bucketed_stats_use_the_session_bind(client, admin_headers):
+    response = client.get("/api/attendance/stats", params={"bucket": "week"}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["bucket"] == "week"
@@ -0,0 +1,59 @@
+from datetime import date
+
+from sqlalchemy import select
+
+
+def _summary_rows():
+    from database import SessionLocal
+    from models import DailyAttendanceSummary
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(DailyAttendanceSummary.department, DailyAttendanceSummary.headcount)
+            .where(DailyAttendanceSummary.date == date.today())
+        ).all()
+    return {department: headcount for department, headcount in rows if headcount}
+
+
+def test_department_change_moves_rollup_rows(client, admin_headers, employee_headers):
+    response = client.post("/api/attendance/check-in", headers=employee_headers)
+    assert response.status_code == 201, response.text
+    record_id = response.json()["id"]
+    assert _summary_rows() == {"IT": 1}
+
+    response = client.put("/api/users/2", json={"department": "Finance"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert _summary_rows() == {"Finance": 1}
+
+    response = client.put("/api/users/me", json={"department": "Sales"}, headers=employee_headers)
+    assert response.status_code == 200, response.text
+    assert _summary_rows() == {"Sales": 1}
+    assert client.get("/api/users/stats/dashboard", headers=admin_headers).json()["present_today"] == 1
+
+    assert client.delete(f"/api/attendance/{record_id}", headers=admin_headers).status_code == 204
+    assert _summary_rows() == {}
+    assert client.get("/api/users/stats/dashboard", headers=admin_headers).json()["present_today"] == 0
+
+
+def test_check_in_counts_stored_department_not_cached_principal(client, admin_headers, employee_headers):
+    from database import SessionLocal
+    from models import User
+
+    # Cache the principal, then change the department the way another worker would: no local invalidation
+    assert client.get("/api/users/me", headers=employee_headers).status_code == 200
+    with SessionLocal() as db:
+        user = db.get(User, 2)
+        previous, user.department = user.department, "Legal"
+        db.commit()
+
+    response = client.post("/api/attendance/check-in", headers=employee_headers)
+    assert response.status_code == 201, response.text
+    assert _summary_rows() == {"Legal": 1}
+    response = client.post("/api/attendance/check-out", headers=employee_headers)
+    assert response.status_code == 200, response.text
+    assert _summary_rows() == {"Legal": 1}
+
+    assert client.delete(f"/api/attendance/{response.json()['id']}", headers=admin_headers).status_code == 204
+    with SessionLocal() as db:
+        db.get(User, 2).department = previous
+        db.commit()
@@ -0,0 +1,21 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+
+def test_sweep_marks_only_employees_absent(client):
+    from attendance_sweep import sweep_day
+    from database import SessionLocal
+    from models import AttendanceRecord, AttendanceStatus, User
+
+    day = date.today() - timedelta(days=40)
+    with SessionLocal() as db:
+        db.execute(User.__table__.update().values(created_at=datetime(2020, 1, 1)))
+        result = sweep_day(db, day, "flag")
+        db.commit()
+        absent = db.execute(
+            select(User.email).join(AttendanceRecord, AttendanceRecord.user_id == User.id)
+            .where(AttendanceRecord.date == day, AttendanceRecord.status == AttendanceStatus.ABSENT)
+        ).scalars().all()
+    assert result["marked_absent"] == 1
+    assert absent == ["employee@example.com"]
@@ -0,0 +1,27 @@
+def test_admin_account_lifecycle_on_the_async_session(client, admin_headers):
+    response = client.post("/api/auth/admin/create-user", json={
+        "first_name": "Asha", "last_name": "Rao", "email": "asha.rao@example.com", "date_of_joining": "2026-02-02",
+    }, headers=admin_headers)
+    assert response.status_code == 201, response.text
+    created = response.json()
+    login_id = created["user"]["login_id"]
+    assert login_id.startswith("OIASRA2026")
+
+    response = client.post("/api/auth/login", json={"login": login_id, "password": created["temp_password"]})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # The second request is served from the principal cache, merged into the request's session
+    for _ in range(2):
+        assert client.get("/api/users/me", headers=headers).json()["must_change_password"] is True
+
+    response = client.post("/api/auth/change-password-first", json={
+        "current_password": created["temp_password"], "new_password": "changed-pw-1",
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["must_change_password"] is False
+
+    response = client.post(f"/api/auth/admin/reset-password/{created['user']['id']}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["user"]["must_change_password"] is True
+    assert client.get("/api/users/me", headers=headers).json()["must_change_password"] is True
+    assert client.post("/api/auth/admin/reset-password/999999", headers=admin_headers).status_code == 404
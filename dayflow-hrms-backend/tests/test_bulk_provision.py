@@ -0,0 +1,42 @@
+import json
+from datetime import date
+
+from config import settings
+from hashing import password_hasher
+
+
+def _rows(count: int, tag: str) -> list[dict]:
+    return [
+        {"first_name": "Bulk", "last_name": f"{tag}{n}", "email": f"bulk-{tag}-{n}@example.com",
+         "date_of_joining": date(2026, 1, 5).isoformat(), "department": "Ops"}
+        for n in range(count)
+    ]
+
+
+def test_bulk_provision_rejects_too_many_rows(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_PROVISION_MAX_ROWS", 2)
+
+    response = client.post("/api/auth/admin/create-users/bulk", json=_rows(3, "over"), headers=admin_headers)
+
+    assert response.status_code == 413
+
+
+def test_bulk_provision_hashes_through_admission(client, admin_headers):
+    before = password_hasher.stats()["completed"]
+
+    response = client.post("/api/auth/admin/create-users/bulk", json=_rows(3, "ok"), headers=admin_headers)
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["status"] for result in results] == ["created"] * 3
+    assert password_hasher.stats()["completed"] - before == 3
+
+
+def test_bulk_provision_reports_rows_when_hashing_queue_is_full(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_queue", -password_hasher.workers)
+
+    response = client.post("/api/auth/admin/create-users/bulk", json=_rows(2, "busy"), headers=admin_headers)
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["status"] for result in results] == ["error", "error"]
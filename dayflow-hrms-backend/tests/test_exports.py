@@ -0,0 +1,38 @@
+import csv
+import io
+
+import pytest
+
+
+def test_csv_export_neutralizes_formulas(client, admin_headers, employee_headers):
+    response = client.post("/api/leave/", json={
+        "leave_type": "unpaid", "start_date": "2030-04-01", "end_date": "2030-04-01",
+        "reason": '=HYPERLINK("http://example.com","x")',
+    }, headers=employee_headers)
+    assert response.status_code == 201, response.text
+
+    response = client.get("/api/reports/leave?start_date=2030-04-01&end_date=2030-04-01", headers=admin_headers)
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["reason"] for row in rows] == ['\'=HYPERLINK("http://example.com","x")']
+
+
+def test_xlsx_export_rolls_over_to_new_sheets(client, admin_headers, employee_headers, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    import exports
+
+    for day in ("02", "03", "04"):
+        response = client.post("/api/leave/", json={
+            "leave_type": "unpaid", "start_date": f"2030-05-{day}", "end_date": f"2030-05-{day}", "reason": "=1+1",
+        }, headers=employee_headers)
+        assert response.status_code == 201, response.text
+    monkeypatch.setattr(exports, "XLSX_MAX_ROWS", 3)
+
+    response = client.get(
+        "/api/reports/leave?start_date=2030-05-01&end_date=2030-05-31&format=xlsx", headers=admin_headers
+    )
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(response.content))
+    assert workbook.sheetnames == ["Leave", "Leave (2)"]
+    assert [workbook[name].max_row for name in workbook.sheetnames] == [3, 2]
+    assert workbook["Leave"]["I2"].value == "=1+1" and workbook["Leave"]["I2"].data_type == "s"
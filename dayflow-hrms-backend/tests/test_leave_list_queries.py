@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import pytest
+
+N = 10
+
+
+@pytest.fixture
+def count_queries():
+    from query_stats import statement_listeners
+
+    statements = []
+
+    def listener(conn, statement, parameters, executemany, elapsed, stats):
+        statements.append(statement)
+
+    statement_listeners.append(listener)
+    try:
+        def measure(call):
+            statements.clear()
+            response = call()
+            assert response.status_code == 200, response.text
+            return len(statements), len(response.json())
+        yield measure
+    finally:
+        statement_listeners.remove(listener)
+
+
+def _seed_leave(user_id: int, count: int, offset: int) -> None:
+    from database import SessionLocal
+    from models import LeaveRequest, LeaveStatus, LeaveType
+
+    first = date(2028, 1, 1)
+    with SessionLocal() as db:
+        db.add_all(
+            LeaveRequest(user_id=user_id, leave_type=LeaveType.UNPAID, reason="seed", status=LeaveStatus.PENDING,
+                         start_date=first + timedelta(days=2 * n), end_date=first + timedelta(days=2 * n))
+            for n in range(offset, offset + count)
+        )
+        db.commit()
+
+
+def test_leave_lists_use_constant_query_count(client, admin_headers, count_queries):
+    from auth import get_password_hash
+    from database import SessionLocal
+    from models import User
+
+    with SessionLocal() as db:
+        user = User(email="lister@example.com", full_name="Lister", hashed_password=get_password_hash("pw123456"),
+                    employee_id="EMP900", department="Ops", is_active=True)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    response = client.post("/api/auth/login", json={"login": "lister@example.com", "password": "pw123456"})
+    lister_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    calls = {
+        "all": lambda: client.get(f"/api/leave/all?user_id={user_id}&limit=100", headers=admin_headers),
+        "mine": lambda: client.get("/api/leave/my-requests?limit=100", headers=lister_headers),
+    }
+    for call in calls.values():
+        call()  # warm the auth principal cache
+
+    _seed_leave(user_id, N, 0)
+    small = {name: count_queries(call) for name, call in calls.items()}
+    _seed_leave(user_id, 2 * N, N)
+    large = {name: count_queries(call) for name, call in calls.items()}
+
+    for name in calls:
+        assert small[name][1] == N and large[name][1] == 3 * N
+        assert 0 < small[name][0] == large[name][0], (name, small[name], large[name])
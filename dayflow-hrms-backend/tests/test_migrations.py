@@ -0,0 +1,38 @@
+import shutil
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from config import settings
+from schema_check import ALEMBIC_DIR, verify_schema
+
+BUNDLED_DB = Path(__file__).resolve().parent.parent / "dayflow_hrms.db"
+
+
+def test_create_all_database_upgrades_to_head(tmp_path, monkeypatch):
+    """The documented path for a database built by create_all: stamp the baseline, then upgrade"""
+    path = tmp_path / "legacy.db"
+    shutil.copy(BUNDLED_DB, path)
+    url = f"sqlite:///{path}"
+    # alembic/env.py reads the URL from settings; no ini file, so test logging stays as it is
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+
+    command.stamp(config, "0001")
+    command.upgrade(config, "head")
+    command.check(config)
+
+    engine = create_engine(url)
+    verify_schema(engine)
+    with engine.connect() as conn:
+        missing = conn.scalar(text(
+            "SELECT COUNT(*) FROM attendance_records "
+            "WHERE check_in IS NOT NULL AND check_out IS NOT NULL AND worked_minutes IS NULL"
+        ))
+        filled = conn.scalar(text("SELECT COUNT(*) FROM attendance_records WHERE worked_minutes IS NOT NULL"))
+        counters = conn.scalar(text("SELECT COUNT(*) FROM login_id_counters"))
+    assert missing == 0 and filled > 0
+    assert counters > 0
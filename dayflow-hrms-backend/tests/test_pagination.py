@@ -0,0 +1,43 @@
+def test_next_cursor_header_is_documented(client):
+    spec = client.get("/openapi.json").json()
+    for path in ("/api/leave/all", "/api/attendance/all", "/api/users/"):
+        headers = spec["paths"][path]["get"]["responses"]["200"]["headers"]
+        assert "X-Next-Cursor" in headers, path
+
+
+def test_leave_cursor_walk_matches_offset_pages(client, admin_headers, employee_headers):
+    for month in range(1, 8):
+        response = client.post("/api/leave/", json={
+            "leave_type": "unpaid", "start_date": f"2029-{month:02d}-01", "end_date": f"2029-{month:02d}-01",
+            "reason": "walk",
+        }, headers=employee_headers)
+        assert response.status_code == 201, response.text
+    expected = [row["id"] for row in client.get("/api/leave/all?limit=100", headers=admin_headers).json()]
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/leave/all?limit=3" + (f"&cursor={cursor}" if cursor else ""), headers=admin_headers)
+        seen += [row["id"] for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == expected
+
+
+def test_datetime_cursor_binds_for_the_executing_dialect():
+    from datetime import datetime
+
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql, sqlite
+
+    from models import LeaveRequest
+    from pagination import SortKey, encode_cursor, paginate
+
+    keys = (SortKey(LeaveRequest.created_at, descending=True), SortKey(LeaveRequest.id, descending=True))
+    row = type("Row", (), {"created_at": datetime(2029, 1, 2, 3, 4, 5), "id": 7})()
+    query = paginate(select(LeaveRequest.id), keys, encode_cursor(keys, row), 0, 10)
+
+    on_sqlite = query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    on_postgresql = query.compile(dialect=postgresql.dialect())
+    assert "'2029-01-02 03:04:05'" in str(on_sqlite)
+    assert datetime(2029, 1, 2, 3, 4, 5) in on_postgresql.construct_params().values()
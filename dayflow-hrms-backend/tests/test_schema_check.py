@@ -0,0 +1,45 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from config import settings
+from schema_check import SchemaOutOfDate, current_revisions, expected_heads, prepare_schema
+
+BUNDLED_DB = Path(__file__).resolve().parent.parent / "dayflow_hrms.db"
+
+
+@pytest.fixture
+def create_all_mode(monkeypatch):
+    monkeypatch.setattr(settings, "DB_SCHEMA_MODE", "create_all")
+
+
+def test_empty_database_is_created_and_stamped(tmp_path, create_all_mode):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    prepare_schema(engine)
+
+    assert "worked_minutes" in {column["name"] for column in inspect(engine).get_columns("attendance_records")}
+    assert current_revisions(engine) == expected_heads()
+    prepare_schema(engine)
+
+
+def test_unversioned_database_fails_instead_of_create_all(tmp_path, create_all_mode):
+    path = tmp_path / "legacy.db"
+    shutil.copy(BUNDLED_DB, path)
+    engine = create_engine(f"sqlite:///{path}")
+
+    with pytest.raises(SchemaOutOfDate, match="alembic stamp 0001"):
+        prepare_schema(engine)
+    assert "worked_minutes" not in {column["name"] for column in inspect(engine).get_columns("attendance_records")}
+
+
+def test_database_behind_head_fails(tmp_path, create_all_mode):
+    engine = create_engine(f"sqlite:///{tmp_path / 'behind.db'}")
+    prepare_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE alembic_version SET version_num = '0004'"))
+
+    with pytest.raises(SchemaOutOfDate, match="0004"):
+        prepare_schema(engine)
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from config import settings
+
+
+def test_slow_query_log_works_without_request_instrumentation(tmp_path, monkeypatch):
+    from database import build_engine
+    from slow_queries import slow_query_log
+
+    monkeypatch.setattr(settings, "SQL_INSTRUMENTATION", False)
+    monkeypatch.setattr(slow_query_log, "threshold", 0)
+    engine = build_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    slow_query_log.clear()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 42 AS slow_probe"))
+
+    assert any("slow_probe" in entry["sql"] for entry in slow_query_log.entries())
+    slow_query_log.clear()